@@ -1,33 +1,61 @@
+import logging
 import os
 from functools import lru_cache
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 
 class Settings:
     """Settings class that reads from environment variables."""
 
     def __init__(self):
-        # Debug: Print available env vars (will show in Railway logs)
-        print("Loading settings from environment...")
-        print(f"Available env vars: {[k for k in os.environ.keys() if not k.startswith('_')]}")
-
         # Supabase
         self.supabase_url = os.environ.get("SUPABASE_URL", "")
         self.supabase_key = os.environ.get("SUPABASE_KEY", "")
         self.supabase_service_key = os.environ.get("SUPABASE_SERVICE_KEY", "")
+        # Optional direct Postgres connection for analytical reads (CRUD stays on PostgREST)
+        self.database_url = os.environ.get("DATABASE_URL", "")
+        self.database_pool_min_size = int(os.environ.get("DATABASE_POOL_MIN_SIZE", "1"))
+        self.database_pool_max_size = int(os.environ.get("DATABASE_POOL_MAX_SIZE", "10"))
+        # Set to 0 behind a transaction-mode pooler (Supavisor/pgbouncer), which can't keep prepared statements
+        self.database_statement_cache_size = int(os.environ.get("DATABASE_STATEMENT_CACHE_SIZE", "100"))
 
         # Google OAuth
         self.google_client_id = os.environ.get("GOOGLE_CLIENT_ID", "")
         self.google_client_secret = os.environ.get("GOOGLE_CLIENT_SECRET", "")
         self.google_redirect_uri = os.environ.get("GOOGLE_REDIRECT_URI", "http://localhost:8000/auth/google/callback")
+        # Overridable so load tests can point Gmail traffic at a local fake
+        self.google_token_uri = os.environ.get("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
+        self.gmail_api_endpoint = os.environ.get("GMAIL_API_ENDPOINT", "")
 
         # Google Gemini
         self.gemini_api_key = os.environ.get("GEMINI_API_KEY", "")
+        self.gemini_max_concurrency = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "4"))
+        self.gemini_timeout_seconds = float(os.environ.get("GEMINI_TIMEOUT_SECONDS", "20"))
+        self.gemini_categorize_timeout_seconds = float(os.environ.get("GEMINI_CATEGORIZE_TIMEOUT_SECONDS", "5"))
+        self.gemini_breaker_failures = int(os.environ.get("GEMINI_BREAKER_FAILURES", "5"))
+        self.gemini_breaker_reset_seconds = float(os.environ.get("GEMINI_BREAKER_RESET_SECONDS", "30"))
 
         # App
         self.frontend_url = os.environ.get("FRONTEND_URL", "http://localhost:5173")
         self.secret_key = os.environ.get("SECRET_KEY", "default-secret-key")
         self.expense_email_label = os.environ.get("EXPENSE_EMAIL_LABEL", "Expenses")
+        # Raw Gmail messages kept for offline re-extraction (empty disables the store)
+        self.email_store_dir = os.environ.get("EMAIL_STORE_DIR", "email-store")
+        self.email_store_retention_days = int(os.environ.get("EMAIL_STORE_RETENTION_DAYS", "365"))
+        self.email_reprocess_workers = int(os.environ.get("EMAIL_REPROCESS_WORKERS", "4"))
+        # Tracing: Server-Timing headers and the slow upstream call log
+        self.server_timing_enabled = os.environ.get("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.slow_query_threshold_ms = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "500"))
+        self.trace_export_path = os.environ.get("TRACE_EXPORT_PATH", "")
+        # On-demand profiling: requests carrying this token are profiled (disabled when empty)
+        self.profiling_token = os.environ.get("PROFILING_TOKEN", "")
+        self.profiling_dir = os.environ.get("PROFILING_DIR", "profiles")
+        # Import SDKs and build clients in the background right after startup
+        self.warm_up_on_startup = os.environ.get("WARM_UP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+        # Shared cache for all workers and replicas (redis://...); empty keeps caches in process
+        self.cache_url = os.environ.get("CACHE_URL", "")
 
         # Validate required settings
         missing = []
@@ -45,8 +73,7 @@ class Settings:
             missing.append("GEMINI_API_KEY")
 
         if missing:
-            print(f"WARNING: Missing environment variables: {missing}")
-            print("The app may not work correctly without these.")
+            logger.warning("Missing environment variables: %s. The app may not work correctly without these.", missing)
 
 
 _settings: Optional[Settings] = None
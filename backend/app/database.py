@@ -1,15 +1,79 @@
-from supabase import create_client, Client
+import logging
+from typing import TYPE_CHECKING, Optional
 from app.config import get_settings
 
+if TYPE_CHECKING:
+    import asyncpg
+    from supabase import Client
+
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Created by the app lifespan hook, or on first use outside the app (scripts)
+supabase: Optional["Client"] = None
 
-supabase: Client = create_client(settings.supabase_url, settings.supabase_service_key)
 
+def init_supabase() -> "Client":
+    global supabase
+    if supabase is None:
+        from supabase import create_client
+        from app.services.metrics import instrument_supabase
 
-def get_supabase() -> Client:
+        supabase = create_client(settings.supabase_url, settings.supabase_service_key)
+        instrument_supabase(supabase)
     return supabase
 
 
+def close_supabase() -> None:
+    global supabase
+    supabase = None
+
+
+def get_supabase() -> "Client":
+    return supabase if supabase is not None else init_supabase()
+
+
+# Direct Postgres pool for analytical reads, when DATABASE_URL is configured
+pg_pool: Optional["asyncpg.Pool"] = None
+
+
+async def init_pg_pool() -> Optional["asyncpg.Pool"]:
+    """Open the asyncpg pool; on failure, analytical reads fall back to PostgREST."""
+    global pg_pool
+    if pg_pool is None and settings.database_url:
+        import asyncpg
+
+        try:
+            pg_pool = await asyncpg.create_pool(
+                settings.database_url,
+                min_size=settings.database_pool_min_size,
+                max_size=settings.database_pool_max_size,
+                statement_cache_size=settings.database_statement_cache_size,
+                # The pool only serves reads; refuse writes outright. Cached
+                # statements are planned per call so expenses partitions are
+                # pruned at plan time: a generic plan locks every partition.
+                server_settings={
+                    "application_name": "financial-dashboard-analytics",
+                    "default_transaction_read_only": "on",
+                    "plan_cache_mode": "force_custom_plan",
+                },
+            )
+        except Exception as e:
+            logger.warning("Could not connect to DATABASE_URL, using PostgREST for all reads: %s", e)
+    return pg_pool
+
+
+async def close_pg_pool() -> None:
+    global pg_pool
+    if pg_pool is not None:
+        await pg_pool.close()
+        pg_pool = None
+
+
+def get_pg_pool() -> Optional["asyncpg.Pool"]:
+    return pg_pool
+
+
 # SQL to run in Supabase SQL Editor to create tables:
 SETUP_SQL = """
 -- Enable UUID extension
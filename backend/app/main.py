@@ -1,14 +1,60 @@
-from fastapi import FastAPI
+import asyncio
+import hmac
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.config import get_settings
-from app.routers import auth, expenses, gmail, analysis, partners, categories
+from app.database import close_pg_pool, close_supabase, init_pg_pool, init_supabase
+from app.middleware import MetricsMiddleware, ProfilingMiddleware, RequestLoadersMiddleware, TracingMiddleware
+from app.services.cache import close_cache_backend, run_listeners_on
+from app.services.metrics import render_metrics
+from app.services.tracing import get_slow_query_log
+from app.services.gemini_client import get_gemini_client
+from app.routers import auth, expenses, gmail, analysis, partners, categories, budgets, dashboard
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _warm_up() -> None:
+    """Import the Google SDKs and build the Gemini model before a request needs them."""
+    import google_auth_oauthlib.flow  # noqa: F401
+    import googleapiclient.discovery  # noqa: F401
+
+    get_gemini_client().model
+
+
+def _log_warm_up_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception():
+        logger.warning("Warm-up failed: %s", future.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_supabase()
+    await init_pg_pool()
+    run_listeners_on(asyncio.get_running_loop())
+
+    # Warm-up runs in a thread after startup so it never delays /health
+    if settings.warm_up_on_startup:
+        warm_up = asyncio.get_running_loop().run_in_executor(None, _warm_up)
+        warm_up.add_done_callback(_log_warm_up_failure)
+
+    yield
+
+    close_cache_backend()
+    run_listeners_on(None)
+    await close_pg_pool()
+    close_supabase()
+
 
 app = FastAPI(
     title="Financial Dashboard API",
     description="Personal financial dashboard with Gmail integration and AI analysis",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -23,6 +69,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestLoadersMiddleware)
+app.add_middleware(TracingMiddleware, server_timing=settings.server_timing_enabled)
+if settings.profiling_token:
+    app.add_middleware(ProfilingMiddleware, token=settings.profiling_token, directory=settings.profiling_dir)
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router)
@@ -31,6 +82,8 @@ app.include_router(gmail.router)
 app.include_router(analysis.router)
 app.include_router(partners.router)
 app.include_router(categories.router)
+app.include_router(budgets.router)
+app.include_router(dashboard.router)
 
 
 @app.get("/")
@@ -45,3 +98,22 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics in the text exposition format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/slow-queries")
+async def slow_queries(x_profile_token: str = Header("")):
+    """Recent upstream calls over SLOW_QUERY_THRESHOLD_MS as a Chrome trace (open in Perfetto).
+
+    The calls include user ids and email addresses, so this needs the
+    profiling admin token in X-Profile-Token and is hidden without one.
+    """
+    token = settings.profiling_token
+    if not token or not hmac.compare_digest(x_profile_token.encode(), token.encode()):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return get_slow_query_log().export()
@@ -0,0 +1,132 @@
+import hmac
+import logging
+import time
+from urllib.parse import parse_qs
+from app.services.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, route_label
+from app.services.profiler import finish_profile, try_start_profile, write_profile
+from app.services.loaders import start_request_loaders
+from app.services.tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency per route template and status.
+
+    The route template is read from the scope after routing, so paths with
+    IDs don't create a series per ID. Streaming responses are timed until the
+    last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec((method,))
+            route = route_label(scope) or "unmatched"
+            HTTP_REQUEST_DURATION.observe((method, route, str(status)), time.perf_counter() - start)
+
+
+class TracingMiddleware:
+    """Start a trace per request and report its spans in a Server-Timing header.
+
+    The header is added when the response starts, so for streaming responses
+    it covers the work done before the first chunk.
+    """
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = start_trace(scope)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and self.server_timing:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+
+class RequestLoadersMiddleware:
+    """Give each request its own batching loaders (see app.services.loaders)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            start_request_loaders()
+        await self.app(scope, receive, send)
+
+
+class ProfilingMiddleware:
+    """Sample-profile a single request when it carries the admin profiling token.
+
+    The token goes in an X-Profile-Token header or a _profile query
+    parameter. A folded-stack profile named after the time, route and
+    duration is written to the profiling directory once the response is
+    done. Only installed when PROFILING_TOKEN is set; other requests pass
+    straight through.
+    """
+
+    def __init__(self, app, token: str, directory: str):
+        self.app = app
+        self.token = token.encode()
+        self.directory = directory
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = try_start_profile()
+        if sampler is None:
+            # Another request is being profiled
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - start
+            finish_profile(sampler)
+            route = route_label(scope) or scope["path"]
+            path = write_profile(self.directory, scope["method"], route, elapsed, sampler)
+            logger.info("Wrote profile for %s %s to %s", scope["method"], route, path)
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile-token":
+                return hmac.compare_digest(value, self.token)
+        query = scope.get("query_string", b"")
+        if b"_profile=" in query:
+            values = parse_qs(query.decode()).get("_profile", [])
+            return any(hmac.compare_digest(v.encode(), self.token) for v in values)
+        return False
@@ -58,6 +58,9 @@ class PartnerInvite(BaseModel):
 class AIAnalysisRequest(BaseModel):
     timeframe: str = "month"  # week, month, quarter, year
     include_partner: bool = False
+    # A custom range replaces the timeframe; end_date defaults to now
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
 
 
 class AIAnalysisResponse(BaseModel):
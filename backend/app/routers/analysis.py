@@ -1,84 +1,227 @@
+import asyncio
+import json
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from datetime import datetime, timedelta
+from typing import Optional
 from app.database import get_supabase
-from app.services.ai_service import AIAnalysisService
+from app.services.ai_service import AIAnalysisService, SpendingSummary
+from app.services.analysis_cache import expense_fingerprint, get_analysis_cache
+from app.services.anomaly_service import AnomalyDetector, HISTORY_DAYS
+from app.services.gemini_client import get_gemini_client
+from app.services.analytics_reads import fetch_expense_frame, iter_expense_chunks
+from app.services.expense_stats import load_partner_comparison
+from app.services.household import household_members
+from app.services.loaders import get_loaders
+from app.services.recurring_service import get_recurring_detector
 from app.models import AIAnalysisRequest
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
 
+EMPTY_ANALYSIS = {
+    "summary": "No expenses found for the selected timeframe.",
+    "insights": [],
+    "recommendations": ["Start tracking your expenses to get personalized insights."],
+    "spending_by_category": {},
+    "trends": [],
+}
+
+
+def _get_start_date(timeframe: str, now: datetime) -> datetime:
+    """Calculate the start of the analysis window for a timeframe."""
+    if timeframe == "week":
+        return now - timedelta(days=7)
+    elif timeframe == "month":
+        return now - timedelta(days=30)
+    elif timeframe == "quarter":
+        return now - timedelta(days=90)
+    elif timeframe == "year":
+        return now - timedelta(days=365)
+    return now - timedelta(days=30)
+
 
 @router.post("")
 async def analyze_expenses(user_id: str, request: AIAnalysisRequest):
-    """Get AI-powered analysis of expenses."""
+    """Get AI-powered analysis of expenses.
+
+    Results are cached per (user, timeframe, include_partner) and revalidated
+    against a fingerprint of the underlying expenses.
+    """
     supabase = get_supabase()
-    ai_service = AIAnalysisService()
+    if request.end_date and not request.start_date:
+        raise HTTPException(status_code=400, detail="end_date requires start_date")
+    start_date = request.start_date or _get_start_date(request.timeframe, datetime.now())
+
+    fingerprint = expense_fingerprint(supabase, user_id, request.include_partner, start_date, request.end_date)
+    return await get_analysis_cache().get_or_compute(
+        _analysis_cache_key(user_id, request),
+        fingerprint,
+        lambda: _run_analysis(supabase, user_id, request, start_date),
+    )
 
-    # Calculate date range based on timeframe
-    now = datetime.now()
-    if request.timeframe == "week":
-        start_date = now - timedelta(days=7)
-    elif request.timeframe == "month":
-        start_date = now - timedelta(days=30)
-    elif request.timeframe == "quarter":
-        start_date = now - timedelta(days=90)
-    elif request.timeframe == "year":
-        start_date = now - timedelta(days=365)
-    else:
-        start_date = now - timedelta(days=30)
-
-    # Get user's expenses
-    user_expenses = supabase.table("expenses").select(
-        "*, categories(name)"
-    ).eq("user_id", user_id).gte("date", start_date.isoformat()).execute()
-
-    expenses = []
-    for e in user_expenses.data or []:
-        expenses.append({
-            "amount": e["amount"],
-            "description": e["description"],
-            "category": e.get("categories", {}).get("name", "Other") if e.get("categories") else "Other",
-            "date": e["date"],
-            "merchant": e.get("merchant"),
-        })
-
-    # Get partner's expenses if requested
-    partner_expenses = []
-    if request.include_partner:
-        profile = supabase.table("profiles").select("partner_id").eq("id", user_id).single().execute()
-        partner_id = profile.data.get("partner_id") if profile.data else None
-
-        if partner_id:
-            partner_result = supabase.table("expenses").select(
-                "*, categories(name)"
-            ).eq("user_id", partner_id).gte("date", start_date.isoformat()).execute()
-
-            for e in partner_result.data or []:
-                partner_expenses.append({
-                    "amount": e["amount"],
-                    "description": e["description"],
-                    "category": e.get("categories", {}).get("name", "Other") if e.get("categories") else "Other",
-                    "date": e["date"],
-                    "merchant": e.get("merchant"),
-                })
-
-    if not expenses and not partner_expenses:
-        return {
-            "summary": "No expenses found for the selected timeframe.",
-            "insights": [],
-            "recommendations": ["Start tracking your expenses to get personalized insights."],
-            "spending_by_category": {},
-            "trends": [],
-        }
+
+@router.get("/stream")
+async def stream_analysis(
+    user_id: str,
+    timeframe: str = "month",
+    include_partner: bool = False,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+):
+    """Stream the AI analysis as server-sent events.
+
+    Emits a "local" event with spending_by_category and trends as soon as the
+    expenses are loaded, then "summary", "insight" and "recommendation" events
+    while Gemini generates them, and a final "done" event with the full result.
+    """
+    supabase = get_supabase()
+    if end_date and not start_date:
+        raise HTTPException(status_code=400, detail="end_date requires start_date")
+    request = AIAnalysisRequest(
+        timeframe=timeframe, include_partner=include_partner, start_date=start_date, end_date=end_date
+    )
+    start_date = request.start_date or _get_start_date(request.timeframe, datetime.now())
+    cache = get_analysis_cache()
+    cache_key = _analysis_cache_key(user_id, request)
+    fingerprint = expense_fingerprint(supabase, user_id, request.include_partner, start_date, request.end_date)
+
+    async def events():
+        cached = cache.peek(cache_key, fingerprint)
+        if cached is not None:
+            yield _sse("done", cached)
+            return
+
+        spending, partner_id = await _load_spending(supabase, user_id, request, start_date)
+        if not spending.count:
+            yield _sse("done", EMPTY_ANALYSIS)
+            return
+
+        # Started now, awaited after the "local" event, which needs neither
+        anomalies = asyncio.create_task(_detect_anomalies(supabase, [user_id, partner_id], start_date))
+        recurring = asyncio.create_task(get_recurring_detector().get_recurring(supabase, user_id))
+        ai_service = AIAnalysisService()
+        try:
+            async for event, data in ai_service.stream_analysis(
+                spending=spending,
+                timeframe=request.timeframe,
+                include_partner_expenses=request.include_partner,
+                anomalies=anomalies,
+                recurring=recurring,
+                period=_describe_period(request),
+            ):
+                if event == "done":
+                    cache.put(cache_key, fingerprint, data, cacheable=not ai_service.used_fallback)
+                yield _sse(event, data)
+        finally:
+            # The client may disconnect, or the other read fail, before both are awaited
+            for task in (anomalies, recurring):
+                if not task.cancel() and not task.cancelled():
+                    task.exception()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event: str, data) -> str:
+    """Format one server-sent event."""
+    if isinstance(data, BaseModel):
+        data = data.model_dump()
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _run_analysis(supabase, user_id: str, request: AIAnalysisRequest, start_date: datetime):
+    """Fetch expenses and run the AI analysis, returning (result, cacheable)."""
+    spending, partner_id = await _load_spending(supabase, user_id, request, start_date)
+
+    if not spending.count:
+        return EMPTY_ANALYSIS, True
 
     # Run AI analysis
+    ai_service = AIAnalysisService()
     analysis = await ai_service.analyze_expenses(
-        expenses=expenses,
+        spending=spending,
         timeframe=request.timeframe,
         include_partner_expenses=request.include_partner,
-        partner_expenses=partner_expenses if request.include_partner else None,
+        anomalies=await _detect_anomalies(supabase, [user_id, partner_id], start_date),
+        recurring=await get_recurring_detector().get_recurring(supabase, user_id),
+        period=_describe_period(request),
     )
 
-    return analysis
+    return analysis, not ai_service.used_fallback
+
+
+async def _load_spending(
+    supabase, user_id: str, request: AIAnalysisRequest, start_date: datetime
+) -> tuple[SpendingSummary, Optional[str]]:
+    """Fold the user's (and optionally partner's) expenses in the analysis window into a SpendingSummary."""
+    partner_id = None
+    if request.include_partner:
+        partner_id = next((m for m in household_members(supabase, user_id) if m != user_id), None)
+
+    # Chunk by chunk, so a long window never sits in memory as one list
+    spending = SpendingSummary()
+    members = [m for m in (user_id, partner_id) if m]
+    async for chunk in iter_expense_chunks(supabase, members, start_date, request.end_date):
+        spending.add(chunk)
+    return spending, partner_id
+
+
+def _analysis_cache_key(user_id: str, request: AIAnalysisRequest) -> tuple:
+    if request.start_date is None:
+        return (user_id, request.timeframe, request.include_partner)
+    end = request.end_date.isoformat() if request.end_date else None
+    return (user_id, request.start_date.isoformat(), end, request.include_partner)
+
+
+def _describe_period(request: AIAnalysisRequest) -> Optional[str]:
+    """The custom range for the prompt, or None for a timeframe."""
+    if request.start_date is None:
+        return None
+    end = request.end_date or datetime.now()
+    return f"the period from {request.start_date:%Y-%m-%d} to {end:%Y-%m-%d}"
+
+
+async def _detect_anomalies(supabase, user_ids: list[Optional[str]], start_date: datetime) -> list[dict]:
+    """Run the local anomaly detector over the household's recent history."""
+    history_start = datetime.now() - timedelta(days=HISTORY_DAYS)
+    history = await fetch_expense_frame(supabase, [uid for uid in user_ids if uid], history_start)
+    return AnomalyDetector.detect(history, start_date)
+
+
+@router.get("/anomalies")
+async def get_anomalies(user_id: str, timeframe: str = "month", include_partner: bool = False):
+    """Get unusual charges and category spikes detected without the AI."""
+    supabase = get_supabase()
+    start_date = _get_start_date(timeframe, datetime.now())
+
+    user_ids = [user_id]
+    if include_partner:
+        profile = await get_loaders().profiles.load(user_id)
+        user_ids.append(profile.get("partner_id") if profile else None)
+
+    return {
+        "timeframe": timeframe,
+        "anomalies": await _detect_anomalies(supabase, user_ids, start_date),
+    }
+
+
+@router.get("/recurring")
+async def get_recurring_charges(user_id: str, include_lapsed: bool = False):
+    """Get recurring charges and subscriptions detected in the household's history."""
+    supabase = get_supabase()
+
+    recurring = await get_recurring_detector().get_recurring(supabase, user_id)
+    if not include_lapsed:
+        recurring = [r for r in recurring if r["status"] == "active"]
+
+    return {
+        "recurring": recurring,
+        "monthly_total": round(sum(r["monthly_cost"] for r in recurring if r["status"] == "active"), 2),
+    }
 
 
 @router.get("/comparison")
@@ -87,64 +230,16 @@ async def compare_with_partner(user_id: str, timeframe: str = "month"):
     supabase = get_supabase()
 
     # Get partner ID
-    profile = supabase.table("profiles").select("partner_id").eq("id", user_id).single().execute()
-    partner_id = profile.data.get("partner_id") if profile.data else None
+    profile = await get_loaders().profiles.load(user_id)
+    partner_id = profile.get("partner_id") if profile else None
 
     if not partner_id:
         raise HTTPException(status_code=400, detail="No partner linked")
 
-    # Calculate date range
-    now = datetime.now()
-    if timeframe == "week":
-        start_date = now - timedelta(days=7)
-    elif timeframe == "month":
-        start_date = now - timedelta(days=30)
-    elif timeframe == "quarter":
-        start_date = now - timedelta(days=90)
-    else:
-        start_date = now - timedelta(days=30)
-
-    # Get both users' expenses
-    user_expenses = supabase.table("expenses").select(
-        "amount, categories(name)"
-    ).eq("user_id", user_id).gte("date", start_date.isoformat()).execute()
-
-    partner_expenses = supabase.table("expenses").select(
-        "amount, categories(name)"
-    ).eq("user_id", partner_id).gte("date", start_date.isoformat()).execute()
-
-    # Calculate totals and by category
-    def calculate_breakdown(expenses):
-        total = 0
-        by_category = {}
-        for e in expenses or []:
-            amount = e["amount"]
-            total += amount
-            cat = e.get("categories", {}).get("name", "Other") if e.get("categories") else "Other"
-            by_category[cat] = by_category.get(cat, 0) + amount
-        return {"total": total, "by_category": by_category}
-
-    user_breakdown = calculate_breakdown(user_expenses.data)
-    partner_breakdown = calculate_breakdown(partner_expenses.data)
-
-    combined_total = user_breakdown["total"] + partner_breakdown["total"]
+    return await load_partner_comparison(supabase, user_id, partner_id, timeframe)
 
-    return {
-        "user": {
-            "total": user_breakdown["total"],
-            "percentage": (user_breakdown["total"] / combined_total * 100) if combined_total > 0 else 0,
-            "by_category": user_breakdown["by_category"],
-        },
-        "partner": {
-            "total": partner_breakdown["total"],
-            "percentage": (partner_breakdown["total"] / combined_total * 100) if combined_total > 0 else 0,
-            "by_category": partner_breakdown["by_category"],
-        },
-        "combined": {
-            "total": combined_total,
-            "by_category": {
-                cat: user_breakdown["by_category"].get(cat, 0) + partner_breakdown["by_category"].get(cat, 0)
-                for cat in set(user_breakdown["by_category"]) | set(partner_breakdown["by_category"])
-            },
-        },
-    }
+
+@router.get("/gemini/metrics")
+async def get_gemini_metrics():
+    """Get latency, error and circuit breaker counters for Gemini calls."""
+    return get_gemini_client().snapshot()
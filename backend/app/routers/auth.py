@@ -1,8 +1,8 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
 from fastapi.responses import RedirectResponse
-from google_auth_oauthlib.flow import Flow
 from app.config import get_settings
 from app.database import get_supabase
+from app.services.metrics import upstream_call
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 settings = get_settings()
@@ -17,8 +17,10 @@ SCOPES = [
 ]
 
 
-def get_google_flow() -> Flow:
+def get_google_flow():
     """Create Google OAuth flow."""
+    from google_auth_oauthlib.flow import Flow
+
     client_config = {
         "web": {
             "client_id": settings.google_client_id,
@@ -54,7 +56,8 @@ async def google_callback(request: Request, code: str, state: str):
     """Handle Google OAuth callback."""
     try:
         flow = get_google_flow()
-        flow.fetch_token(code=code)
+        with upstream_call("oauth", "token_exchange"):
+            flow.fetch_token(code=code)
 
         credentials = flow.credentials
         user_id = state  # User ID passed in state
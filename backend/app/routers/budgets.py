@@ -0,0 +1,116 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+from app.database import get_supabase
+from app.services.budget_service import describe_budget
+from app.services.household import household_members
+
+router = APIRouter(prefix="/budgets", tags=["budgets"])
+
+
+class BudgetCreate(BaseModel):
+    amount_limit: float = Field(gt=0)
+    category_id: Optional[str] = None  # None = all spending
+    scope: Literal["personal", "household"] = "personal"
+    period: Literal["week", "month", "quarter", "year"] = "month"
+    thresholds: list[float] = [0.5, 0.8, 1.0]
+
+
+class BudgetUpdate(BaseModel):
+    amount_limit: Optional[float] = Field(default=None, gt=0)
+    scope: Optional[Literal["personal", "household"]] = None
+    period: Optional[Literal["week", "month", "quarter", "year"]] = None
+    thresholds: Optional[list[float]] = None
+
+
+@router.get("")
+async def get_budgets(user_id: str):
+    """Get the user's and household's budgets with current-period spending.
+
+    Spending comes from counters kept up to date by a trigger on expenses,
+    so no expenses are scanned here.
+    """
+    supabase = get_supabase()
+
+    result = supabase.rpc("budget_status", {"p_user_id": user_id}).execute()
+    return [describe_budget(row) for row in result.data or []]
+
+
+@router.get("/events")
+async def get_budget_events(user_id: str, limit: int = 50):
+    """Get the most recent threshold crossings for the user's visible budgets."""
+    supabase = get_supabase()
+
+    budgets = supabase.rpc("budget_status", {"p_user_id": user_id}).execute()
+    budget_ids = [b["id"] for b in budgets.data or []]
+    if not budget_ids:
+        return []
+
+    result = supabase.table("budget_events").select("*").in_(
+        "budget_id", budget_ids
+    ).order("created_at", desc=True).limit(limit).execute()
+
+    return result.data or []
+
+
+@router.post("")
+async def create_budget(budget: BudgetCreate, user_id: str):
+    """Create a budget and seed its counter for the current period."""
+    supabase = get_supabase()
+
+    # A default category, or one of the user's or their partner's own
+    if budget.category_id is not None:
+        category = supabase.table("categories").select("user_id").eq("id", budget.category_id).execute()
+        owner = category.data[0]["user_id"] if category.data else ""
+        if owner is not None and owner not in household_members(supabase, user_id):
+            raise HTTPException(status_code=404, detail="Category not found")
+
+    result = supabase.table("budgets").insert({
+        "user_id": user_id,
+        "category_id": budget.category_id,
+        "scope": budget.scope,
+        "period": budget.period,
+        "amount_limit": budget.amount_limit,
+        "thresholds": sorted(budget.thresholds),
+    }).execute()
+
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Failed to create budget")
+
+    # One-off scan of the current period; from here on the trigger keeps it current
+    supabase.rpc("rebuild_budget_counter", {"p_budget_id": result.data[0]["id"]}).execute()
+
+    return result.data[0]
+
+
+@router.put("/{budget_id}")
+async def update_budget(budget_id: str, budget: BudgetUpdate, user_id: str):
+    """Update a budget (only the owner's own budgets)."""
+    supabase = get_supabase()
+
+    update_data = budget.model_dump(exclude_unset=True)
+    if "thresholds" in update_data:
+        update_data["thresholds"] = sorted(update_data["thresholds"])
+
+    # Ownership is part of the filter: nothing updated means not found
+    result = supabase.table("budgets").update(update_data).eq("id", budget_id).eq("user_id", user_id).execute()
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Budget not found")
+
+    # Scope and period change which expenses count, so the counter is rebuilt
+    if "scope" in update_data or "period" in update_data:
+        supabase.rpc("rebuild_budget_counter", {"p_budget_id": budget_id}).execute()
+
+    return result.data[0]
+
+
+@router.delete("/{budget_id}")
+async def delete_budget(budget_id: str, user_id: str):
+    """Delete a budget along with its counters and events."""
+    supabase = get_supabase()
+
+    result = supabase.table("budgets").delete().eq("id", budget_id).eq("user_id", user_id).execute()
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Budget not found")
+
+    return {"message": "Budget deleted"}
@@ -1,10 +1,18 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 from app.database import get_supabase
+from app.services.cache import Cache
+from app.services.category_classifier import get_category_classifier
+from app.services.expense_stats import forget_stats
+from app.services.loaders import get_loaders
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
+# Default + custom categories per user, dropped when the user edits theirs
+category_cache = Cache("categories", ttl=3600)
+
 
 class CategoryCreate(BaseModel):
     name: str
@@ -21,14 +29,28 @@ class CategoryUpdate(BaseModel):
 @router.get("")
 async def get_categories(user_id: str):
     """Get all categories (default + user custom)."""
-    supabase = get_supabase()
+    return await load_categories(get_supabase(), user_id)
+
+
+async def load_categories(supabase, user_id: str) -> list[dict]:
+    """Default and custom categories of a user, by name, through category_cache."""
+    cached = category_cache.get(user_id)
+    if cached is not None:
+        return cached
 
     # Get default categories (user_id is null) and user's custom categories
-    result = supabase.table("categories").select("*").or_(
+    query = supabase.table("categories").select("*").or_(
         f"user_id.is.null,user_id.eq.{user_id}"
-    ).order("name").execute()
+    ).order("name")
+    result = await asyncio.to_thread(query.execute)
+
+    return category_cache.set(user_id, result.data or [])
 
-    return result.data or []
+
+@router.get("/classifier/metrics")
+async def get_classifier_metrics():
+    """Get accuracy and latency counters for the local category classifier."""
+    return get_category_classifier().metrics.snapshot()
 
 
 @router.post("")
@@ -37,11 +59,7 @@ async def create_category(category: CategoryCreate, user_id: str):
     supabase = get_supabase()
 
     # Check if category with same name exists for this user
-    existing = supabase.table("categories").select("id").eq("name", category.name).or_(
-        f"user_id.is.null,user_id.eq.{user_id}"
-    ).execute()
-
-    if existing.data:
+    if await get_loaders().categories.load((user_id, category.name)):
         raise HTTPException(status_code=400, detail="Category with this name already exists")
 
     result = supabase.table("categories").insert({
@@ -50,6 +68,7 @@ async def create_category(category: CategoryCreate, user_id: str):
         "icon": category.icon,
         "user_id": user_id,
     }).execute()
+    category_cache.delete(user_id)
 
     return result.data[0] if result.data else None
 
@@ -59,19 +78,15 @@ async def update_category(category_id: str, category: CategoryUpdate, user_id: s
     """Update a custom category (only user's own categories)."""
     supabase = get_supabase()
 
-    # Verify ownership (can only update own categories, not defaults)
-    existing = supabase.table("categories").select("user_id").eq("id", category_id).single().execute()
-
-    if not existing.data:
-        raise HTTPException(status_code=404, detail="Category not found")
-
-    if existing.data.get("user_id") != user_id:
-        raise HTTPException(status_code=403, detail="Cannot modify this category")
-
+    # Ownership is part of the filter, so default and other users' categories match nothing
     update_data = category.model_dump(exclude_unset=True)
+    result = supabase.table("categories").update(update_data).eq("id", category_id).eq("user_id", user_id).execute()
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Category not found")
 
-    result = supabase.table("categories").update(update_data).eq("id", category_id).execute()
-    return result.data[0] if result.data else None
+    category_cache.delete(user_id)
+    forget_stats(supabase, user_id)
+    return result.data[0]
 
 
 @router.delete("/{category_id}")
@@ -79,19 +94,12 @@ async def delete_category(category_id: str, user_id: str):
     """Delete a custom category."""
     supabase = get_supabase()
 
-    # Verify ownership
-    existing = supabase.table("categories").select("user_id").eq("id", category_id).single().execute()
-
-    if not existing.data:
+    # Uncategorizes its expenses and deletes it in one transaction
+    result = supabase.rpc("delete_category", {"p_category_id": category_id, "p_user_id": user_id}).execute()
+    if not result.data:
         raise HTTPException(status_code=404, detail="Category not found")
 
-    if existing.data.get("user_id") != user_id:
-        raise HTTPException(status_code=403, detail="Cannot delete this category")
-
-    # Set expenses with this category to null
-    supabase.table("expenses").update({"category_id": None}).eq("category_id", category_id).execute()
-
-    # Delete the category
-    supabase.table("categories").delete().eq("id", category_id).execute()
+    category_cache.delete(user_id)
+    forget_stats(supabase, user_id)
 
     return {"message": "Category deleted"}
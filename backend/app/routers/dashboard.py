@@ -0,0 +1,67 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from app.database import get_supabase
+from app.routers.categories import load_categories
+from app.services.expense_stats import load_expense_stats, load_partner_comparison
+from app.services.loaders import get_loaders
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+
+@router.get("")
+async def get_dashboard(
+    user_id: str,
+    include_partner: bool = False,
+    timeframe: str = "month",
+    limit: int = Query(default=100, le=500),
+):
+    """Everything a dashboard page shows, in one response.
+
+    Resolves the household once, then loads partner status, stats, recent
+    expenses, categories and (for the household view) the partner comparison
+    concurrently, so the page waits for the slowest of them rather than the sum.
+    """
+    supabase = get_supabase()
+    loaders = get_loaders()
+
+    profile = await loaders.profiles.load(user_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="User not found")
+    partner_id = profile.get("partner_id")
+    members = sorted([user_id, partner_id]) if include_partner and partner_id else [user_id]
+
+    async def partner_status() -> dict:
+        partner = await loaders.profiles.load(partner_id) if partner_id else None
+        return {
+            "has_partner": partner_id is not None,
+            "partner": {key: partner[key] for key in ("id", "email", "name")} if partner else None,
+        }
+
+    async def recent_expenses() -> list[dict]:
+        query = supabase.table("expenses").select("*, categories(name, color, icon)")
+        if len(members) > 1:
+            query = query.in_("user_id", members)
+        else:
+            query = query.eq("user_id", user_id)
+        result = await asyncio.to_thread(query.order("date", desc=True).limit(limit).execute)
+        return result.data or []
+
+    async def comparison() -> dict | None:
+        if len(members) < 2:
+            return None
+        return await load_partner_comparison(supabase, user_id, partner_id, timeframe)
+
+    status, stats, expenses, categories, compared = await asyncio.gather(
+        partner_status(),
+        load_expense_stats(supabase, members, timeframe),
+        recent_expenses(),
+        load_categories(supabase, user_id),
+        comparison(),
+    )
+    return {
+        "partner_status": status,
+        "stats": stats,
+        "recent_expenses": expenses,
+        "categories": categories,
+        "comparison": compared,
+    }
@@ -1,9 +1,20 @@
+import base64
+import json
+import uuid
 from fastapi import APIRouter, HTTPException, Query
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Optional
 from app.models import ExpenseCreate, ExpenseUpdate, Expense
 from app.database import get_supabase
 from app.services.ai_service import AIAnalysisService
+from app.services.category_classifier import get_category_classifier
+from app.services.recurring_service import get_recurring_detector
+from app.services.analysis_cache import expense_fingerprint
+from app.services.analytics_reads import fetch_expense_frame
+from app.services.forecast_service import HISTORY_DAYS as FORECAST_HISTORY_DAYS, SpendForecaster, get_forecast_cache
+from app.services.expense_stats import forget_stats, load_expense_stats
+from app.services.household import household_members
+from app.services.loaders import get_loaders
 
 router = APIRouter(prefix="/expenses", tags=["expenses"])
 
@@ -29,8 +40,8 @@ async def get_expenses(
     # Build user filter
     if include_partner:
         # Get partner ID
-        profile = supabase.table("profiles").select("partner_id").eq("id", user_id).single().execute()
-        partner_id = profile.data.get("partner_id") if profile.data else None
+        profile = await get_loaders().profiles.load(user_id)
+        partner_id = profile.get("partner_id") if profile else None
 
         if partner_id:
             query = query.in_("user_id", [user_id, partner_id])
@@ -55,27 +66,72 @@ async def get_expenses(
     return result.data
 
 
+@router.get("/search")
+async def search_expenses(
+    user_id: str,
+    q: str = Query(min_length=1, max_length=200),
+    include_partner: bool = False,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+):
+    """Search expense merchants and descriptions, best matches first.
+
+    Words match as prefixes ("amaz" finds Amazon) and near misses match by
+    trigram similarity. Pass `next_cursor` back as `cursor` for the next page.
+    """
+    supabase = get_supabase()
+
+    params = {"p_query": q, "p_limit": limit}
+    if cursor:
+        try:
+            score, after_date, after_id = json.loads(base64.urlsafe_b64decode(cursor))
+            params.update(
+                p_after_score=float(score),
+                p_after_date=datetime.fromisoformat(after_date).isoformat(),
+                p_after_id=str(uuid.UUID(after_id)),
+            )
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    params["p_user_ids"] = household_members(supabase, user_id) if include_partner else [user_id]
+
+    result = supabase.rpc("search_expenses", params).execute()
+    rows = [{**row["expense"], "categories": row["category"], "score": row["score"]} for row in result.data or []]
+
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = base64.urlsafe_b64encode(json.dumps([last["score"], last["date"], last["id"]]).encode()).decode()
+    return {"results": rows, "next_cursor": next_cursor}
+
+
 @router.post("")
 async def create_expense(expense: ExpenseCreate, user_id: str):
     """Create a new expense."""
     supabase = get_supabase()
 
+    classifier = get_category_classifier()
+    categories = get_loaders().categories
+
     # Get category ID if category name provided
     category_id = None
+    category_name = None
+    labeled_by_user = False
     if expense.category:
-        cat_result = supabase.table("categories").select("id").eq("name", expense.category).limit(1).execute()
-        if cat_result.data:
-            category_id = cat_result.data[0]["id"]
+        found = await categories.load((user_id, expense.category))
+        if found:
+            category_id = found["id"]
+            category_name = expense.category
+            labeled_by_user = True
 
-    # If no category, use AI to suggest one
+    # If no category, classify locally and fall back to AI when unsure
     if not category_id and expense.description:
-        ai_service = AIAnalysisService()
-        suggested_category = await ai_service.categorize_expense(
-            expense.description, expense.merchant
+        suggested_category = await classifier.suggest_category(
+            supabase, user_id, expense.description, expense.merchant, AIAnalysisService()
         )
-        cat_result = supabase.table("categories").select("id").eq("name", suggested_category).limit(1).execute()
-        if cat_result.data:
-            category_id = cat_result.data[0]["id"]
+        found = await categories.load((user_id, suggested_category))
+        if found:
+            category_id = found["id"]
+            category_name = suggested_category
 
     data = {
         "user_id": user_id,
@@ -89,6 +145,12 @@ async def create_expense(expense: ExpenseCreate, user_id: str):
     }
 
     result = supabase.table("expenses").insert(data).execute()
+    if result.data:
+        # Suggestions are never learned back, only categories the user chose
+        if labeled_by_user:
+            classifier.learn(user_id, result.data[0]["id"], expense.description, expense.merchant, category_name)
+        get_recurring_detector().observe(user_id, {**result.data[0], "category": category_name})
+        forget_stats(supabase, user_id)
     return result.data[0] if result.data else None
 
 
@@ -97,28 +159,30 @@ async def update_expense(expense_id: str, expense: ExpenseUpdate, user_id: str):
     """Update an expense."""
     supabase = get_supabase()
 
-    # Verify ownership
-    existing = supabase.table("expenses").select("user_id").eq("id", expense_id).single().execute()
-    if not existing.data or existing.data["user_id"] != user_id:
+    # Ownership check, category lookup and update in one call
+    result = supabase.rpc("update_expense", {
+        "p_expense_id": expense_id,
+        "p_user_id": user_id,
+        "p_changes": expense.model_dump(mode="json", exclude_unset=True),
+    }).execute()
+    if not result.data:
         raise HTTPException(status_code=404, detail="Expense not found")
 
-    update_data = expense.model_dump(exclude_unset=True)
-
-    # Handle category update
-    if "category" in update_data:
-        category_name = update_data.pop("category")
-        if category_name:
-            cat_result = supabase.table("categories").select("id").eq("name", category_name).limit(1).execute()
-            if cat_result.data:
-                update_data["category_id"] = cat_result.data[0]["id"]
-
-    if "date" in update_data and update_data["date"]:
-        update_data["date"] = update_data["date"].isoformat()
-
-    update_data["updated_at"] = datetime.now().isoformat()
-
-    result = supabase.table("expenses").update(update_data).eq("id", expense_id).execute()
-    return result.data[0] if result.data else None
+    row = result.data[0]
+    updated = row["expense"]
+
+    # A changed category is a correction for the local classifier
+    get_category_classifier().learn(
+        user_id,
+        updated["id"],
+        updated["description"],
+        updated.get("merchant"),
+        row["category"],
+        previous_category=row["previous_category"],
+    )
+    get_recurring_detector().observe(user_id, {**updated, "category": row["category"]})
+    forget_stats(supabase, user_id)
+    return updated
 
 
 @router.delete("/{expense_id}")
@@ -126,100 +190,57 @@ async def delete_expense(expense_id: str, user_id: str):
     """Delete an expense."""
     supabase = get_supabase()
 
-    # Verify ownership
-    existing = supabase.table("expenses").select("user_id").eq("id", expense_id).single().execute()
-    if not existing.data or existing.data["user_id"] != user_id:
+    # Ownership is part of the filter: nothing deleted means not found
+    result = supabase.table("expenses").delete().eq("id", expense_id).eq("user_id", user_id).execute()
+    if not result.data:
         raise HTTPException(status_code=404, detail="Expense not found")
 
-    supabase.table("expenses").delete().eq("id", expense_id).execute()
+    get_recurring_detector().forget_expense(user_id, expense_id)
+    forget_stats(supabase, user_id)
     return {"message": "Expense deleted"}
 
 
+@router.get("/forecast")
+async def get_spend_forecast(user_id: str):
+    """Project end-of-month and end-of-quarter household spend per category.
+
+    Cached per household until its expenses change or the day rolls over.
+    """
+    supabase = get_supabase()
+    since = datetime.now() - timedelta(days=FORECAST_HISTORY_DAYS)
+
+    fingerprint = (date.today().isoformat(), *expense_fingerprint(supabase, user_id, True, since))
+    return await get_forecast_cache().get_or_compute(
+        user_id,
+        fingerprint,
+        lambda: _run_forecast(supabase, user_id, since),
+        stale_while_revalidate=False,
+    )
+
+
+async def _run_forecast(supabase, user_id: str, since: datetime):
+    """Load household history and recurring charges and build the forecast."""
+    expenses = await fetch_expense_frame(supabase, household_members(supabase, user_id), since)
+    recurring = await get_recurring_detector().get_recurring(supabase, user_id)
+    return SpendForecaster.forecast(expenses, recurring), True
+
+
 @router.get("/stats")
 async def get_expense_stats(
     user_id: str,
     include_partner: bool = False,
     timeframe: str = "month",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
 ):
-    """Get expense statistics for dashboard."""
-    supabase = get_supabase()
-
-    # Calculate date range
-    now = datetime.now()
-    if timeframe == "week":
-        start_date = now - timedelta(days=7)
-    elif timeframe == "month":
-        start_date = now - timedelta(days=30)
-    elif timeframe == "quarter":
-        start_date = now - timedelta(days=90)
-    elif timeframe == "year":
-        start_date = now - timedelta(days=365)
-    else:
-        start_date = now - timedelta(days=30)
+    """Get expense statistics for dashboard.
 
-    # Get expenses
-    query = supabase.table("expenses").select(
-        "*, categories(name, color)"
-    ).gte("date", start_date.isoformat())
-
-    if include_partner:
-        profile = supabase.table("profiles").select("partner_id").eq("id", user_id).single().execute()
-        partner_id = profile.data.get("partner_id") if profile.data else None
-        if partner_id:
-            query = query.in_("user_id", [user_id, partner_id])
-        else:
-            query = query.eq("user_id", user_id)
-    else:
-        query = query.eq("user_id", user_id)
-
-    result = query.execute()
-    expenses = result.data or []
-
-    # Calculate stats
-    total_spent = sum(e["amount"] for e in expenses)
-    days_in_range = (now - start_date).days or 1
-    average_daily = total_spent / days_in_range
-
-    # Get this month's spending
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    this_month = sum(
-        e["amount"] for e in expenses
-        if datetime.fromisoformat(e["date"].replace("Z", "+00:00")) >= month_start
-    )
+    start_date (and optionally end_date) select a custom range instead of the
+    timeframe. Stats are aggregated server-side, so any range is covered in full.
+    """
+    supabase = get_supabase()
 
-    # Top categories
-    category_totals = {}
-    for e in expenses:
-        cat = e.get("categories", {})
-        cat_name = cat.get("name", "Other") if cat else "Other"
-        cat_color = cat.get("color", "#64748b") if cat else "#64748b"
-        if cat_name not in category_totals:
-            category_totals[cat_name] = {"name": cat_name, "color": cat_color, "amount": 0}
-        category_totals[cat_name]["amount"] += e["amount"]
-
-    top_categories = sorted(
-        category_totals.values(), key=lambda x: x["amount"], reverse=True
-    )[:5]
-
-    # Monthly trend (last 6 months)
-    monthly_trend = []
-    for i in range(5, -1, -1):
-        month_date = now - timedelta(days=30 * i)
-        month_key = month_date.strftime("%Y-%m")
-        month_total = sum(
-            e["amount"] for e in expenses
-            if e["date"].startswith(month_key)
-        )
-        monthly_trend.append({
-            "month": month_date.strftime("%b"),
-            "amount": month_total,
-        })
-
-    return {
-        "total_spent": total_spent,
-        "total_this_month": this_month,
-        "average_daily": average_daily,
-        "top_categories": top_categories,
-        "recent_expenses": expenses[:10],
-        "monthly_trend": monthly_trend,
-    }
+    if end_date and not start_date:
+        raise HTTPException(status_code=400, detail="end_date requires start_date")
+    members = household_members(supabase, user_id) if include_partner else [user_id]
+    return await load_expense_stats(supabase, members, timeframe, start_date, end_date)
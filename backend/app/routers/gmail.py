@@ -1,11 +1,18 @@
+import logging
 from fastapi import APIRouter, HTTPException
 from datetime import datetime, timedelta
-from typing import Optional
 from app.database import get_supabase
 from app.services.gmail_service import GmailService, ExpenseExtractor
 from app.services.ai_service import AIAnalysisService
+from app.services.category_classifier import get_category_classifier
+from app.services.email_reprocessing import reprocess_stored_emails
+from app.services.email_store import EmailStore, get_email_store
+from app.services.expense_stats import forget_stats
+from app.services.loaders import get_loaders
+from app.services.recurring_service import get_recurring_detector
 
 router = APIRouter(prefix="/gmail", tags=["gmail"])
+logger = logging.getLogger(__name__)
 
 
 @router.post("/sync")
@@ -17,69 +24,95 @@ async def sync_gmail_expenses(
     supabase = get_supabase()
 
     # Get user's Gmail refresh token
-    profile = supabase.table("profiles").select(
-        "gmail_connected, gmail_refresh_token"
-    ).eq("id", user_id).single().execute()
+    profile = await get_loaders().profiles.load(user_id)
 
-    if not profile.data:
+    if not profile:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not profile.data.get("gmail_connected") or not profile.data.get("gmail_refresh_token"):
+    if not profile.get("gmail_connected") or not profile.get("gmail_refresh_token"):
         raise HTTPException(status_code=400, detail="Gmail not connected")
 
     try:
         # Initialize Gmail service
-        gmail_service = GmailService(profile.data["gmail_refresh_token"])
+        gmail_service = GmailService(profile["gmail_refresh_token"])
         ai_service = AIAnalysisService()
+        classifier = get_category_classifier()
+        recurring = get_recurring_detector()
 
         # Get or create expense label
-        label_id = gmail_service.get_or_create_expense_label()
+        gmail_service.get_or_create_expense_label()
 
-        # Fetch labeled emails
+        # List labeled emails
         after_date = datetime.now() - timedelta(days=days_back)
-        emails = gmail_service.get_labeled_emails(label_id, after_date)
+        message_ids = gmail_service.list_labeled_message_ids(after_date)
 
         # Get existing email IDs to avoid duplicates
         existing = supabase.table("expenses").select("email_id").eq("user_id", user_id).not_.is_("email_id", "null").execute()
         existing_email_ids = {e["email_id"] for e in existing.data} if existing.data else set()
 
-        # Process emails and extract expenses
-        new_expenses = []
-        for email in emails:
-            if email["id"] in existing_email_ids:
-                continue
-
+        # Messages already stored are read from disk instead of Gmail. Pruned
+        # here too, since every sync may add messages.
+        store = get_email_store()
+        if store:
+            store.prune(user_id)
+        stored = store.index(user_id) if store else {}
+
+        # Extract and classify expenses from new emails
+        extracted = []
+        for message_id in message_ids:
+            if message_id in stored:
+                if message_id in existing_email_ids:
+                    continue
+                message = store.read(stored[message_id])
+            else:
+                # Imported messages are still fetched once, to backfill the store
+                message = gmail_service.get_message(message_id)
+                if store:
+                    _store_message(store, user_id, message)
+                if message_id in existing_email_ids:
+                    continue
+
+            email = GmailService.parse_email(message)
             expense_data = ExpenseExtractor.extract_expense(email)
             if expense_data:
-                # Get AI-suggested category
-                category = await ai_service.categorize_expense(
+                # Classify locally, falling back to AI when unsure
+                category = await classifier.suggest_category(
+                    supabase,
+                    user_id,
                     expense_data.description,
-                    expense_data.merchant
+                    expense_data.merchant,
+                    ai_service,
                 )
+                extracted.append((email, expense_data, category))
 
-                # Get category ID
-                cat_result = supabase.table("categories").select("id").eq("name", category).limit(1).execute()
-                category_id = cat_result.data[0]["id"] if cat_result.data else None
-
-                # Insert expense
-                expense_record = {
-                    "user_id": user_id,
-                    "amount": expense_data.amount,
-                    "description": expense_data.description,
-                    "category_id": category_id,
-                    "merchant": expense_data.merchant,
-                    "date": expense_data.date.isoformat() if expense_data.date else datetime.now().isoformat(),
-                    "source": "gmail",
-                    "email_id": email["id"],
-                }
-
-                result = supabase.table("expenses").insert(expense_record).execute()
-                if result.data:
-                    new_expenses.append(result.data[0])
+        # Resolve all category names with one query
+        categories = await get_loaders().categories.load_many((user_id, category) for _, _, category in extracted)
+
+        new_expenses = []
+        for (email, expense_data, category), found in zip(extracted, categories):
+            # Insert expense
+            expense_record = {
+                "user_id": user_id,
+                "amount": expense_data.amount,
+                "description": expense_data.description,
+                "category_id": found["id"] if found else None,
+                "merchant": expense_data.merchant,
+                "date": expense_data.date.isoformat() if expense_data.date else datetime.now().isoformat(),
+                "source": "gmail",
+                "email_id": email["id"],
+            }
+
+            result = supabase.table("expenses").insert(expense_record).execute()
+            if result.data:
+                new_expenses.append(result.data[0])
+                recurring.observe(user_id, {**result.data[0], "category": category})
+
+        if new_expenses:
+            forget_stats(supabase, user_id)
 
         return {
             "message": f"Synced {len(new_expenses)} new expenses from Gmail",
-            "emails_processed": len(emails),
+            "emails_processed": len(message_ids),
             "new_expenses": len(new_expenses),
             "expenses": new_expenses,
         }
@@ -88,18 +121,44 @@ async def sync_gmail_expenses(
         raise HTTPException(status_code=500, detail=f"Gmail sync failed: {str(e)}")
 
 
+@router.post("/reprocess")
+async def reprocess_gmail_expenses(user_id: str, include_new: bool = False):
+    """Re-extract and re-categorize expenses from the user's stored Gmail messages.
+
+    Reads only the local email store, so it costs no Gmail API quota.
+    """
+    supabase = get_supabase()
+
+    store = get_email_store()
+    if store is None:
+        raise HTTPException(status_code=400, detail="Email store is disabled")
+
+    profile = await get_loaders().profiles.load(user_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        return await reprocess_stored_emails(supabase, user_id, store, include_new)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reprocessing failed: {str(e)}")
+
+
+def _store_message(store: EmailStore, user_id: str, message: dict) -> None:
+    # A full disk shouldn't fail the sync; the message is stored on a later one
+    try:
+        store.put(user_id, message)
+    except OSError:
+        logger.warning("Could not store Gmail message %s", message.get("id"), exc_info=True)
+
+
 @router.get("/status")
 async def get_gmail_status(user_id: str):
     """Check Gmail connection status for a user."""
-    supabase = get_supabase()
-
-    profile = supabase.table("profiles").select(
-        "gmail_connected"
-    ).eq("id", user_id).single().execute()
+    profile = await get_loaders().profiles.load(user_id)
 
-    if not profile.data:
+    if not profile:
         raise HTTPException(status_code=404, detail="User not found")
 
     return {
-        "connected": profile.data.get("gmail_connected", False)
+        "connected": profile.get("gmail_connected", False)
     }
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from app.database import get_supabase
 from app.models import PartnerInvite
+from app.services.household import forget_household
+from app.services.loaders import get_loaders
 
 router = APIRouter(prefix="/partners", tags=["partners"])
 
@@ -11,8 +13,8 @@ async def invite_partner(user_id: str, invite: PartnerInvite):
     supabase = get_supabase()
 
     # Check if user already has a partner
-    profile = supabase.table("profiles").select("partner_id").eq("id", user_id).single().execute()
-    if profile.data and profile.data.get("partner_id"):
+    profile = await get_loaders().profiles.load(user_id)
+    if profile and profile.get("partner_id"):
         raise HTTPException(status_code=400, detail="You already have a partner linked")
 
     # Check if invite already exists
@@ -36,11 +38,11 @@ async def get_invites(user_id: str):
     supabase = get_supabase()
 
     # Get user's email
-    profile = supabase.table("profiles").select("email").eq("id", user_id).single().execute()
-    if not profile.data:
+    profile = await get_loaders().profiles.load(user_id)
+    if not profile:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user_email = profile.data["email"]
+    user_email = profile["email"]
 
     # Get sent invites
     sent = supabase.table("partner_invites").select("*").eq("inviter_id", user_id).eq("status", "pending").execute()
@@ -61,27 +63,23 @@ async def accept_invite(invite_id: str, user_id: str):
     """Accept a partner invitation."""
     supabase = get_supabase()
 
-    # Get the invite
-    invite = supabase.table("partner_invites").select("*").eq("id", invite_id).single().execute()
-    if not invite.data:
-        raise HTTPException(status_code=404, detail="Invite not found")
+    # Checks, linking both profiles, closing the invite and rebuilding
+    # household budgets happen in one transaction
+    result = supabase.rpc("accept_partner_invite", {"p_invite_id": invite_id, "p_user_id": user_id}).execute()
+    outcome = result.data[0] if result.data else {"status": "not_found"}
 
-    if invite.data["status"] != "pending":
+    if outcome["status"] == "not_found":
+        raise HTTPException(status_code=404, detail="Invite not found")
+    if outcome["status"] == "not_pending":
         raise HTTPException(status_code=400, detail="Invite is no longer pending")
-
-    # Verify the current user is the invitee
-    profile = supabase.table("profiles").select("email").eq("id", user_id).single().execute()
-    if not profile.data or profile.data["email"] != invite.data["invitee_email"]:
+    if outcome["status"] == "forbidden":
         raise HTTPException(status_code=403, detail="You cannot accept this invite")
+    if outcome["status"] == "already_linked":
+        raise HTTPException(status_code=400, detail="You or the inviter already have a partner linked")
 
-    inviter_id = invite.data["inviter_id"]
-
-    # Link the partners (update both profiles)
-    supabase.table("profiles").update({"partner_id": inviter_id}).eq("id", user_id).execute()
-    supabase.table("profiles").update({"partner_id": user_id}).eq("id", inviter_id).execute()
-
-    # Mark invite as accepted
-    supabase.table("partner_invites").update({"status": "accepted"}).eq("id", invite_id).execute()
+    # Household changed: cached households and per-household models and
+    # indexes are dropped in every worker, via the cache invalidation
+    forget_household(user_id, outcome["inviter_id"])
 
     return {"message": "Partner linked successfully"}
 
@@ -97,8 +95,8 @@ async def decline_invite(invite_id: str, user_id: str):
         raise HTTPException(status_code=404, detail="Invite not found")
 
     # Verify the current user is the invitee
-    profile = supabase.table("profiles").select("email").eq("id", user_id).single().execute()
-    if not profile.data or profile.data["email"] != invite.data["invitee_email"]:
+    profile = await get_loaders().profiles.load(user_id)
+    if not profile or profile["email"] != invite.data["invitee_email"]:
         raise HTTPException(status_code=403, detail="You cannot decline this invite")
 
     # Mark invite as declined
@@ -112,16 +110,13 @@ async def unlink_partner(user_id: str):
     """Unlink from current partner."""
     supabase = get_supabase()
 
-    # Get current partner
-    profile = supabase.table("profiles").select("partner_id").eq("id", user_id).single().execute()
-    if not profile.data or not profile.data.get("partner_id"):
+    # Unlinks both sides and rebuilds household budgets in one transaction
+    result = supabase.rpc("unlink_partner", {"p_user_id": user_id}).execute()
+    partner_id = result.data
+    if not partner_id:
         raise HTTPException(status_code=400, detail="No partner to unlink")
 
-    partner_id = profile.data["partner_id"]
-
-    # Unlink both users
-    supabase.table("profiles").update({"partner_id": None}).eq("id", user_id).execute()
-    supabase.table("profiles").update({"partner_id": None}).eq("id", partner_id).execute()
+    forget_household(user_id, partner_id)
 
     return {"message": "Partner unlinked successfully"}
 
@@ -1,130 +1,261 @@
-import google.generativeai as genai
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import AsyncIterator, Awaitable, Optional
 from app.config import get_settings
 from app.models import AIAnalysisResponse
+from app.services.gemini_client import get_gemini_client
 
 settings = get_settings()
 
-# Configure Gemini
-genai.configure(api_key=settings.gemini_api_key)
+# Locally detected anomalies shown ahead of the AI insights
+MAX_LOCAL_INSIGHTS = 3
+
+# Active recurring charges listed in the analysis prompt
+MAX_PROMPT_RECURRING = 10
+
+
+class AIResponseParser:
+    """Incremental parser for the SUMMARY/INSIGHTS/RECOMMENDATIONS response format.
+
+    Text can be fed in arbitrary chunks; every complete line is parsed as soon
+    as it arrives and newly recognized fields are returned as (event, text).
+    """
+
+    def __init__(self):
+        self.result = {"summary": "", "insights": [], "recommendations": []}
+        self.current_section = None
+        self.buffer = ""
+
+    def feed(self, text: str) -> list[tuple[str, str]]:
+        """Consume a chunk of text and return events for completed lines."""
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split("\n")
+        events = []
+        for line in lines:
+            events.extend(self._parse_line(line))
+        return events
+
+    def close(self) -> list[tuple[str, str]]:
+        """Parse whatever is left in the buffer once the text has ended."""
+        line, self.buffer = self.buffer, ""
+        return self._parse_line(line)
+
+    def _parse_line(self, line: str) -> list[tuple[str, str]]:
+        line = line.strip()
+        if not line:
+            return []
+
+        if line.startswith("SUMMARY:"):
+            self.result["summary"] = line.replace("SUMMARY:", "").strip()
+            self.current_section = "summary"
+            if self.result["summary"]:
+                return [("summary", self.result["summary"])]
+        elif line == "INSIGHTS:":
+            self.current_section = "insights"
+        elif line == "RECOMMENDATIONS:":
+            self.current_section = "recommendations"
+        elif line.startswith("- "):
+            content = line[2:].strip()
+            if self.current_section == "insights":
+                self.result["insights"].append(content)
+                return [("insight", content)]
+            elif self.current_section == "recommendations":
+                self.result["recommendations"].append(content)
+                return [("recommendation", content)]
+        elif self.current_section == "summary" and not self.result["summary"]:
+            self.result["summary"] = line
+            return [("summary", line)]
+
+        return []
+
+
+class SpendingSummary:
+    """What the analysis needs from a window's expenses, folded in a chunk at a time.
+
+    Keeps the count, total, spend per category and spend per week, so memory
+    grows with the number of categories and weeks rather than expenses.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.by_category: dict[str, float] = {}
+        self.weekly: dict[str, float] = {}
+
+    def add(self, expenses: list[dict]) -> None:
+        for expense in expenses:
+            amount = expense.get("amount", 0)
+            self.count += 1
+            self.total += amount
+
+            category = (expense.get("categories") or {}).get("name") or "Other"
+            self.by_category[category] = self.by_category.get(category, 0) + amount
+
+            date = expense.get("date")
+            if isinstance(date, str):
+                try:
+                    date = datetime.fromisoformat(date.replace("Z", "+00:00"))
+                except ValueError:
+                    continue
+            elif not isinstance(date, datetime):
+                continue
+
+            # Group by the start of the week
+            week_key = (date - timedelta(days=date.weekday())).strftime("%Y-%m-%d")
+            self.weekly[week_key] = self.weekly.get(week_key, 0) + amount
+
+    def trends(self) -> list[dict]:
+        """Spend per week, oldest first, for the last 12 weeks with expenses."""
+        return [{"week": week, "amount": amount} for week, amount in sorted(self.weekly.items())][-12:]
 
 
 class AIAnalysisService:
     """Service for AI-powered expense analysis using Google Gemini."""
 
     def __init__(self):
-        self.model = genai.GenerativeModel("gemini-pro")
+        self.client = get_gemini_client()
+        # Set when the last analysis used the local fallback instead of Gemini
+        self.used_fallback = False
 
     async def analyze_expenses(
         self,
-        expenses: list[dict],
+        spending: SpendingSummary,
         timeframe: str = "month",
         include_partner_expenses: bool = False,
-        partner_expenses: Optional[list[dict]] = None,
+        anomalies: Optional[list[dict]] = None,
+        recurring: Optional[list[dict]] = None,
+        period: Optional[str] = None,
     ) -> AIAnalysisResponse:
-        """Analyze expenses and provide insights."""
+        """Analyze expenses and provide insights.
 
-        # Calculate spending by category
-        spending_by_category = self._calculate_category_spending(expenses)
-
-        # If including partner, merge their expenses too
-        all_expenses = expenses.copy()
-        if include_partner_expenses and partner_expenses:
-            all_expenses.extend(partner_expenses)
-            combined_spending = self._calculate_category_spending(all_expenses)
-        else:
-            combined_spending = spending_by_category
-
-        # Calculate trends
-        trends = self._calculate_trends(all_expenses)
+        `spending` covers the user's expenses, plus the partner's for a
+        combined analysis. `anomalies` from AnomalyDetector are passed to the
+        prompt and their messages lead the insights, so they survive an AI
+        failure. `period` describes a custom date range in the prompt in
+        place of the timeframe.
+        """
+        trends = spending.trends()
+        local_insights = [a["message"] for a in (anomalies or [])[:MAX_LOCAL_INSIGHTS]]
 
         # Generate AI insights
         prompt = self._build_analysis_prompt(
-            expenses=all_expenses,
-            spending_by_category=combined_spending,
+            spending=spending,
             trends=trends,
-            timeframe=timeframe,
+            period=period or f"the past {timeframe}",
             is_combined=include_partner_expenses,
+            local_insights=local_insights,
+            recurring=recurring,
         )
 
         try:
-            response = self.model.generate_content(prompt)
-            ai_response = self._parse_ai_response(response.text)
-        except Exception as e:
-            # Fallback if AI fails
-            ai_response = {
-                "summary": f"Analyzed {len(all_expenses)} expenses totaling ${sum(e.get('amount', 0) for e in all_expenses):.2f}",
-                "insights": [
-                    f"Top spending category: {max(combined_spending, key=combined_spending.get) if combined_spending else 'N/A'}"
-                ],
-                "recommendations": [
-                    "Consider reviewing your largest expense categories for potential savings."
-                ],
-            }
+            response_text = await self.client.generate(prompt)
+            ai_response = self._parse_ai_response(response_text)
+            self.used_fallback = False
+        except Exception:
+            # Fallback if AI fails, times out or the circuit is open
+            self.used_fallback = True
+            ai_response = self._fallback_response(spending)
 
         return AIAnalysisResponse(
             summary=ai_response.get("summary", ""),
-            insights=ai_response.get("insights", []),
+            insights=local_insights + ai_response.get("insights", []),
             recommendations=ai_response.get("recommendations", []),
-            spending_by_category=combined_spending,
+            spending_by_category=spending.by_category,
             trends=trends,
         )
 
-    def _calculate_category_spending(self, expenses: list[dict]) -> dict[str, float]:
-        """Calculate total spending per category."""
-        spending = {}
-        for expense in expenses:
-            category = expense.get("category", "Other") or "Other"
-            amount = expense.get("amount", 0)
-            spending[category] = spending.get(category, 0) + amount
-        return spending
-
-    def _calculate_trends(self, expenses: list[dict]) -> list[dict]:
-        """Calculate spending trends over time."""
-        # Group by week
-        weekly_spending = {}
-
-        for expense in expenses:
-            date = expense.get("date")
-            if isinstance(date, str):
-                try:
-                    date = datetime.fromisoformat(date.replace("Z", "+00:00"))
-                except ValueError:
-                    continue
-            elif not isinstance(date, datetime):
-                continue
-
-            # Get the start of the week
-            week_start = date - timedelta(days=date.weekday())
-            week_key = week_start.strftime("%Y-%m-%d")
+    async def stream_analysis(
+        self,
+        spending: SpendingSummary,
+        timeframe: str = "month",
+        include_partner_expenses: bool = False,
+        anomalies: Optional[Awaitable[list[dict]]] = None,
+        recurring: Optional[Awaitable[list[dict]]] = None,
+        period: Optional[str] = None,
+    ) -> AsyncIterator[tuple[str, object]]:
+        """Analyze expenses, yielding (event, data) pairs as results become available.
+
+        The locally computed breakdown is yielded first, then each summary,
+        insight and recommendation as soon as Gemini has produced its line,
+        and finally a "done" event with the complete AIAnalysisResponse.
+        `anomalies` and `recurring` are awaited only after the breakdown is
+        out, so their history reads do not hold it back.
+        """
+        trends = spending.trends()
+        yield "local", {"spending_by_category": spending.by_category, "trends": trends}
+
+        anomalies = await anomalies if anomalies is not None else []
+        local_insights = [a["message"] for a in anomalies[:MAX_LOCAL_INSIGHTS]]
+        for insight in local_insights:
+            yield "insight", insight
+        recurring = await recurring if recurring is not None else None
 
-            weekly_spending[week_key] = weekly_spending.get(week_key, 0) + expense.get(
-                "amount", 0
-            )
+        prompt = self._build_analysis_prompt(
+            spending=spending,
+            trends=trends,
+            period=period or f"the past {timeframe}",
+            is_combined=include_partner_expenses,
+            local_insights=local_insights,
+            recurring=recurring,
+        )
 
-        # Convert to list and sort
-        trends = [
-            {"week": week, "amount": amount}
-            for week, amount in sorted(weekly_spending.items())
-        ]
+        parser = AIResponseParser()
+        try:
+            async for chunk in self.client.stream(prompt):
+                for event in parser.feed(chunk):
+                    yield event
+            for event in parser.close():
+                yield event
+            ai_response = parser.result
+            self.used_fallback = False
+        except Exception:
+            self.used_fallback = True
+            if parser.result["summary"]:
+                # Keep whatever Gemini produced before the stream broke off
+                ai_response = parser.result
+            else:
+                ai_response = self._fallback_response(spending)
+                yield "summary", ai_response["summary"]
+                for insight in ai_response["insights"]:
+                    yield "insight", insight
+                for recommendation in ai_response["recommendations"]:
+                    yield "recommendation", recommendation
+
+        yield "done", AIAnalysisResponse(
+            summary=ai_response.get("summary", ""),
+            insights=local_insights + ai_response.get("insights", []),
+            recommendations=ai_response.get("recommendations", []),
+            spending_by_category=spending.by_category,
+            trends=trends,
+        )
 
-        return trends[-12:]  # Last 12 weeks
+    def _fallback_response(self, spending: SpendingSummary) -> dict:
+        """Build a basic analysis when the AI is unavailable."""
+        by_category = spending.by_category
+        return {
+            "summary": f"Analyzed {spending.count} expenses totaling ${spending.total:.2f}",
+            "insights": [
+                f"Top spending category: {max(by_category, key=by_category.get) if by_category else 'N/A'}"
+            ],
+            "recommendations": [
+                "Consider reviewing your largest expense categories for potential savings."
+            ],
+        }
 
     def _build_analysis_prompt(
         self,
-        expenses: list[dict],
-        spending_by_category: dict[str, float],
+        spending: SpendingSummary,
         trends: list[dict],
-        timeframe: str,
+        period: str,
         is_combined: bool,
+        local_insights: Optional[list[str]] = None,
+        recurring: Optional[list[dict]] = None,
     ) -> str:
         """Build the prompt for AI analysis."""
-        total_spent = sum(e.get("amount", 0) for e in expenses)
-        expense_count = len(expenses)
+        total_spent = spending.total
+        expense_count = spending.count
 
         category_breakdown = "\n".join(
-            f"- {cat}: ${amt:.2f}" for cat, amt in sorted(spending_by_category.items(), key=lambda x: -x[1])
+            f"- {cat}: ${amt:.2f}" for cat, amt in sorted(spending.by_category.items(), key=lambda x: -x[1])
         )
 
         trend_summary = ""
@@ -137,7 +268,20 @@ class AIAnalysisService:
 
         audience = "a household (two partners)" if is_combined else "an individual"
 
-        prompt = f"""Analyze the following expense data for {audience} over the past {timeframe}.
+        anomaly_section = ""
+        if local_insights:
+            anomaly_section = "\nUNUSUAL ACTIVITY (already shown to the user, do not repeat):\n" + "\n".join(
+                f"- {insight}" for insight in local_insights
+            ) + "\n"
+
+        recurring_section = ""
+        active_recurring = [r for r in (recurring or []) if r["status"] == "active"][:MAX_PROMPT_RECURRING]
+        if active_recurring:
+            recurring_section = "\nRECURRING CHARGES:\n" + "\n".join(
+                f"- {r['merchant']}: ${r['amount']:.2f} {r['period']}" for r in active_recurring
+            ) + "\n"
+
+        prompt = f"""Analyze the following expense data for {audience} over {period}.
 
 EXPENSE SUMMARY:
 - Total expenses: {expense_count}
@@ -146,7 +290,7 @@ EXPENSE SUMMARY:
 
 SPENDING BY CATEGORY:
 {category_breakdown}
-
+{recurring_section}{anomaly_section}
 Please provide:
 1. A brief 2-3 sentence summary of the spending patterns
 2. 3-4 specific insights about the spending habits (be specific with numbers)
@@ -171,33 +315,10 @@ Keep the tone helpful and constructive, not judgmental."""
 
     def _parse_ai_response(self, response_text: str) -> dict:
         """Parse the AI response into structured data."""
-        result = {"summary": "", "insights": [], "recommendations": []}
-
-        lines = response_text.strip().split("\n")
-        current_section = None
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            if line.startswith("SUMMARY:"):
-                result["summary"] = line.replace("SUMMARY:", "").strip()
-                current_section = "summary"
-            elif line == "INSIGHTS:":
-                current_section = "insights"
-            elif line == "RECOMMENDATIONS:":
-                current_section = "recommendations"
-            elif line.startswith("- "):
-                content = line[2:].strip()
-                if current_section == "insights":
-                    result["insights"].append(content)
-                elif current_section == "recommendations":
-                    result["recommendations"].append(content)
-            elif current_section == "summary" and not result["summary"]:
-                result["summary"] = line
-
-        return result
+        parser = AIResponseParser()
+        parser.feed(response_text)
+        parser.close()
+        return parser.result
 
     async def categorize_expense(self, description: str, merchant: Optional[str] = None) -> str:
         """Use AI to suggest a category for an expense."""
@@ -220,8 +341,10 @@ What category does this belong to? Choose from:
 Respond with just the category name, nothing else."""
 
         try:
-            response = self.model.generate_content(prompt)
-            category = response.text.strip()
+            response_text = await self.client.generate(
+                prompt, timeout=settings.gemini_categorize_timeout_seconds
+            )
+            category = response_text.strip()
             # Validate it's a known category
             valid_categories = [
                 "Food & Dining", "Transportation", "Shopping", "Entertainment",
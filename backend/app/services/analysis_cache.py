@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from fastapi.encoders import jsonable_encoder
+from app.services.cache import Cache
+from app.services.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Results computed without Gemini (fallback answers) are only kept briefly
+FALLBACK_TTL_SECONDS = 60
+
+# Fingerprints keep results valid indefinitely; this just bounds shared storage
+RESULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+class AnalysisCache:
+    """Cache of analysis results validated by a fingerprint of the input data.
+
+    Entries live in the shared cache backend, so any worker's result serves
+    the others. A matching fingerprint is served directly. When the
+    fingerprint changed, the stale result is served while a single background
+    task in this process recomputes it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.cache = Cache(name, ttl=RESULT_TTL_SECONDS)
+        self.refreshing: dict[Hashable, asyncio.Task] = {}
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refresh_errors": 0}
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        fingerprint: Hashable,
+        compute: Callable[[], Awaitable[tuple[Any, bool]]],
+        stale_while_revalidate: bool = True,
+    ) -> Any:
+        """Return a cached value for `key`, computing it if missing.
+
+        `compute` returns `(value, cacheable)`; values that are not cacheable
+        (e.g. fallback answers while Gemini is down) expire after a short TTL.
+        Without `stale_while_revalidate`, a changed fingerprint is treated as
+        a miss instead of serving the old value.
+        """
+        entry = self.cache.get(key, count=False)
+        if entry is not None:
+            if entry["fingerprint"] == jsonable_encoder(fingerprint):
+                self.stats["hits"] += 1
+                CACHE_REQUESTS.inc((self.name, "hit"))
+                return entry["value"]
+
+            if stale_while_revalidate:
+                self.stats["stale_hits"] += 1
+                CACHE_REQUESTS.inc((self.name, "stale"))
+                if key not in self.refreshing:
+                    self._start_refresh(key, fingerprint, compute)
+                return entry["value"]
+
+        self.stats["misses"] += 1
+        CACHE_REQUESTS.inc((self.name, "miss"))
+        # Concurrent misses for the same key share one computation
+        task = self.refreshing.get(key) or self._start_refresh(key, fingerprint, compute)
+        return await asyncio.shield(task)
+
+    def peek(self, key: Hashable, fingerprint: Hashable) -> Optional[Any]:
+        """Return the cached value only if it is fresh for `fingerprint`."""
+        entry = self.cache.get(key, count=False)
+        if entry is None or entry["fingerprint"] != jsonable_encoder(fingerprint):
+            CACHE_REQUESTS.inc((self.name, "miss"))
+            return None
+        self.stats["hits"] += 1
+        CACHE_REQUESTS.inc((self.name, "hit"))
+        return entry["value"]
+
+    def put(self, key: Hashable, fingerprint: Hashable, value: Any, cacheable: bool = True) -> Any:
+        """Store `value` and return it in the JSON form later hits will return."""
+        entry = self.cache.set(
+            key,
+            {"fingerprint": fingerprint, "value": value},
+            None if cacheable else FALLBACK_TTL_SECONDS,
+        )
+        return entry["value"]
+
+    def invalidate(self, key: Hashable) -> None:
+        self.cache.delete(key)
+
+    def _start_refresh(
+        self,
+        key: Hashable,
+        fingerprint: Hashable,
+        compute: Callable[[], Awaitable[tuple[Any, bool]]],
+    ) -> asyncio.Task:
+        task = asyncio.create_task(self._refresh(key, fingerprint, compute))
+        task.add_done_callback(self._log_refresh_failure)
+        self.refreshing[key] = task
+        return task
+
+    def _log_refresh_failure(self, task: asyncio.Task) -> None:
+        # Background refreshes (and ones whose caller went away) are never
+        # awaited; retrieving the exception here keeps it from surfacing as
+        # "Task exception was never retrieved"
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Refreshing a %s cache entry failed", self.name, exc_info=task.exception())
+
+    async def _refresh(
+        self,
+        key: Hashable,
+        fingerprint: Hashable,
+        compute: Callable[[], Awaitable[tuple[Any, bool]]],
+    ) -> Any:
+        try:
+            value, cacheable = await compute()
+            return self.put(key, fingerprint, value, cacheable)
+        except Exception:
+            self.stats["refresh_errors"] += 1
+            raise
+        finally:
+            self.refreshing.pop(key, None)
+
+
+def expense_fingerprint(supabase, user_id: str, include_partner: bool, start_date, end_date=None) -> tuple:
+    """Cheap (row count, sum, max updated_at) summary of the expenses in a window."""
+    result = supabase.rpc("expense_fingerprint", {
+        "p_user_id": user_id,
+        "p_include_partner": include_partner,
+        "p_start_date": start_date.isoformat(),
+        "p_end_date": end_date.isoformat() if end_date else None,
+    }).execute()
+    row = result.data[0] if result.data else {}
+    return (row.get("row_count"), row.get("total"), row.get("last_updated"))
+
+
+_analysis_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = AnalysisCache("analysis")
+    return _analysis_cache
@@ -0,0 +1,183 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+from app.database import get_pg_pool
+from app.services.expense_frame import ExpenseFrame
+from app.services.metrics import observe_upstream
+
+# Analytical reads go straight to Postgres through the asyncpg pool when
+# DATABASE_URL is set: statements are prepared once per connection and rows
+# arrive in the binary protocol instead of as PostgREST JSON over HTTP.
+# Without a pool, the same functions query PostgREST. Both paths return the
+# same shapes, so callers never need to know which one ran.
+#
+# Values are cast in SQL to what PostgREST's JSON decodes to (text ids,
+# float amounts, ISO 8601 timestamps via to_json), which asyncpg decodes far
+# faster than converting UUID/Decimal/datetime objects in Python.
+
+# The expenses columns, as PostgREST returns them for select=*
+EXPENSE_COLUMNS = """
+    e.id::text AS id, e.user_id::text AS user_id, e.amount::float8 AS amount, e.description,
+    e.category_id::text AS category_id, e.merchant, to_json(e.date) #>> '{}' AS date, e.source, e.email_id,
+    to_json(e.created_at) #>> '{}' AS created_at, to_json(e.updated_at) #>> '{}' AS updated_at
+"""
+
+# Rows read per round trip by iter_expense_chunks. PostgREST caps a response
+# at its max-rows (1000 on Supabase) anyway, so larger chunks would be truncated.
+CHUNK_SIZE = 1000
+
+# The PostgREST columns an ExpenseFrame keeps
+FRAME_SELECT = "id, amount, date, merchant, description, categories(name)"
+
+# Sorts before every real id, so the first page starts at the window's start
+FIRST_ID = "00000000-0000-0000-0000-000000000000"
+
+# One keyset page of a window: rows after ($4, $5) in (date, id) order. A NULL
+# end ($3) is an open window; plans are custom per call, so it costs nothing.
+EXPENSE_CHUNK_SQL = f"""
+SELECT {EXPENSE_COLUMNS}, c.name AS category_name, c.color AS category_color
+FROM public.expenses e
+LEFT JOIN public.categories c ON c.id = e.category_id
+WHERE e.user_id = ANY($1::uuid[]) AND e.date >= $2 AND ($3::timestamptz IS NULL OR e.date <= $3)
+  AND e.date >= $4 AND (e.date, e.id) > ($4, $5::uuid)
+ORDER BY e.date, e.id
+LIMIT $6
+"""
+
+CATEGORY_TOTALS_SQL = """
+SELECT e.user_id::text AS user_id, COALESCE(c.name, 'Other') AS category, SUM(e.amount)::float8 AS total
+FROM public.expenses e
+LEFT JOIN public.categories c ON c.id = e.category_id
+WHERE e.user_id = ANY($1::uuid[]) AND e.date >= $2
+GROUP BY e.user_id, COALESCE(c.name, 'Other')
+"""
+
+def as_utc(value: datetime) -> datetime:
+    # PostgREST reads naive timestamps in the database time zone, which is UTC on Supabase
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+async def _fetch(pool, name: str, sql: str, *args) -> list:
+    start = time.perf_counter()
+    try:
+        rows = await pool.fetch(sql, *args)
+    except Exception:
+        observe_upstream("postgres", "fetch", name, time.perf_counter() - start, error=True)
+        raise
+    observe_upstream("postgres", "fetch", name, time.perf_counter() - start)
+    return rows
+
+
+async def _expense_pages(
+    supabase,
+    member_ids: list[str],
+    start_date: datetime,
+    end_date: Optional[datetime],
+    chunk_size: int,
+    select: str = "*, categories(name, color)",
+) -> AsyncIterator[list]:
+    """Keyset pages of a window as the source returns them: asyncpg records
+    with category_name/category_color columns, or PostgREST dicts with the
+    `select` columns (which must include id and date)."""
+    pool = get_pg_pool()
+    start_date = as_utc(start_date)
+    end_date = as_utc(end_date) if end_date is not None else None
+    after_date, after_id = start_date, FIRST_ID
+
+    while True:
+        if pool is not None:
+            page = await _fetch(
+                pool, "expense_chunk", EXPENSE_CHUNK_SQL, member_ids, start_date, end_date, after_date, after_id, chunk_size
+            )
+        else:
+            query = supabase.table("expenses").select(select).gte("date", start_date.isoformat())
+            if end_date is not None:
+                query = query.lte("date", end_date.isoformat())
+            if len(member_ids) > 1:
+                query = query.in_("user_id", member_ids)
+            else:
+                query = query.eq("user_id", member_ids[0])
+            if after_id != FIRST_ID:
+                query = query.or_(f'date.gt."{after_date}",and(date.eq."{after_date}",id.gt.{after_id})')
+            result = await asyncio.to_thread(query.order("date").order("id").limit(chunk_size).execute)
+            page = result.data or []
+
+        if page:
+            yield page
+        if len(page) < chunk_size:
+            return
+        # Both paths return the date exactly as Postgres wrote it, so it round-trips as the cursor
+        after_date, after_id = page[-1]["date"], page[-1]["id"]
+        if pool is not None:
+            after_date = datetime.fromisoformat(after_date)
+
+
+async def iter_expense_chunks(
+    supabase,
+    member_ids: list[str],
+    start_date: datetime,
+    end_date: Optional[datetime] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator[list[dict]]:
+    """Expense rows with embedded `categories {name, color}` for the members from
+    start_date through end_date (open-ended without one), oldest first, in chunks.
+
+    Pages are keyset-paginated on (date, id), so each page is an index range
+    read however deep into the window it is, and callers that fold each chunk
+    into running totals hold one chunk in memory at a time.
+    """
+    async for page in _expense_pages(supabase, member_ids, start_date, end_date, chunk_size):
+        if isinstance(page[0], dict):
+            yield page
+            continue
+        chunk = []
+        for row in page:
+            expense = dict(row)
+            name, color = expense.pop("category_name"), expense.pop("category_color")
+            expense["categories"] = {"name": name, "color": color} if name is not None else None
+            chunk.append(expense)
+        yield chunk
+
+
+async def fetch_expense_frame(
+    supabase,
+    member_ids: list[str],
+    start_date: datetime,
+    end_date: Optional[datetime] = None,
+    with_ids: bool = False,
+) -> ExpenseFrame:
+    """The members' expenses from start_date through end_date as one ExpenseFrame.
+
+    Each page goes straight from the response into the frame's columns and
+    is then dropped, so no per-row dicts outlive their page.
+    """
+    frame = ExpenseFrame(with_ids)
+    async for page in _expense_pages(supabase, member_ids, start_date, end_date, CHUNK_SIZE, FRAME_SELECT):
+        frame.extend(page)
+    return frame
+
+
+async def fetch_category_breakdowns(supabase, member_ids: list[str], start_date: datetime) -> dict[str, dict]:
+    """Per member: total spend and spend by category name since start_date."""
+    breakdowns = {member_id: {"total": 0, "by_category": {}} for member_id in member_ids}
+
+    pool = get_pg_pool()
+    if pool is not None:
+        # Aggregated in Postgres: one row per member and category instead of one per expense
+        rows = await _fetch(pool, "category_totals", CATEGORY_TOTALS_SQL, member_ids, as_utc(start_date))
+        for user_id, category, total in rows:
+            breakdown = breakdowns[user_id]
+            breakdown["total"] += total
+            breakdown["by_category"][category] = total
+        return breakdowns
+
+    # Paged so no member's breakdown is cut off at PostgREST's max-rows
+    async for chunk in iter_expense_chunks(supabase, member_ids, start_date):
+        for e in chunk:
+            breakdown = breakdowns[e["user_id"]]
+            amount = e["amount"]
+            breakdown["total"] += amount
+            cat = e["categories"]["name"] if e.get("categories") else "Other"
+            breakdown["by_category"][cat] = breakdown["by_category"].get(cat, 0) + amount
+    return breakdowns
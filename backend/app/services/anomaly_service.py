@@ -0,0 +1,205 @@
+import math
+import re
+from datetime import datetime
+from functools import lru_cache
+from statistics import median
+from typing import Optional
+from app.services.expense_frame import ExpenseFrame
+
+# How much history is used to build per-category and per-merchant baselines
+HISTORY_DAYS = 730
+
+# Scale factor that makes the MAD comparable to a standard deviation
+MAD_SCALE = 0.6745
+
+MERCHANT_NOISE_RE = re.compile(r"[^a-z0-9 ]+|\b(inc|llc|ltd|co|corp|com|www)\b|\d{3,}")
+
+
+@lru_cache(maxsize=4096)
+def normalize_merchant(merchant: Optional[str]) -> str:
+    """Normalize a merchant name so variants like 'NETFLIX.COM #1234' group together."""
+    if not merchant:
+        return ""
+    return " ".join(MERCHANT_NOISE_RE.sub(" ", merchant.lower()).split())
+
+
+def robust_baseline(values: list[float]) -> tuple[float, float]:
+    """Return (median, median absolute deviation) of a list of values."""
+    mid = median(values)
+    return mid, median(abs(v - mid) for v in values)
+
+
+def robust_z(value: float, mid: float, mad: float) -> float:
+    """Robust z-score; a zero MAD falls back to a spread of 10% of the median."""
+    spread = mad or max(abs(mid) * 0.1, 0.1)
+    return MAD_SCALE * (value - mid) / spread
+
+
+class AnomalyDetector:
+    """Flag unusual spending against the user's own history without calling the AI.
+
+    Expenses arrive as an ExpenseFrame, are grouped into per-category and
+    per-merchant baselines from the history before the analysis window, and
+    each check is a single pass over those columns. Charge baselines use log
+    amounts, since spending is multiplicative and heavily right-skewed.
+    """
+
+    # Robust z-score above which a single charge is unusual
+    CHARGE_Z_THRESHOLD = 3.5
+    # A large charge must also be at least this multiple of the typical one
+    CHARGE_MIN_RATIO = 2.0
+    # Recurring merchants (bills, subscriptions) are flagged on smaller jumps
+    MERCHANT_MIN_RATIO = 1.3
+    # Period spending must exceed the typical month by this ratio and amount
+    SPIKE_MIN_RATIO = 1.5
+    SPIKE_MIN_DELTA = 50.0
+    SPIKE_Z_THRESHOLD = 2.0
+    # Minimum observations before a baseline is trusted
+    MIN_CATEGORY_SAMPLES = 5
+    MIN_MERCHANT_SAMPLES = 3
+    MIN_SPIKE_MONTHS = 2
+
+    @classmethod
+    def detect(cls, expenses: ExpenseFrame, window_start: datetime, now: Optional[datetime] = None) -> list[dict]:
+        """Return anomalies in the window, most significant first.
+
+        `expenses` covers the window plus the preceding history.
+        """
+        now = now or datetime.now()
+        window_day = window_start.strftime("%Y-%m-%d")
+        window_days = max((now - window_start).days, 1)
+
+        # Per distinct value: category names, normalized merchants, months and window membership
+        category_names = [c or "Other" for c in expenses.categories]
+        normalized = [normalize_merchant(m) for m in expenses.merchants]
+        day_in_window = [day >= window_day for day in expenses.days]
+        day_months = [day[:7] for day in expenses.days]
+
+        # Per row, as codes into those
+        amounts = expenses.amounts
+        log_amounts = [math.log1p(max(a, 0)) for a in amounts]
+        days = expenses.day_codes
+        categories = expenses.category_codes
+        merchants = expenses.merchant_codes
+        in_window = [day_in_window[d] for d in days]
+        has_history = not all(in_window)
+
+        # Group amounts for the baselines (history only, unless there is none yet)
+        category_amounts: dict[str, list[float]] = {}
+        merchant_amounts: dict[str, list[float]] = {}
+        monthly_totals: dict[str, dict[str, float]] = {}
+        for amount, log_amount, day, category, merchant, current in zip(
+            amounts, log_amounts, days, categories, merchants, in_window
+        ):
+            if current and has_history:
+                continue
+            category = category_names[category]
+            merchant = normalized[merchant]
+            category_amounts.setdefault(category, []).append(log_amount)
+            if merchant:
+                merchant_amounts.setdefault(merchant, []).append(log_amount)
+            if not current:
+                month = day_months[day]
+                months = monthly_totals.setdefault(category, {})
+                months[month] = months.get(month, 0) + amount
+
+        category_baselines = {
+            cat: robust_baseline(values)
+            for cat, values in category_amounts.items()
+            if len(values) >= cls.MIN_CATEGORY_SAMPLES
+        }
+        merchant_baselines = {
+            merchant: robust_baseline(values)
+            for merchant, values in merchant_amounts.items()
+            if len(values) >= cls.MIN_MERCHANT_SAMPLES
+        }
+
+        # Keep only the most significant charge anomaly per merchant
+        charge_anomalies: dict[tuple, dict] = {}
+
+        def flag(key: tuple, anomaly: dict) -> None:
+            if key not in charge_anomalies or anomaly["score"] > charge_anomalies[key]["score"]:
+                charge_anomalies[key] = anomaly
+
+        window_totals: dict[str, float] = {}
+        for amount, log_amount, day, category, merchant, description, current in zip(
+            amounts, log_amounts, days, categories, merchants, expenses.description_codes, in_window
+        ):
+            if not current:
+                continue
+            label = expenses.merchants[merchant] or expenses.descriptions[description] or "unknown merchant"
+            day = expenses.days[day]
+            category = category_names[category]
+            merchant = normalized[merchant]
+            window_totals[category] = window_totals.get(category, 0) + amount
+
+            merchant_baseline = merchant_baselines.get(merchant)
+            if merchant_baseline:
+                log_mid, log_mad = merchant_baseline
+                z = robust_z(log_amount, log_mid, log_mad)
+                mid = math.expm1(log_mid)
+                if z >= cls.CHARGE_Z_THRESHOLD and mid > 0 and amount >= mid * cls.MERCHANT_MIN_RATIO:
+                    flag((merchant or label,), {
+                        "type": "merchant_price_jump",
+                        "category": category,
+                        "merchant": label,
+                        "date": day,
+                        "amount": round(amount, 2),
+                        "baseline": round(mid, 2),
+                        "score": round(z, 2),
+                        "message": f"{label} charged ${amount:.2f} on {day}, {amount / mid:.1f}x its usual ${mid:.2f}",
+                    })
+                    continue
+
+            category_baseline = category_baselines.get(category)
+            if category_baseline:
+                log_mid, log_mad = category_baseline
+                z = robust_z(log_amount, log_mid, log_mad)
+                mid = math.expm1(log_mid)
+                if z >= cls.CHARGE_Z_THRESHOLD and amount >= mid * cls.CHARGE_MIN_RATIO:
+                    flag((merchant or label,), {
+                        "type": "large_charge",
+                        "category": category,
+                        "merchant": label,
+                        "date": day,
+                        "amount": round(amount, 2),
+                        "baseline": round(mid, 2),
+                        "score": round(z, 2),
+                        "message": (
+                            f"Unusually large {category} charge: ${amount:.2f} at {label} on {day} "
+                            f"(a typical {category} charge is ${mid:.2f})"
+                        ),
+                    })
+
+        anomalies = list(charge_anomalies.values())
+
+        # Category spikes: spending pace in the window vs. typical monthly totals.
+        # The oldest month of history is usually partial, so it is left out.
+        first_month = min(expenses.days)[:7] if expenses.days else ""
+        for category, total in window_totals.items():
+            months = [amount for month, amount in monthly_totals.get(category, {}).items() if month != first_month]
+            if len(months) < cls.MIN_SPIKE_MONTHS:
+                continue
+            mid, mad = robust_baseline(months)
+            monthly_pace = total * 30 / window_days
+            if mid <= 0 or monthly_pace < mid * cls.SPIKE_MIN_RATIO or monthly_pace - mid < cls.SPIKE_MIN_DELTA:
+                continue
+            score = robust_z(monthly_pace, mid, mad)
+            if score < cls.SPIKE_Z_THRESHOLD:
+                continue
+            anomalies.append({
+                "type": "category_spike",
+                "category": category,
+                "merchant": None,
+                "date": None,
+                "amount": round(total, 2),
+                "baseline": round(mid, 2),
+                "score": round(score, 2),
+                "message": (
+                    f"{category} spending is on pace for ${monthly_pace:.2f} a month, "
+                    f"{monthly_pace / mid:.1f}x your typical ${mid:.2f}"
+                ),
+            })
+
+        anomalies.sort(key=lambda a: a["score"], reverse=True)
+        return anomalies
@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+# Share of the limit at which a budget is reported as "warning"
+WARNING_RATIO = 0.8
+
+
+def period_end(period: str, start: date) -> date:
+    """Last day of the budget period starting on `start`."""
+    if period == "week":
+        return start + timedelta(days=6)
+    months = {"month": 1, "quarter": 3, "year": 12}[period]
+    year, month = divmod(start.month - 1 + months, 12)
+    return date(start.year + year, month + 1, 1) - timedelta(days=1)
+
+
+def describe_budget(row: dict) -> dict:
+    """Add remaining amount, usage and status to a budget_status row."""
+    spent = float(row.get("spent") or 0)
+    limit = float(row["amount_limit"])
+    start = date.fromisoformat(row["period_start"])
+    ratio = spent / limit if limit else 0.0
+
+    if ratio >= 1:
+        status = "exceeded"
+    elif ratio >= WARNING_RATIO:
+        status = "warning"
+    else:
+        status = "ok"
+
+    return {
+        **row,
+        "spent": round(spent, 2),
+        "amount_limit": round(limit, 2),
+        "remaining": round(limit - spent, 2),
+        "percent_used": round(ratio * 100, 1),
+        "period_end": period_end(row["period"], start).isoformat(),
+        "status": status,
+    }
+
@@ -0,0 +1,288 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from fastapi.encoders import jsonable_encoder
+from app.config import get_settings
+from app.services.metrics import CACHE_REQUESTS, upstream_call
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Entries kept in process, by the local backend or in front of Redis
+LOCAL_MAX_ENTRIES = 4096
+
+# Upper bound on how long a Redis-backed process serves its own copy, in
+# case an invalidation message was lost while the subscription reconnected
+NEAR_CACHE_TTL_SECONDS = 30
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# How long the subscriber waits for a message before checking for shutdown
+LISTEN_POLL_SECONDS = 1.0
+
+# Redis pings an idle subscription this often, so a dead connection is noticed
+HEALTH_CHECK_SECONDS = 30
+
+# Called with the full key whenever a key is deleted in any process
+_listeners: list[Callable[[str], None]] = []
+
+# Listeners mutate state the request handlers use without locks, so once the
+# app has started they run on its event loop, whichever thread deleted the key
+_listener_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_listeners_on(loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Dispatch invalidation listeners onto `loop` (None runs them in the deleting thread)."""
+    global _listener_loop
+    _listener_loop = loop
+
+
+def _notify(keys) -> None:
+    loop = _listener_loop
+    if loop is not None and not loop.is_closed():
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not loop:
+            loop.call_soon_threadsafe(_run_listeners, list(keys))
+            return
+    _run_listeners(keys)
+
+
+def _run_listeners(keys) -> None:
+    for key in keys:
+        for listener in _listeners:
+            try:
+                listener(key)
+            except Exception:
+                logger.exception("Cache invalidation listener failed for %s", key)
+
+
+class LocalBackend:
+    """In-process LRU with optional per-entry TTL."""
+
+    def __init__(self, max_entries: int = LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # key -> (value, expires_at or None)
+        self.entries: OrderedDict[str, tuple[Any, Optional[float]]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl if ttl else None)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        self.discard(*keys)
+        _notify(keys)
+
+    def discard(self, *keys: str) -> None:
+        """Drop entries without notifying listeners (the value changed, it was not invalidated)."""
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def close(self) -> None:
+        pass
+
+
+class RedisBackend:
+    """Shared cache in Redis with an in-process near cache in front of it.
+
+    Reads are served from the near cache when possible and otherwise from
+    Redis, so a value computed by one worker or replica is a hit for all of
+    them. Writes and deletes publish the affected keys on a pub/sub channel;
+    every other process drops its near copies, and for deletes also runs its
+    invalidation listeners. Redis errors are logged and treated as misses,
+    so an outage degrades to recomputing rather than failing requests.
+    """
+
+    def __init__(self, url: str, near_entries: int = LOCAL_MAX_ENTRIES):
+        # Imported here so the Redis client only loads when a shared cache is configured
+        import redis
+
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=1.0, socket_connect_timeout=1.0, health_check_interval=HEALTH_CHECK_SECONDS
+        )
+        self.near = LocalBackend(near_entries)
+        self.origin = uuid.uuid4().hex
+        self._closed = threading.Event()
+        self._pubsub = None
+        self._thread = threading.Thread(target=self._listen, name="cache-invalidations", daemon=True)
+        self._thread.start()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.near.get(key)
+        if value is not None:
+            return value
+        try:
+            with upstream_call("redis", "get"):
+                pipeline = self.client.pipeline(transaction=False)
+                pipeline.get(key)
+                pipeline.pttl(key)
+                raw, ttl_ms = pipeline.execute()
+        except Exception as e:
+            logger.warning("Cache read failed for %s: %s", key, e)
+            return None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        near_ttl = NEAR_CACHE_TTL_SECONDS if ttl_ms < 0 else min(ttl_ms / 1000, NEAR_CACHE_TTL_SECONDS)
+        self.near.set(key, value, near_ttl)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.near.set(key, value, min(ttl, NEAR_CACHE_TTL_SECONDS) if ttl else NEAR_CACHE_TTL_SECONDS)
+        try:
+            with upstream_call("redis", "set"):
+                pipeline = self.client.pipeline(transaction=False)
+                pipeline.set(key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+                pipeline.publish(INVALIDATION_CHANNEL, self._message("set", [key]))
+                pipeline.execute()
+        except Exception as e:
+            logger.warning("Cache write failed for %s: %s", key, e)
+
+    def delete(self, *keys: str) -> None:
+        self.near.delete(*keys)
+        try:
+            with upstream_call("redis", "delete"):
+                pipeline = self.client.pipeline(transaction=False)
+                pipeline.delete(*keys)
+                pipeline.publish(INVALIDATION_CHANNEL, self._message("delete", list(keys)))
+                pipeline.execute()
+        except Exception as e:
+            logger.warning("Cache invalidation failed for %s: %s", keys, e)
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except Exception:
+                pass
+        self.client.close()
+
+    def _message(self, event: str, keys: list[str]) -> str:
+        return json.dumps({"origin": self.origin, "event": event, "keys": keys})
+
+    def _listen(self) -> None:
+        backoff = 0.5
+        while not self._closed.is_set():
+            try:
+                self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                self._pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Invalidations may have been missed while disconnected
+                self.near.clear()
+                backoff = 0.5
+                # Polled rather than listen(), whose blocking read would hit the
+                # commands' socket timeout whenever the channel is quiet
+                while not self._closed.is_set():
+                    message = self._pubsub.get_message(timeout=LISTEN_POLL_SECONDS)
+                    if message is not None:
+                        self._handle(message)
+            except Exception as e:
+                if self._closed.is_set():
+                    return
+                logger.warning("Cache invalidation subscription lost, retrying in %.1fs: %s", backoff, e)
+                self.near.clear()
+                self._closed.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _handle(self, message: dict) -> None:
+        if message.get("type") != "message":
+            return
+        payload = json.loads(message["data"])
+        if payload.get("origin") == self.origin:
+            return
+        keys = payload.get("keys", [])
+        if payload.get("event") == "delete":
+            self.near.delete(*keys)
+        else:
+            self.near.discard(*keys)
+
+
+_backend = None
+
+
+def get_cache_backend():
+    """The process-wide cache backend: Redis when CACHE_URL is set, otherwise in-process."""
+    global _backend
+    if _backend is None:
+        _backend = RedisBackend(settings.cache_url) if settings.cache_url else LocalBackend()
+    return _backend
+
+
+def close_cache_backend() -> None:
+    global _backend
+    if _backend is not None:
+        _backend.close()
+        _backend = None
+
+
+class Cache:
+    """A named namespace in the cache backend.
+
+    Keys are strings or tuples (joined with ":") and values are stored in
+    their JSON form, so a hit returns plain dicts and lists regardless of
+    the backend. Listeners registered with `on_invalidate` run in every
+    process whenever a key of this namespace is deleted.
+    """
+
+    def __init__(self, name: str, ttl: Optional[float] = None):
+        self.name = name
+        self.ttl = ttl
+        self.prefix = f"{name}:"
+
+    def key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return self.prefix + ":".join(str(part) for part in parts)
+
+    def get(self, key: Hashable, count: bool = True) -> Optional[Any]:
+        value = get_cache_backend().get(self.key(key))
+        if count:
+            CACHE_REQUESTS.inc((self.name, "miss" if value is None else "hit"))
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> Any:
+        """Store `value` and return its JSON form, i.e. what later hits will return."""
+        encoded = jsonable_encoder(value)
+        get_cache_backend().set(self.key(key), encoded, ttl or self.ttl)
+        return encoded
+
+    def delete(self, *keys: Hashable) -> None:
+        if keys:
+            get_cache_backend().delete(*(self.key(key) for key in keys))
+
+    def on_invalidate(self, callback: Callable[[str], None]) -> None:
+        """Call `callback(key)` with the key (without the namespace) on every delete."""
+        prefix = self.prefix
+
+        def listener(full_key: str) -> None:
+            if full_key.startswith(prefix):
+                callback(full_key[len(prefix):])
+
+        _listeners.append(listener)
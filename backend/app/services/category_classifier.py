@@ -0,0 +1,299 @@
+import math
+import re
+import time
+import zlib
+from typing import Callable, Optional
+from app.services.analytics_reads import CHUNK_SIZE
+from app.services.household import household_cache, household_key, household_members
+from app.services.metrics import CACHE_REQUESTS
+
+# Hashed feature space size (2^18 buckets keeps collisions rare for merchant/description vocab)
+NUM_BUCKETS = 1 << 18
+
+# Laplace smoothing for the multinomial naive Bayes estimates
+ALPHA = 0.1
+
+# Minimum posterior probability to answer locally instead of asking Gemini
+CONFIDENCE_THRESHOLD = 0.85
+
+# A model needs at least this many labeled examples before it is trusted
+MIN_TRAINING_DOCS = 20
+
+# How much history is read when a model is trained for the first time, in
+# CHUNK_SIZE pages since PostgREST caps each response at its max-rows
+HOUSEHOLD_TRAINING_LIMIT = 2000
+GLOBAL_TRAINING_LIMIT = 5000
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def extract_features(description: str, merchant: Optional[str] = None) -> list[int]:
+    """Turn an expense description/merchant into hashed feature buckets."""
+    tokens = [f"d:{t}" for t in TOKEN_RE.findall((description or "").lower()) if not t.isdigit()]
+    if merchant:
+        merchant_tokens = TOKEN_RE.findall(merchant.lower())
+        tokens.extend(f"m:{t}" for t in merchant_tokens)
+        # The whole normalized merchant is usually the strongest single signal
+        tokens.append("M:" + " ".join(merchant_tokens))
+    return [zlib.crc32(t.encode()) % NUM_BUCKETS for t in tokens]
+
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes over hashed tokens, updatable one example at a time."""
+
+    def __init__(self):
+        self.doc_counts: dict[str, int] = {}
+        self.token_totals: dict[str, int] = {}
+        self.feature_counts: dict[str, dict[int, int]] = {}
+        self.total_docs = 0
+        # What each known expense contributed, so a relabel removes exactly that
+        self.examples: dict[str, tuple[list[int], str]] = {}
+
+    def learn(self, features: list[int], category: str, weight: int = 1) -> None:
+        """Add (or with a negative weight, remove) one labeled example."""
+        if not features:
+            return
+        counts = self.feature_counts.setdefault(category, {})
+        for bucket in features:
+            value = counts.get(bucket, 0) + weight
+            if value > 0:
+                counts[bucket] = value
+            else:
+                counts.pop(bucket, None)
+        self.doc_counts[category] = max(self.doc_counts.get(category, 0) + weight, 0)
+        self.token_totals[category] = max(self.token_totals.get(category, 0) + weight * len(features), 0)
+        self.total_docs = max(self.total_docs + weight, 0)
+
+        if self.doc_counts[category] == 0:
+            del self.doc_counts[category]
+            del self.token_totals[category]
+            del self.feature_counts[category]
+
+    def learn_expense(self, expense_id: str, features: list[int], category: str) -> None:
+        """Label an expense, replacing whatever this model learned from it before."""
+        previous = self.examples.pop(expense_id, None)
+        if previous is not None:
+            self.learn(*previous, weight=-1)
+        self.learn(features, category)
+        self.examples[expense_id] = (features, category)
+
+    def predict(self, features: list[int]) -> tuple[Optional[str], float]:
+        """Return the most likely category and its posterior probability."""
+        if not features or not self.total_docs:
+            return None, 0.0
+
+        log_total_docs = math.log(self.total_docs)
+        scores = {}
+        for category, doc_count in self.doc_counts.items():
+            counts = self.feature_counts[category]
+            denominator = math.log(self.token_totals[category] + ALPHA * NUM_BUCKETS)
+            score = math.log(doc_count) - log_total_docs
+            for bucket in features:
+                score += math.log(counts.get(bucket, 0) + ALPHA) - denominator
+            scores[category] = score
+
+        best = max(scores, key=scores.get)
+        best_score = scores[best]
+        normalizer = sum(math.exp(s - best_score) for s in scores.values())
+        return best, 1.0 / normalizer
+
+
+class ClassifierMetrics:
+    """Counters describing how often and how well the local classifier answers."""
+
+    def __init__(self):
+        self.local_household = 0
+        self.local_global = 0
+        self.deferred = 0
+        self.local_latency_ns = 0
+        self.local_predictions = 0
+        self.shadow_checks = 0
+        self.shadow_agreements = 0
+        self.corrections = 0
+
+    def snapshot(self) -> dict:
+        local_answers = self.local_household + self.local_global
+        total = local_answers + self.deferred
+        return {
+            "requests": total,
+            "answered_locally": local_answers,
+            "answered_by_household_model": self.local_household,
+            "answered_by_global_model": self.local_global,
+            "deferred_to_ai": self.deferred,
+            "local_hit_rate": local_answers / total if total else 0.0,
+            "avg_local_latency_us": (self.local_latency_ns / self.local_predictions / 1000) if self.local_predictions else 0.0,
+            # Agreement between the local best guess and Gemini on deferred requests
+            "shadow_accuracy": self.shadow_agreements / self.shadow_checks if self.shadow_checks else None,
+            "corrections": self.corrections,
+        }
+
+
+class CategoryClassifier:
+    """First-tier expense categorizer trained on each household's own history.
+
+    A per-household model is consulted first, then a global model trained on
+    everyone's expenses. Only when neither is confident does the request fall
+    through to Gemini. Suggestions are never learned back: the models only
+    take labels from stored history and from users (an explicit category or
+    a correction), so they cannot grow confident in their own mistakes.
+    """
+
+    def __init__(self):
+        self.household_models: dict[str, NaiveBayesModel] = {}
+        self.household_of: dict[str, str] = {}
+        self.global_model: Optional[NaiveBayesModel] = None
+        self.metrics = ClassifierMetrics()
+        # Partner (un)linking in any worker or replica invalidates the household
+        household_cache.on_invalidate(self.forget_user)
+
+    async def suggest_category(
+        self,
+        supabase,
+        user_id: str,
+        description: str,
+        merchant: Optional[str],
+        ai_service,
+    ) -> str:
+        """Categorize locally when confident, otherwise ask the AI service."""
+        features = extract_features(description, merchant)
+        household_model = self._household_model(supabase, user_id)
+        global_model = self._global_model(supabase)
+
+        start = time.perf_counter_ns()
+        category, source = self._predict_local(features, household_model, global_model)
+        self.metrics.local_latency_ns += time.perf_counter_ns() - start
+        self.metrics.local_predictions += 1
+
+        if source == "household":
+            self.metrics.local_household += 1
+        elif source == "global":
+            self.metrics.local_global += 1
+        else:
+            self.metrics.deferred += 1
+            local_guess = category
+            category = await ai_service.categorize_expense(description, merchant)
+            if local_guess:
+                self.metrics.shadow_checks += 1
+                self.metrics.shadow_agreements += int(local_guess == category)
+
+        return category
+
+    def learn(
+        self,
+        user_id: str,
+        expense_id: str,
+        description: str,
+        merchant: Optional[str],
+        category: Optional[str],
+        previous_category: Optional[str] = None,
+    ) -> None:
+        """Incrementally update the models with a label a user gave or corrected.
+
+        Only what a model learned from this expense itself (in training or an
+        earlier call) is taken back, never `previous_category` as such: that
+        may have been a suggestion the model never counted.
+        """
+        if not category or category == previous_category:
+            return
+        features = extract_features(description, merchant)
+        models = [self.household_models.get(self.household_of.get(user_id, ""))]
+        models.append(self.global_model)
+
+        if previous_category:
+            self.metrics.corrections += 1
+        for model in models:
+            if model is not None:
+                model.learn_expense(expense_id, features, category)
+
+    def forget_user(self, user_id: str) -> None:
+        """Drop the household model for a user, e.g. after partner (un)linking."""
+        key = self.household_of.pop(user_id, None)
+        if key:
+            self.household_models.pop(key, None)
+            for member in key.split("|"):
+                self.household_of.pop(member, None)
+
+    def _predict_local(
+        self,
+        features: list[int],
+        household_model: NaiveBayesModel,
+        global_model: NaiveBayesModel,
+    ) -> tuple[Optional[str], Optional[str]]:
+        best_guess = None
+        for source, model in (("household", household_model), ("global", global_model)):
+            if model.total_docs < MIN_TRAINING_DOCS:
+                continue
+            category, confidence = model.predict(features)
+            if category and confidence >= CONFIDENCE_THRESHOLD:
+                return category, source
+            best_guess = best_guess or category
+        return best_guess, None
+
+    def _household_model(self, supabase, user_id: str) -> NaiveBayesModel:
+        key = self.household_of.get(user_id)
+        if key is not None:
+            CACHE_REQUESTS.inc(("classifier_model", "hit"))
+            return self.household_models[key]
+
+        member_ids = household_members(supabase, user_id)
+        key = household_key(member_ids)
+
+        model = self.household_models.get(key)
+        if model is None:
+            CACHE_REQUESTS.inc(("classifier_model", "miss"))
+            model = self._train(_read_recent(
+                lambda: supabase.table("expenses").select(
+                    "id, description, merchant, categories(name)"
+                ).in_("user_id", member_ids).not_.is_("category_id", "null").order(
+                    "date", desc=True
+                ).order("id"),
+                HOUSEHOLD_TRAINING_LIMIT,
+            ))
+            self.household_models[key] = model
+
+        for member in member_ids:
+            self.household_of[member] = key
+        return model
+
+    def _global_model(self, supabase) -> NaiveBayesModel:
+        if self.global_model is None:
+            self.global_model = self._train(_read_recent(
+                lambda: supabase.table("expenses").select(
+                    "id, description, merchant, categories(name)"
+                ).not_.is_("category_id", "null").order(
+                    "created_at", desc=True
+                ).order("id"),
+                GLOBAL_TRAINING_LIMIT,
+            ))
+        return self.global_model
+
+    @staticmethod
+    def _train(rows: list[dict]) -> NaiveBayesModel:
+        model = NaiveBayesModel()
+        for row in rows:
+            category = (row.get("categories") or {}).get("name")
+            if category:
+                model.learn_expense(row["id"], extract_features(row.get("description", ""), row.get("merchant")), category)
+        return model
+
+
+def _read_recent(query: Callable, limit: int) -> list[dict]:
+    """The first `limit` rows of an ordered query, one CHUNK_SIZE page per request."""
+    rows = []
+    while len(rows) < limit:
+        size = min(CHUNK_SIZE, limit - len(rows))
+        page = query().range(len(rows), len(rows) + size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < size:
+            break
+    return rows
+
+
+_classifier: Optional[CategoryClassifier] = None
+
+
+def get_category_classifier() -> CategoryClassifier:
+    global _classifier
+    if _classifier is None:
+        _classifier = CategoryClassifier()
+    return _classifier
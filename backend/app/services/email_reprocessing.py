@@ -0,0 +1,137 @@
+"""Re-extract expenses from stored Gmail messages, without calling the Gmail API.
+
+Run from the backend directory (every user with stored messages by default):
+
+    python -m app.services.email_reprocessing --user-id <uuid> --include-new
+"""
+import argparse
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from app.config import get_settings
+from app.database import get_supabase
+from app.models import ExpenseCreate
+from app.services.ai_service import AIAnalysisService
+from app.services.analytics_reads import as_utc
+from app.services.category_classifier import get_category_classifier
+from app.services.email_store import EmailStore, extract_stored
+from app.services.expense_stats import forget_stats
+from app.services.recurring_service import get_recurring_detector
+
+settings = get_settings()
+
+# Messages per extraction task, and expenses per bulk write
+BATCH_SIZE = 200
+
+# Below this many messages (about a second of extraction) starting worker
+# processes costs more than it saves
+PARALLEL_MIN_MESSAGES = 5000
+
+
+async def _extract_all(batches: list[list[tuple[str, str]]], workers: int) -> list[list]:
+    messages = sum(len(batch) for batch in batches)
+    workers = min(workers, os.cpu_count() or 1, len(batches))
+    if workers <= 1 or messages < PARALLEL_MIN_MESSAGES:
+        return [await asyncio.to_thread(extract_stored, batch) for batch in batches]
+    # Spawned rather than forked: the server process has threads and an event loop
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*(loop.run_in_executor(pool, extract_stored, batch) for batch in batches))
+
+
+def _differs(expense: ExpenseCreate, row: dict) -> bool:
+    if round(float(row["amount"]), 2) != round(expense.amount, 2):
+        return True
+    if row["description"] != expense.description or row.get("merchant") != expense.merchant:
+        return True
+    return expense.date is not None and as_utc(expense.date) != as_utc(datetime.fromisoformat(row["date"]))
+
+
+async def reprocess_stored_emails(supabase, user_id: str, store: EmailStore, include_new: bool = False) -> dict:
+    """Re-run extraction and categorization over a user's stored messages.
+
+    Expenses whose re-extracted amount, description, merchant or date changed
+    are updated in bulk; they are re-categorized only when the description or
+    merchant changed, so manual category corrections survive. With
+    `include_new`, messages that have no expense (nothing was extracted
+    before, or the user deleted it) are imported as well.
+    """
+    store.prune(user_id)
+    messages = sorted(store.index(user_id).items())
+    batches = [messages[i:i + BATCH_SIZE] for i in range(0, len(messages), BATCH_SIZE)]
+    extracted_batches = await _extract_all(batches, settings.email_reprocess_workers)
+
+    classifier = get_category_classifier()
+    ai_service = AIAnalysisService()
+    recurring = get_recurring_detector()
+    summary = {"messages": len(messages), "extracted": 0, "updated": 0, "inserted": 0}
+
+    for extracted in extracted_batches:
+        found = {gmail_id: expense for gmail_id, expense in extracted if expense}
+        summary["extracted"] += len(found)
+        if not found:
+            continue
+        existing = await asyncio.to_thread(
+            supabase.table("expenses")
+            .select("email_id, amount, description, merchant, date")
+            .eq("user_id", user_id)
+            .in_("email_id", list(found))
+            .execute
+        )
+        rows = {row["email_id"]: row for row in existing.data or []}
+
+        changes = []
+        for gmail_id, expense in found.items():
+            row = rows.get(gmail_id)
+            if (row is None and not include_new) or (row is not None and not _differs(expense, row)):
+                continue
+            category = None
+            if row is None or row["description"] != expense.description or row.get("merchant") != expense.merchant:
+                category = await classifier.suggest_category(
+                    supabase, user_id, expense.description, expense.merchant, ai_service
+                )
+            changes.append({
+                "email_id": gmail_id,
+                "amount": expense.amount,
+                "description": expense.description,
+                "merchant": expense.merchant,
+                "date": expense.date.isoformat() if expense.date else None,
+                "category": category,
+            })
+        if not changes:
+            continue
+
+        # One call per batch: updates and inserts commit together
+        result = await asyncio.to_thread(
+            supabase.rpc("reextract_gmail_expenses", {"p_user_id": user_id, "p_expenses": changes}).execute
+        )
+        for row in result.data or []:
+            summary["inserted" if row["inserted"] else "updated"] += 1
+            recurring.observe(user_id, {**row["expense"], "category": row["category"]})
+
+    if summary["updated"] or summary["inserted"]:
+        forget_stats(supabase, user_id)
+    return summary
+
+
+async def _reprocess_users(user_ids: list[str], include_new: bool) -> None:
+    store = EmailStore(settings.email_store_dir, settings.email_store_retention_days)
+    for user_id in user_ids or store.users():
+        summary = await reprocess_stored_emails(get_supabase(), user_id, store, include_new)
+        print(f"{user_id}: {summary}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", action="append", default=[], help="Repeatable; every stored user by default")
+    parser.add_argument("--include-new", action="store_true", help="Also import messages that have no expense")
+    args = parser.parse_args()
+    if not settings.email_store_dir:
+        parser.error("EMAIL_STORE_DIR is not set")
+    asyncio.run(_reprocess_users(args.user_id, args.include_new))
+
+
+if __name__ == "__main__":
+    main()
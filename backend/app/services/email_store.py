@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Iterator, Optional
+from app.config import get_settings
+from app.models import ExpenseCreate
+from app.services.gmail_service import ExpenseExtractor, GmailService
+
+settings = get_settings()
+
+# User and Gmail message ids become path components, so only these characters are accepted
+_SAFE_ID = re.compile(r"[A-Za-z0-9_-]+")
+# {gmail_id}.{sha256 of the message}.json.gz
+_BLOB_NAME = re.compile(r"(?P<gmail_id>[A-Za-z0-9_-]+)\.(?P<digest>[0-9a-f]{64})\.json\.gz")
+
+
+def _check_id(value: str) -> str:
+    if not value or not _SAFE_ID.fullmatch(value):
+        raise ValueError(f"Invalid id for the email store: {value!r}")
+    return value
+
+
+def _unlink(path: str) -> bool:
+    try:
+        os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+class EmailStore:
+    """Raw Gmail messages kept on local disk, so receipts can be re-extracted offline.
+
+    Each message is stored gzip-compressed as `{root}/{user_id}/{gmail_id}.{sha256}.json.gz`,
+    addressed by its Gmail id and the hash of its canonical JSON. Writes go
+    through a temporary file and a rename, so readers never see a partial
+    blob, and storing a message that is already there is a no-op. Blobs are
+    pruned `retention_days` after they were stored (0 keeps them forever).
+    """
+
+    def __init__(self, root: str, retention_days: int = 0):
+        self.root = root
+        self.retention_days = retention_days
+
+    def put(self, user_id: str, message: dict) -> str:
+        """Store a raw message; returns its path."""
+        gmail_id = _check_id(message["id"])
+        data = json.dumps(message, sort_keys=True, separators=(",", ":")).encode()
+        digest = hashlib.sha256(data).hexdigest()
+
+        directory = os.path.join(self.root, _check_id(user_id))
+        path = os.path.join(directory, f"{gmail_id}.{digest}.json.gz")
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # mtime=0 keeps the compressed bytes a function of the content alone
+                f.write(gzip.compress(data, compresslevel=6, mtime=0))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return path
+
+    def index(self, user_id: str) -> dict[str, str]:
+        """Path of each stored message of a user, by Gmail id.
+
+        When a message changed upstream and was stored again, the newest
+        version wins and the older ones are deleted.
+        """
+        newest: dict[str, tuple[float, str]] = {}
+        for gmail_id, mtime, path in self._blobs(user_id):
+            current = newest.get(gmail_id)
+            if current is None:
+                newest[gmail_id] = (mtime, path)
+                continue
+            older, newer = sorted([current, (mtime, path)])
+            newest[gmail_id] = newer
+            _unlink(older[1])
+        return {gmail_id: path for gmail_id, (_, path) in newest.items()}
+
+    @staticmethod
+    def read(path: str) -> dict:
+        with gzip.open(path, "rb") as f:
+            return json.loads(f.read())
+
+    def users(self) -> list[str]:
+        """Users with stored messages."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(entry.name for entry in os.scandir(self.root) if entry.is_dir() and _SAFE_ID.fullmatch(entry.name))
+
+    def prune(self, user_id: Optional[str] = None) -> int:
+        """Delete blobs stored longer than the retention period; returns how many."""
+        if not self.retention_days:
+            return 0
+        cutoff = time.time() - self.retention_days * 86400
+        removed = 0
+        for user in [user_id] if user_id else self.users():
+            for _, mtime, path in self._blobs(user):
+                if mtime < cutoff:
+                    removed += _unlink(path)
+        return removed
+
+    def _blobs(self, user_id: str) -> Iterator[tuple[str, float, str]]:
+        """(gmail_id, stored at, path) of each blob of a user."""
+        directory = os.path.join(self.root, _check_id(user_id))
+        if not os.path.isdir(directory):
+            return
+        for entry in os.scandir(directory):
+            match = _BLOB_NAME.fullmatch(entry.name)
+            if not match:
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                # Pruned or superseded by another worker meanwhile
+                continue
+            yield match["gmail_id"], mtime, entry.path
+
+
+def extract_stored(messages: list[tuple[str, str]]) -> list[tuple[str, Optional[ExpenseCreate]]]:
+    """Parse and extract (gmail_id, path) stored messages; runs in worker processes."""
+    extracted = []
+    for gmail_id, path in messages:
+        try:
+            email = GmailService.parse_email(EmailStore.read(path))
+        except (OSError, ValueError, EOFError):
+            # Unreadable blob (e.g. truncated by a full disk); the next sync stores it again
+            extracted.append((gmail_id, None))
+            continue
+        extracted.append((gmail_id, ExpenseExtractor.extract_expense(email)))
+    return extracted
+
+
+_store: Optional[EmailStore] = None
+
+
+def get_email_store() -> Optional[EmailStore]:
+    """The configured store, or None when EMAIL_STORE_DIR is empty."""
+    global _store
+    if _store is None and settings.email_store_dir:
+        _store = EmailStore(settings.email_store_dir, settings.email_store_retention_days)
+    return _store
@@ -0,0 +1,106 @@
+import sys
+from array import array
+from datetime import date
+from typing import Any, Hashable, Iterable, Optional
+
+
+class Interner:
+    """Maps repeated values to small integer codes; code i decodes to values[i]."""
+
+    def __init__(self):
+        self.values: list = []
+        self.codes: dict[Hashable, int] = {}
+
+    def code(self, value: Hashable) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ExpenseFrame:
+    """Expense rows held as columns instead of one dict per row.
+
+    Amounts are a float64 array. Day, category, merchant and description are
+    uint32 codes into interned value lists, since a household's history
+    repeats a few hundred days, a dozen categories and a few hundred
+    merchants many times over. Days are the UTC calendar day ("YYYY-MM-DD")
+    of each expense; missing categories, merchants and descriptions intern
+    as None. Ids are only kept when the frame is built with `with_ids`.
+
+    Frames are filled straight from response rows: PostgREST dicts with an
+    embedded `categories {name}`, or analytics_reads records with a
+    `category_name` column. Consumers work per code where they can, e.g.
+    normalizing each distinct merchant once instead of once per row.
+    """
+
+    def __init__(self, with_ids: bool = False):
+        self.amounts = array("d")
+        self.day_codes = array("I")
+        self.category_codes = array("I")
+        self.merchant_codes = array("I")
+        self.description_codes = array("I")
+        self.ids: Optional[list[str]] = [] if with_ids else None
+        self._days = Interner()
+        self._categories = Interner()
+        self._merchants = Interner()
+        self._descriptions = Interner()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any], with_ids: bool = False) -> "ExpenseFrame":
+        frame = cls(with_ids)
+        frame.extend(rows)
+        return frame
+
+    def extend(self, rows: Iterable[Any]) -> None:
+        """Append rows; each needs amount and date, and may have category, merchant, description and id."""
+        day_code, category_code = self._days.code, self._categories.code
+        merchant_code, description_code = self._merchants.code, self._descriptions.code
+        for row in rows:
+            if "category_name" in row.keys():
+                category = row["category_name"]
+            else:
+                embedded = row.get("categories")
+                category = embedded.get("name") if embedded else row.get("category")
+            self.amounts.append(float(row["amount"] or 0))
+            self.day_codes.append(day_code(row["date"][:10]))
+            self.category_codes.append(category_code(category))
+            self.merchant_codes.append(merchant_code(row.get("merchant")))
+            self.description_codes.append(description_code(row.get("description")))
+            if self.ids is not None:
+                self.ids.append(row.get("id") or "")
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @property
+    def days(self) -> list[str]:
+        return self._days.values
+
+    @property
+    def categories(self) -> list[Optional[str]]:
+        return self._categories.values
+
+    @property
+    def merchants(self) -> list[Optional[str]]:
+        return self._merchants.values
+
+    @property
+    def descriptions(self) -> list[Optional[str]]:
+        return self._descriptions.values
+
+    def day_ordinals(self) -> list[int]:
+        """date.toordinal() of each day code."""
+        return [date.fromisoformat(day).toordinal() for day in self.days]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the frame: columns, interned values and their lookup dicts."""
+        columns = (self.amounts, self.day_codes, self.category_codes, self.merchant_codes, self.description_codes)
+        total = sum(sys.getsizeof(column) for column in columns)
+        for interner in (self._days, self._categories, self._merchants, self._descriptions):
+            total += sys.getsizeof(interner.values) + sys.getsizeof(interner.codes)
+            total += sum(sys.getsizeof(value) for value in interner.values if value is not None)
+        if self.ids is not None:
+            total += sys.getsizeof(self.ids) + sum(sys.getsizeof(i) for i in self.ids)
+        return total
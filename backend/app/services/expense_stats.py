@@ -0,0 +1,185 @@
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from app.services.analytics_reads import as_utc, fetch_category_breakdowns, iter_expense_chunks
+from app.services.cache import Cache
+from app.services.household import household_key, household_members
+from app.services.single_flight import get_single_flight
+
+STATS_TIMEFRAMES = {"week": 7, "month": 30, "quarter": 90, "year": 365}
+
+RECENT_EXPENSES = 10
+TOP_CATEGORIES = 5
+
+# Dashboard stats per household (or single user) and timeframe. Mutations
+# drop them through forget_stats; the TTL bounds drift of the time window.
+stats_cache = Cache("stats", ttl=60)
+
+
+def stats_cache_key(member_ids: list[str], timeframe: str) -> tuple:
+    return (household_key(member_ids), timeframe)
+
+
+def forget_stats(supabase, user_id: str) -> None:
+    """Invalidate cached stats that include a user's expenses: personal and household views."""
+    scopes = {(user_id,), tuple(household_members(supabase, user_id))}
+    stats_cache.delete(*(stats_cache_key(list(scope), timeframe) for scope in scopes for timeframe in STATS_TIMEFRAMES))
+
+
+def stats_start_date(timeframe: str, now: datetime) -> datetime:
+    """Start of a dashboard timeframe; unknown timeframes fall back to a month."""
+    return now - timedelta(days=STATS_TIMEFRAMES.get(timeframe, STATS_TIMEFRAMES["month"]))
+
+
+async def load_expense_stats(
+    supabase,
+    member_ids: list[str],
+    timeframe: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> dict:
+    """Dashboard stats for the members over a timeframe, cached and single-flighted per household.
+
+    A custom range (start_date, and optionally end_date) replaces the
+    timeframe. Custom ranges are not cached: forget_stats only knows the
+    timeframes.
+    """
+    if start_date is None:
+        if timeframe not in STATS_TIMEFRAMES:
+            timeframe = "month"
+        cache_key = stats_cache_key(member_ids, timeframe)
+        cached = stats_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    else:
+        cache_key = stats_cache_key(member_ids, f"{start_date.isoformat()}/{end_date.isoformat() if end_date else ''}")
+
+    async def load_stats() -> dict:
+        now = datetime.now(timezone.utc)
+        start = start_date or stats_start_date(timeframe, now)
+        stats = ExpenseStatsAccumulator(end_date or now, start)
+        async for chunk in iter_expense_chunks(supabase, member_ids, start, end_date):
+            stats.add(chunk)
+        if start_date is not None:
+            return stats.result()
+        return stats_cache.set(cache_key, stats.result())
+
+    # Both partners opening the household view at once share one query
+    key = (*cache_key, "/expenses/stats")
+    return await get_single_flight().do(key, load_stats, "/expenses/stats")
+
+
+async def load_partner_comparison(supabase, user_id: str, partner_id: str, timeframe: str) -> dict:
+    """Spend of a user against their partner over a timeframe: totals, shares and by category."""
+    start_date = stats_start_date(timeframe, datetime.now())
+
+    # Both partners see the same two breakdowns, so concurrent loads share one
+    # computation; only the user/partner orientation differs per caller.
+    key = (household_key([user_id, partner_id]), "/analysis/comparison", timeframe)
+    breakdowns = await get_single_flight().do(
+        key, lambda: fetch_category_breakdowns(supabase, [user_id, partner_id], start_date), "/analysis/comparison"
+    )
+    user_breakdown = breakdowns[user_id]
+    partner_breakdown = breakdowns[partner_id]
+
+    combined_total = user_breakdown["total"] + partner_breakdown["total"]
+
+    return {
+        "user": {
+            "total": user_breakdown["total"],
+            "percentage": (user_breakdown["total"] / combined_total * 100) if combined_total > 0 else 0,
+            "by_category": user_breakdown["by_category"],
+        },
+        "partner": {
+            "total": partner_breakdown["total"],
+            "percentage": (partner_breakdown["total"] / combined_total * 100) if combined_total > 0 else 0,
+            "by_category": partner_breakdown["by_category"],
+        },
+        "combined": {
+            "total": combined_total,
+            "by_category": {
+                cat: user_breakdown["by_category"].get(cat, 0) + partner_breakdown["by_category"].get(cat, 0)
+                for cat in set(user_breakdown["by_category"]) | set(partner_breakdown["by_category"])
+            },
+        },
+    }
+
+
+class ExpenseStatsAccumulator:
+    """Dashboard stats folded from expense rows one chunk at a time.
+
+    Keeps running totals, a sum per category, the six monthly trend buckets
+    and a heap of the newest expenses, so memory stays flat however many
+    rows the window holds. `now` is the end of the window.
+    """
+
+    def __init__(self, now: datetime, start_date: datetime):
+        self.now = as_utc(now)
+        self.start_date = as_utc(start_date)
+        self.month_start = self.now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        # Naive row dates are UTC like PostgREST's; they compare against this instead
+        self.month_start_naive = self.month_start.replace(tzinfo=None)
+        self.total_spent = 0
+        self.this_month = 0
+        self.category_totals: dict[str, dict] = {}
+
+        # Last 6 months as ("YYYY-MM", label), oldest first
+        self.trend_months = []
+        for i in range(5, -1, -1):
+            month_date = self.now - timedelta(days=30 * i)
+            self.trend_months.append((month_date.strftime("%Y-%m"), month_date.strftime("%b")))
+        self.month_totals = {month_key: 0 for month_key, _ in self.trend_months}
+
+        # Min-heap of (date, arrival, expense): the newest RECENT_EXPENSES seen so far.
+        # Dates order as strings: one source writes them all in the same offset.
+        self.recent: list[tuple[str, int, dict]] = []
+        self.seen = 0
+
+    def add(self, expenses: list[dict]) -> None:
+        for e in expenses:
+            amount = e["amount"]
+            self.total_spent += amount
+
+            date = datetime.fromisoformat(e["date"])
+            if date >= (self.month_start if date.tzinfo else self.month_start_naive):
+                self.this_month += amount
+
+            cat = e.get("categories")
+            cat_name = cat.get("name", "Other") if cat else "Other"
+            totals = self.category_totals.get(cat_name)
+            if totals is None:
+                cat_color = cat.get("color", "#64748b") if cat else "#64748b"
+                totals = self.category_totals[cat_name] = {"name": cat_name, "color": cat_color, "amount": 0}
+            totals["amount"] += amount
+
+            month_key = e["date"][:7]
+            if month_key in self.month_totals:
+                self.month_totals[month_key] += amount
+
+            self.seen += 1
+            if len(self.recent) < RECENT_EXPENSES:
+                heapq.heappush(self.recent, (e["date"], self.seen, e))
+            elif e["date"] > self.recent[0][0]:
+                heapq.heapreplace(self.recent, (e["date"], self.seen, e))
+
+    def result(self) -> dict:
+        days_in_range = (self.now - self.start_date).days or 1
+        return {
+            "total_spent": self.total_spent,
+            "total_this_month": self.this_month,
+            "average_daily": self.total_spent / days_in_range,
+            "top_categories": heapq.nlargest(
+                TOP_CATEGORIES, self.category_totals.values(), key=lambda x: x["amount"]
+            ),
+            "recent_expenses": [e for _, _, e in sorted(self.recent, reverse=True)],
+            "monthly_trend": [
+                {"month": label, "amount": self.month_totals[month_key]} for month_key, label in self.trend_months
+            ],
+        }
+
+
+def summarize_expense_stats(expenses: list[dict], now: datetime, start_date: datetime) -> dict:
+    """Dashboard totals, top categories and monthly trend for expenses since start_date."""
+    stats = ExpenseStatsAccumulator(now, start_date)
+    stats.add(expenses)
+    return stats.result()
@@ -0,0 +1,181 @@
+from datetime import date, timedelta
+from typing import Optional
+from app.services.analysis_cache import AnalysisCache
+from app.services.anomaly_service import normalize_merchant
+from app.services.expense_frame import ExpenseFrame
+from app.services.recurring_service import PERIODS
+
+# History used for the run-rate prior and the seasonal profile
+HISTORY_DAYS = 2 * 365
+
+# Recent window used for a category's typical daily spend
+BASELINE_DAYS = 90
+
+# Seasonal multipliers are clamped so one odd month can't dominate
+SEASONAL_RANGE = (0.5, 2.0)
+
+# A seasonal profile needs this many months of last year's data
+MIN_SEASONAL_MONTHS = 6
+
+
+def month_bounds(day: date) -> tuple[date, date]:
+    start = day.replace(day=1)
+    next_month = (start + timedelta(days=32)).replace(day=1)
+    return start, next_month - timedelta(days=1)
+
+
+def quarter_bounds(day: date) -> tuple[date, date]:
+    start = date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    end_month = start.month + 2
+    _, end = month_bounds(date(day.year, end_month, 1))
+    return start, end
+
+
+class SpendForecaster:
+    """Project end-of-month and end-of-quarter spend per category.
+
+    Each category's projection is what has been spent so far, plus the
+    recurring charges still expected before the period ends, plus a run rate
+    for everything else over the remaining days. The run rate blends the
+    current period with the category's recent baseline (trusting the current
+    period more as it progresses) and is scaled by last year's seasonality.
+    """
+
+    @classmethod
+    def forecast(cls, expenses: ExpenseFrame, recurring: list[dict], today: Optional[date] = None) -> dict:
+        """Build the forecast from household history and active recurring series.
+
+        `recurring` comes from RecurringDetector.
+        """
+        today = today or date.today()
+        active = [r for r in recurring if r.get("status") == "active"]
+        # A series is reported under its merchant, or its normalized description when it has none
+        recurring_keys = {normalize_merchant(r["merchant"]) for r in active}
+
+        # Per distinct value, not per row
+        day_ordinals = expenses.day_ordinals()
+        category_names = [c or "Other" for c in expenses.categories]
+        merchant_keys = [normalize_merchant(m) for m in expenses.merchants]
+
+        # Daily rollups per category, split into recurring and other spend. Rows
+        # are matched to series by the key RecurringIndex groups them by.
+        other_daily: dict[str, dict[int, float]] = {}
+        recurring_daily: dict[str, dict[int, float]] = {}
+        for amount, day, category, merchant, description in zip(
+            expenses.amounts, expenses.day_codes, expenses.category_codes,
+            expenses.merchant_codes, expenses.description_codes,
+        ):
+            key = merchant_keys[merchant] or normalize_merchant(expenses.descriptions[description])
+            target = recurring_daily if key in recurring_keys else other_daily
+            days = target.setdefault(category_names[category], {})
+            day = day_ordinals[day]
+            days[day] = days.get(day, 0) + amount
+
+        categories = sorted(set(other_daily) | set(recurring_daily) | {r.get("category") or "Other" for r in active})
+        seasonal = cls._seasonal_factors(other_daily, today)
+
+        return {
+            "as_of": today.isoformat(),
+            "month": cls._project(month_bounds(today), today, categories, other_daily, recurring_daily, active, seasonal),
+            "quarter": cls._project(quarter_bounds(today), today, categories, other_daily, recurring_daily, active, seasonal),
+        }
+
+    @classmethod
+    def _project(
+        cls,
+        bounds: tuple[date, date],
+        today: date,
+        categories: list[str],
+        other_daily: dict[str, dict[int, float]],
+        recurring_daily: dict[str, dict[int, float]],
+        active: list[dict],
+        seasonal: dict[str, float],
+    ) -> dict:
+        start, end = bounds
+        start_day, end_day, today_day = start.toordinal(), end.toordinal(), today.toordinal()
+        elapsed_days = today_day - start_day + 1
+        remaining_days = end_day - today_day
+        period_days = end_day - start_day + 1
+        weight = elapsed_days / period_days
+
+        expected_recurring = cls._expected_recurring(active, today_day, end_day)
+
+        rows = []
+        for category in categories:
+            other = other_daily.get(category, {})
+            spent_other = sum(a for d, a in other.items() if start_day <= d <= today_day)
+            spent_recurring = sum(a for d, a in recurring_daily.get(category, {}).items() if start_day <= d <= today_day)
+
+            baseline_total = sum(a for d, a in other.items() if start_day - BASELINE_DAYS <= d < start_day)
+            daily_rate = weight * (spent_other / elapsed_days) + (1 - weight) * (baseline_total / BASELINE_DAYS)
+            projected_other = daily_rate * remaining_days * seasonal.get(category, 1.0)
+            recurring_expected = expected_recurring.get(category, 0.0)
+
+            spent = spent_other + spent_recurring
+            rows.append({
+                "category": category,
+                "spent": round(spent, 2),
+                "recurring_expected": round(recurring_expected, 2),
+                "projected": round(spent + recurring_expected + projected_other, 2),
+                "daily_run_rate": round(daily_rate, 2),
+                "seasonal_factor": round(seasonal.get(category, 1.0), 2),
+            })
+
+        rows.sort(key=lambda r: r["projected"], reverse=True)
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "days_remaining": remaining_days,
+            "spent": round(sum(r["spent"] for r in rows), 2),
+            "projected": round(sum(r["projected"] for r in rows), 2),
+            "categories": rows,
+        }
+
+    @staticmethod
+    def _expected_recurring(active: list[dict], today_day: int, end_day: int) -> dict[str, float]:
+        """Sum the recurring charges still expected after today and up to end_day."""
+        expected: dict[str, float] = {}
+        for series in active:
+            period_days = PERIODS[series["period"]][0]
+            due = date.fromisoformat(series["next_expected_date"]).toordinal()
+            # Catch up on charges whose expected date already passed without one
+            while due < today_day:
+                due += round(period_days)
+            category = series.get("category") or "Other"
+            while due <= end_day:
+                expected[category] = expected.get(category, 0) + series["amount"]
+                due += round(period_days)
+        return expected
+
+    @staticmethod
+    def _seasonal_factors(other_daily: dict[str, dict[int, float]], today: date) -> dict[str, float]:
+        """Ratio of last year's spend in this month to last year's average month."""
+        last_year_start = date(today.year - 1, 1, 1)
+        last_year_end = date(today.year - 1, 12, 31)
+        target_month = today.month
+
+        factors = {}
+        for category, days in other_daily.items():
+            monthly: dict[int, float] = {}
+            for day, amount in days.items():
+                if last_year_start.toordinal() <= day <= last_year_end.toordinal():
+                    month = date.fromordinal(day).month
+                    monthly[month] = monthly.get(month, 0) + amount
+            if len(monthly) < MIN_SEASONAL_MONTHS:
+                continue
+            average = sum(monthly.values()) / 12
+            if average <= 0:
+                continue
+            low, high = SEASONAL_RANGE
+            factors[category] = min(max(monthly.get(target_month, 0) / average, low), high)
+        return factors
+
+
+_forecast_cache: Optional[AnalysisCache] = None
+
+
+def get_forecast_cache() -> AnalysisCache:
+    global _forecast_cache
+    if _forecast_cache is None:
+        _forecast_cache = AnalysisCache("forecast")
+    return _forecast_cache
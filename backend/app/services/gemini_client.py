@@ -0,0 +1,228 @@
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+from app.config import get_settings
+from app.services.metrics import observe_upstream
+
+settings = get_settings()
+
+
+class GeminiUnavailableError(Exception):
+    """Raised when Gemini is skipped because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures, probing again after a cool-down."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probe_in_flight:
+            # Let a single request through to test whether Gemini recovered
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """End a probe that recorded neither success nor failure (e.g. it was cancelled)."""
+        self.probe_in_flight = False
+
+
+class GeminiStats:
+    """Latency and error counters for Gemini calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.successes = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.slot_timeouts = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def snapshot(self, breaker: CircuitBreaker) -> dict:
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "slot_timeouts": self.slot_timeouts,
+            "rejected_by_breaker": self.rejected,
+            "in_flight": self.in_flight,
+            "avg_latency_seconds": self.total_latency / self.successes if self.successes else 0.0,
+            "max_latency_seconds": self.max_latency,
+            "circuit_state": breaker.state,
+        }
+
+
+class GeminiClient:
+    """Process-wide Gemini client using the async generate API.
+
+    Calls share one model instance, are capped by a concurrency semaphore and
+    a per-call deadline, and go through a circuit breaker so callers can drop
+    to their fallback paths immediately while Gemini is slow or down.
+    """
+
+    def __init__(self, model_name: str = "gemini-pro"):
+        self.model_name = model_name
+        self._model = None
+        self.semaphore = asyncio.Semaphore(settings.gemini_max_concurrency)
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.gemini_breaker_failures,
+            reset_timeout=settings.gemini_breaker_reset_seconds,
+        )
+        self.stats = GeminiStats()
+
+    @property
+    def model(self):
+        """The Gemini model, importing and configuring the SDK on first use."""
+        if self._model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=settings.gemini_api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    @model.setter
+    def model(self, model) -> None:
+        self._model = model
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate text for a prompt, raising on timeout, error or open circuit."""
+        probe = self.breaker.state == "half_open"
+        if not self.breaker.allow_request():
+            self.stats.rejected += 1
+            raise GeminiUnavailableError("Gemini circuit breaker is open")
+
+        self.stats.calls += 1
+        self.stats.in_flight += 1
+        # The deadline covers waiting for a concurrency slot as well as the call itself
+        deadline = time.monotonic() + (timeout or settings.gemini_timeout_seconds)
+        settled = False
+        try:
+            await self._acquire_slot(deadline)
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt), deadline - time.monotonic()
+                )
+                text = response.text
+            except Exception as e:
+                settled = True
+                self._record_failure("generate", start, isinstance(e, asyncio.TimeoutError))
+                raise
+            finally:
+                self.semaphore.release()
+            settled = True
+            self._record_success("generate", start)
+            return text
+        finally:
+            self.stats.in_flight -= 1
+            if probe and not settled:
+                self.breaker.release_probe()
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield response text chunks as Gemini produces them, within one deadline."""
+        probe = self.breaker.state == "half_open"
+        if not self.breaker.allow_request():
+            self.stats.rejected += 1
+            raise GeminiUnavailableError("Gemini circuit breaker is open")
+
+        self.stats.calls += 1
+        self.stats.in_flight += 1
+        deadline = time.monotonic() + (timeout or settings.gemini_timeout_seconds)
+        settled = False
+        try:
+            await self._acquire_slot(deadline)
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, stream=True), deadline - time.monotonic()
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), deadline - time.monotonic())
+                    except StopAsyncIteration:
+                        break
+                    yield chunk.text
+            except Exception as e:
+                settled = True
+                self._record_failure("stream", start, isinstance(e, asyncio.TimeoutError))
+                raise
+            finally:
+                self.semaphore.release()
+            settled = True
+            self._record_success("stream", start)
+        finally:
+            self.stats.in_flight -= 1
+            # Cancelled, closed by a disconnecting client, or no slot in time:
+            # none of that says whether Gemini recovered, so let the next probe through
+            if probe and not settled:
+                self.breaker.release_probe()
+
+    async def _acquire_slot(self, deadline: float) -> None:
+        """Wait for a concurrency slot; running out of time here is local saturation, not a Gemini failure."""
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            self.stats.slot_timeouts += 1
+            raise
+
+    def _record_success(self, operation: str, start: float) -> None:
+        latency = time.perf_counter() - start
+        observe_upstream("gemini", operation, self.model_name, latency)
+        self.stats.successes += 1
+        self.stats.total_latency += latency
+        self.stats.max_latency = max(self.stats.max_latency, latency)
+        self.breaker.record_success()
+
+    def _record_failure(self, operation: str, start: float, timed_out: bool) -> None:
+        if timed_out:
+            self.stats.timeouts += 1
+        else:
+            self.stats.errors += 1
+        self.breaker.record_failure()
+        observe_upstream("gemini", operation, self.model_name, time.perf_counter() - start, error=True)
+
+    def snapshot(self) -> dict:
+        return self.stats.snapshot(self.breaker)
+
+
+_client: Optional[GeminiClient] = None
+
+
+def get_gemini_client() -> GeminiClient:
+    global _client
+    if _client is None:
+        _client = GeminiClient()
+    return _client
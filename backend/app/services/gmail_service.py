@@ -1,12 +1,10 @@
 import base64
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from app.config import get_settings
 from app.models import ExpenseCreate, ExpenseSource
+from app.services.metrics import upstream_call
 
 settings = get_settings()
 
@@ -20,25 +18,33 @@ class GmailService:
     ]
 
     def __init__(self, refresh_token: str):
+        # Imported here so the Google API client libraries only load when Gmail is used
+        from google.oauth2.credentials import Credentials
+        from google.auth.transport.requests import Request
+        from googleapiclient.discovery import build
+
         self.credentials = Credentials(
             token=None,
             refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
+            token_uri=settings.google_token_uri,
             client_id=settings.google_client_id,
             client_secret=settings.google_client_secret,
             scopes=self.SCOPES,
         )
         if self.credentials.expired or not self.credentials.token:
-            self.credentials.refresh(Request())
+            with upstream_call("oauth", "refresh"):
+                self.credentials.refresh(Request())
 
-        self.service = build("gmail", "v1", credentials=self.credentials)
+        client_options = {"api_endpoint": settings.gmail_api_endpoint} if settings.gmail_api_endpoint else None
+        self.service = build("gmail", "v1", credentials=self.credentials, client_options=client_options)
 
     def get_or_create_expense_label(self) -> str:
         """Get or create the expense tracking label."""
         label_name = settings.expense_email_label
 
         # Check if label exists
-        results = self.service.users().labels().list(userId="me").execute()
+        with upstream_call("gmail", "labels.list"):
+            results = self.service.users().labels().list(userId="me").execute()
         labels = results.get("labels", [])
 
         for label in labels:
@@ -51,42 +57,40 @@ class GmailService:
             "labelListVisibility": "labelShow",
             "messageListVisibility": "show",
         }
-        created_label = (
-            self.service.users().labels().create(userId="me", body=label_body).execute()
-        )
+        with upstream_call("gmail", "labels.create"):
+            created_label = (
+                self.service.users().labels().create(userId="me", body=label_body).execute()
+            )
         return created_label["id"]
 
-    def get_labeled_emails(
-        self, label_id: str, after_date: Optional[datetime] = None
-    ) -> list[dict]:
-        """Fetch emails with the expense label."""
+    def list_labeled_message_ids(self, after_date: Optional[datetime] = None) -> list[str]:
+        """IDs of the newest messages with the expense label."""
         query = f"label:{settings.expense_email_label}"
         if after_date:
             query += f" after:{after_date.strftime('%Y/%m/%d')}"
 
-        results = (
-            self.service.users()
-            .messages()
-            .list(userId="me", q=query, maxResults=100)
-            .execute()
-        )
-
-        messages = results.get("messages", [])
-        emails = []
-
-        for msg in messages:
-            email_data = (
+        with upstream_call("gmail", "messages.list"):
+            results = (
                 self.service.users()
                 .messages()
-                .get(userId="me", id=msg["id"], format="full")
+                .list(userId="me", q=query, maxResults=100)
                 .execute()
             )
-            emails.append(self._parse_email(email_data))
+        return [msg["id"] for msg in results.get("messages", [])]
 
-        return emails
+    def get_message(self, message_id: str) -> dict:
+        """The raw Gmail message (format=full)."""
+        with upstream_call("gmail", "messages.get"):
+            return (
+                self.service.users()
+                .messages()
+                .get(userId="me", id=message_id, format="full")
+                .execute()
+            )
 
-    def _parse_email(self, email_data: dict) -> dict:
-        """Parse email data into a structured format."""
+    @classmethod
+    def parse_email(cls, email_data: dict) -> dict:
+        """Parse a raw Gmail message into a structured format."""
         headers = email_data.get("payload", {}).get("headers", [])
 
         subject = ""
@@ -103,7 +107,7 @@ class GmailService:
                 date_str = header.get("value", "")
 
         # Get email body
-        body = self._get_email_body(email_data.get("payload", {}))
+        body = cls._get_email_body(email_data.get("payload", {}))
 
         return {
             "id": email_data["id"],
@@ -112,9 +116,11 @@ class GmailService:
             "date": date_str,
             "body": body,
             "snippet": email_data.get("snippet", ""),
+            "internal_date": email_data.get("internalDate"),
         }
 
-    def _get_email_body(self, payload: dict) -> str:
+    @staticmethod
+    def _get_email_body(payload: dict) -> str:
         """Extract the text body from email payload."""
         body = ""
 
@@ -171,8 +177,8 @@ class ExpenseExtractor:
         # Extract merchant
         merchant = cls._extract_merchant(combined_text, email.get("from", ""))
 
-        # Parse date
-        date = cls._parse_date(email.get("date", ""))
+        # Parse date, falling back to when Gmail received the message
+        date = cls._parse_date(email.get("date", "")) or cls._received_at(email)
 
         return ExpenseCreate(
             amount=amount,
@@ -238,4 +244,12 @@ class ExpenseExtractor:
             except ValueError:
                 continue
 
-        return datetime.now()
+        return None
+
+    @classmethod
+    def _received_at(cls, email: dict) -> Optional[datetime]:
+        """Gmail's internalDate (epoch milliseconds) as a UTC datetime."""
+        internal_date = email.get("internal_date")
+        if not internal_date:
+            return None
+        return datetime.fromtimestamp(int(internal_date) / 1000, tz=timezone.utc)
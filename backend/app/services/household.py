@@ -0,0 +1,24 @@
+from app.services.cache import Cache
+
+# Partner links change rarely and every change goes through forget_household
+household_cache = Cache("household", ttl=3600)
+
+
+def household_members(supabase, user_id: str) -> list[str]:
+    """Return the sorted ids of a user and their linked partner, if any."""
+    members = household_cache.get(user_id)
+    if members is not None:
+        return members
+    profile = supabase.table("profiles").select("partner_id").eq("id", user_id).single().execute()
+    partner_id = profile.data.get("partner_id") if profile.data else None
+    return household_cache.set(user_id, sorted(filter(None, [user_id, partner_id])))
+
+
+def household_key(member_ids: list[str]) -> str:
+    """Stable key identifying a household by its members."""
+    return "|".join(sorted(member_ids))
+
+
+def forget_household(*user_ids: str) -> None:
+    """Invalidate cached households after partners are linked or unlinked, in every process."""
+    household_cache.delete(*user_ids)
@@ -0,0 +1,102 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Callable, Hashable, Iterable, Optional
+from app.database import get_supabase
+
+# Columns handlers read from profiles; one shape so every lookup shares the memo
+PROFILE_COLUMNS = "id, email, name, partner_id, gmail_connected, gmail_refresh_token"
+
+
+class Loader:
+    """Batches and memoizes key lookups for one request, like DataLoader.
+
+    Keys requested during the same event-loop tick (e.g. from tasks started
+    together with asyncio.gather) are fetched by a single call to
+    `batch_fn(keys) -> {key: value}`, run in a worker thread. Keys missing
+    from the result load as None. Each key is fetched at most once per
+    loader; failed fetches are not memoized.
+    """
+
+    def __init__(self, batch_fn: Callable[[list], dict]):
+        self.batch_fn = batch_fn
+        self.futures: dict[Hashable, asyncio.Future] = {}
+        self.pending: list = []
+        self.tasks: set[asyncio.Task] = set()
+
+    async def load(self, key: Hashable) -> Optional[Any]:
+        future = self.futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.futures[key] = loop.create_future()
+            if not self.pending:
+                loop.call_soon(self._dispatch)
+            self.pending.append(key)
+        # Shielded so a cancelled caller doesn't cancel the lookup for others
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[Hashable]) -> list[Optional[Any]]:
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    def _dispatch(self) -> None:
+        keys, self.pending = self.pending, []
+        task = asyncio.get_running_loop().create_task(self._fetch(keys))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _fetch(self, keys: list) -> None:
+        try:
+            values = await asyncio.to_thread(self.batch_fn, keys)
+        except Exception as e:
+            for key in keys:
+                future = self.futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self.futures[key]
+            if not future.done():
+                future.set_result(values.get(key))
+
+
+def _fetch_profiles(user_ids: list[str]) -> dict[str, dict]:
+    result = get_supabase().table("profiles").select(PROFILE_COLUMNS).in_("id", user_ids).execute()
+    return {row["id"]: row for row in result.data or []}
+
+
+def _fetch_categories(keys: list[tuple[str, str]]) -> dict[tuple[str, str], dict]:
+    """Categories by (user_id, name), among the defaults and the user's own."""
+    names_by_user: dict[str, set[str]] = {}
+    for user_id, name in keys:
+        names_by_user.setdefault(user_id, set()).add(name)
+
+    found = {}
+    for user_id, names in names_by_user.items():
+        result = get_supabase().table("categories").select("id, name, color, icon, user_id").in_(
+            "name", sorted(names)
+        ).or_(f"user_id.is.null,user_id.eq.{user_id}").execute()
+        # A user's own category wins over a default with the same name
+        for row in sorted(result.data or [], key=lambda r: r["user_id"] is not None):
+            found[(user_id, row["name"])] = row
+    return found
+
+
+class RequestLoaders:
+    """The loaders of one request: profiles by id, categories by (user_id, name)."""
+
+    def __init__(self):
+        self.profiles = Loader(_fetch_profiles)
+        self.categories = Loader(_fetch_categories)
+
+
+_request_loaders: ContextVar[Optional[RequestLoaders]] = ContextVar("request_loaders", default=None)
+
+
+def start_request_loaders() -> RequestLoaders:
+    loaders = RequestLoaders()
+    _request_loaders.set(loaders)
+    return loaders
+
+
+def get_loaders() -> RequestLoaders:
+    """The current request's loaders; outside a request, new loaders for this caller only."""
+    return _request_loaders.get() or RequestLoaders()
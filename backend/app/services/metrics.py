@@ -0,0 +1,226 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from app.services.tracing import record_span
+
+# Latency buckets in seconds, from fast cache hits up to slow Gemini calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Metrics are updated without locks, mostly from the event loop thread but also
+# from worker threads running Supabase queries; an increment lost to a rare
+# race is an acceptable price for a lock-free hot path.
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, labels: tuple, value: float) -> None:
+        self.values[labels] = value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Prometheus histogram; bucket counts are kept per bucket and summed at render time."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self.series: dict[tuple, list[float]] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            total = cumulative + series[-2]
+            bucket_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {total}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {total}")
+        return lines
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status.",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served.",
+    ("method",),
+)
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to Supabase, Gmail, Gemini and Google OAuth.",
+    ("service", "operation", "target"),
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total",
+    "Failed calls to Supabase, Gmail, Gemini and Google OAuth.",
+    ("service", "operation", "target"),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit, stale or miss).",
+    ("cache", "result"),
+)
+
+SINGLE_FLIGHT_REQUESTS = Counter(
+    "single_flight_requests_total",
+    "Coalesced computations by route and role (leader ran it, shared awaited another's).",
+    ("route", "result"),
+)
+
+REGISTRY = (
+    HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, UPSTREAM_DURATION, UPSTREAM_ERRORS, CACHE_REQUESTS,
+    SINGLE_FLIGHT_REQUESTS,
+)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def observe_upstream(
+    service: str, operation: str, target: str, seconds: float, error: bool = False, detail: str = ""
+) -> None:
+    """Record an upstream call in the metrics, the request's trace and the slow-query log."""
+    labels = (service, operation, target)
+    UPSTREAM_DURATION.observe(labels, seconds)
+    if error:
+        UPSTREAM_ERRORS.inc(labels)
+    record_span(service, operation, target, seconds, detail)
+
+
+@contextmanager
+def upstream_call(service: str, operation: str, target: str = "") -> Iterator[None]:
+    """Time a block that calls an upstream service, counting it as an error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        observe_upstream(service, operation, target, time.perf_counter() - start, error=True)
+        raise
+    observe_upstream(service, operation, target, time.perf_counter() - start)
+
+
+POSTGREST_OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+class TimedTransport:
+    """httpx transport wrapper timing every PostgREST request by operation and table or function."""
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def handle_request(self, request):
+        path = request.url.path
+        _, _, target = path.partition("/rest/v1/")
+        if target.startswith("rpc/"):
+            operation, target = "rpc", target[4:]
+        else:
+            operation = POSTGREST_OPERATIONS.get(request.method, request.method.lower())
+            if operation == "insert" and "merge-duplicates" in request.headers.get("prefer", ""):
+                operation = "upsert"
+
+        # The filter chain, e.g. select=*&user_id=eq.123&order=date.desc
+        detail = request.url.query.decode()
+
+        start = time.perf_counter()
+        try:
+            response = self.transport.handle_request(request)
+        except Exception:
+            observe_upstream("supabase", operation, target, time.perf_counter() - start, error=True, detail=detail)
+            raise
+        observe_upstream(
+            "supabase", operation, target, time.perf_counter() - start,
+            error=response.status_code >= 400, detail=detail,
+        )
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def __enter__(self):
+        self.transport.__enter__()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.transport.__exit__(*args)
+
+
+def instrument_supabase(client) -> None:
+    """Route the Supabase client's PostgREST traffic through TimedTransport.
+
+    The backend uses the service key and never signs in, so the PostgREST
+    client (and its HTTP session) is created once and stays instrumented.
+    """
+    session = client.postgrest.session
+    session._transport = TimedTransport(session._transport)
+    for pattern, transport in list(session._mounts.items()):
+        if transport is not None:
+            session._mounts[pattern] = TimedTransport(transport)
+
+
+def route_label(scope: dict) -> Optional[str]:
+    """Route template (e.g. /expenses/{expense_id}) matched for an ASGI scope, if any."""
+    route = scope.get("route")
+    return getattr(route, "path", None)
@@ -0,0 +1,86 @@
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+# How often the profiled thread's stack is sampled
+SAMPLE_INTERVAL_SECONDS = 0.002
+
+UNSAFE_FILENAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Sampling profiler for one thread, producing collapsed ("folded") stacks.
+
+    A daemon thread reads the target thread's current frame at a fixed
+    interval, so the profiled code runs unmodified. For the event loop thread
+    this includes whatever else the loop runs meanwhile, and time spent
+    waiting on I/O shows up under the selector.
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Stacks in the folded format read by flamegraph.pl, speedscope and inferno."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def write_profile(directory: str, method: str, route: str, elapsed: float, sampler: StackSampler) -> str:
+    """Write the folded stacks to `directory`, named after the time, route and duration."""
+    os.makedirs(directory, exist_ok=True)
+    route_part = UNSAFE_FILENAME_RE.sub("_", route.strip("/")) or "root"
+    filename = f"{datetime.now():%Y%m%d-%H%M%S}_{method}_{route_part}_{elapsed * 1000:.0f}ms.folded"
+    path = os.path.join(directory, filename)
+    with open(path, "w") as f:
+        f.write(sampler.folded())
+    return path
+
+
+# One profiled request at a time keeps profiles readable and overhead bounded
+_profile_lock = threading.Lock()
+
+
+def try_start_profile() -> Optional[StackSampler]:
+    """Start sampling the calling thread, or return None if another profile is running."""
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    return sampler
+
+
+def finish_profile(sampler: StackSampler) -> None:
+    sampler.stop()
+    _profile_lock.release()
@@ -0,0 +1,312 @@
+import bisect
+import math
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from statistics import median
+from typing import Optional
+from app.services.analytics_reads import fetch_expense_frame
+from app.services.anomaly_service import normalize_merchant
+from app.services.cache import Cache
+from app.services.expense_frame import ExpenseFrame
+from app.services.household import household_cache, household_key, household_members
+from app.services.metrics import CACHE_REQUESTS
+
+# Nominal period length and allowed jitter in days
+PERIODS = {
+    "weekly": (7, 2),
+    "biweekly": (14, 3),
+    "monthly": (30.44, 5),
+    "quarterly": (91.31, 10),
+    "annual": (365.25, 20),
+}
+
+# Charges whose amounts are within one band of each other form one series
+AMOUNT_BAND_RATIO = 1.15
+
+# Max amount ratio between the charges of a two-charge (annual) series
+TWO_CHARGE_MAX_RATIO = 1.05
+
+# Share of intervals that must match the detected period
+MIN_REGULARITY = 0.7
+
+# How much history is indexed when a household is first loaded
+HISTORY_DAYS = 3 * 365
+
+# A loaded index is reloaded after this long, to pick up changes that never
+# went through the detector (e.g. rows edited in the database directly)
+INDEX_MAX_AGE_SECONDS = 3600
+
+# Monthly-equivalent multiplier per period
+MONTHLY_FACTOR = {name: 30.44 / days for name, (days, _) in PERIODS.items()}
+
+
+def amount_band(amount: float) -> int:
+    return int(math.log(max(amount, 0.01)) / math.log(AMOUNT_BAND_RATIO))
+
+
+class ChargeSeries:
+    """Charges from one merchant in one amount band, kept sorted by date.
+
+    Charges are stored as parallel lists rather than per-charge objects to
+    keep multi-year indexes small.
+    """
+
+    def __init__(self, merchant: str, band: int):
+        self.merchant = merchant
+        self.band = band
+        self.days: list[int] = []
+        self.amounts: list[float] = []
+        self.expense_ids: list[str] = []
+        # Display fields from the most recent charge
+        self.label: Optional[str] = None
+        self.category: Optional[str] = None
+        self._result: Optional[dict] = None
+        self._dirty = True
+
+    def add(self, day: int, amount: float, expense_id: str, label: Optional[str], category: Optional[str]) -> None:
+        index = bisect.bisect(self.days, day)
+        self.days.insert(index, day)
+        self.amounts.insert(index, amount)
+        self.expense_ids.insert(index, expense_id)
+        if index == len(self.days) - 1:
+            self.label = label
+            self.category = category
+        self._dirty = True
+
+    def remove(self, expense_id: str) -> None:
+        try:
+            index = self.expense_ids.index(expense_id)
+        except ValueError:
+            return
+        del self.days[index]
+        del self.amounts[index]
+        del self.expense_ids[index]
+        self._dirty = True
+
+    def detect(self, today: int) -> Optional[dict]:
+        """Classify the series as periodic, re-evaluating only after it changed."""
+        if self._dirty:
+            self._result = self._evaluate()
+            self._dirty = False
+        if self._result is None:
+            return None
+
+        result = dict(self._result)
+        period_days, tolerance = PERIODS[result["period"]]
+        next_day = self.days[-1] + round(period_days)
+        result["next_expected_date"] = date.fromordinal(next_day).isoformat()
+        result["status"] = "active" if today <= next_day + 2 * tolerance else "lapsed"
+        return result
+
+    def _evaluate(self) -> Optional[dict]:
+        if len(self.days) < 2:
+            return None
+        intervals = [b - a for a, b in zip(self.days, self.days[1:]) if b > a]
+        if not intervals:
+            return None
+        typical = median(intervals)
+
+        for period, (period_days, tolerance) in PERIODS.items():
+            if abs(typical - period_days) > tolerance:
+                continue
+            matching = sum(1 for i in intervals if abs(i - period_days) <= tolerance)
+            # Two charges are enough for an annual series, shorter periods need three
+            min_charges = 2 if period == "annual" else 3
+            if len(self.days) < min_charges or matching / len(intervals) < MIN_REGULARITY:
+                return None
+
+            amounts = self.amounts
+            # With only two charges, require a near-identical amount as well
+            if len(amounts) < 3 and max(amounts) > min(amounts) * TWO_CHARGE_MAX_RATIO:
+                return None
+
+            typical_amount = median(amounts)
+            return {
+                "merchant": self.label or self.merchant,
+                "category": self.category,
+                "amount": round(typical_amount, 2),
+                "last_amount": round(amounts[-1], 2),
+                "period": period,
+                "interval_days": round(typical, 1),
+                "occurrences": len(self.days),
+                "first_date": date.fromordinal(self.days[0]).isoformat(),
+                "last_date": date.fromordinal(self.days[-1]).isoformat(),
+                "monthly_cost": round(typical_amount * MONTHLY_FACTOR[period], 2),
+            }
+        return None
+
+
+class RecurringIndex:
+    """Per-household index of charge series, updated one expense at a time."""
+
+    def __init__(self, versions: Optional[dict[str, Optional[str]]] = None):
+        self.series: dict[tuple[str, int], ChargeSeries] = {}
+        self.series_of: dict[str, tuple[str, int]] = {}
+        # Each member's expense version when the history was read, see RecurringDetector
+        self.versions = versions or {}
+        self.loaded_at = time.monotonic()
+
+    def add(self, expense: dict) -> None:
+        if not expense.get("date"):
+            return
+        category = (expense.get("categories") or {}).get("name") or expense.get("category")
+        self._add(
+            normalize_merchant(expense.get("merchant") or expense.get("description")),
+            float(expense.get("amount") or 0),
+            date.fromisoformat(expense["date"][:10]).toordinal(),
+            expense.get("id") or "",
+            expense.get("merchant"),
+            category,
+        )
+
+    def extend(self, expenses: ExpenseFrame) -> None:
+        """Add every expense of a frame built with ids."""
+        day_ordinals = expenses.day_ordinals()
+        merchant_keys = [normalize_merchant(m) for m in expenses.merchants]
+        for amount, day, category, merchant, description, expense_id in zip(
+            expenses.amounts, expenses.day_codes, expenses.category_codes,
+            expenses.merchant_codes, expenses.description_codes, expenses.ids,
+        ):
+            self._add(
+                merchant_keys[merchant] or normalize_merchant(expenses.descriptions[description]),
+                amount,
+                day_ordinals[day],
+                expense_id,
+                expenses.merchants[merchant],
+                expenses.categories[category],
+            )
+
+    def _add(
+        self, merchant: str, amount: float, day: int, expense_id: str, label: Optional[str], category: Optional[str]
+    ) -> None:
+        if not merchant or amount <= 0:
+            return
+
+        if expense_id in self.series_of:
+            self.remove(expense_id)
+
+        band = amount_band(amount)
+        # Join a neighbouring band's series so amounts near a band edge stay together
+        key = (merchant, band)
+        for candidate in ((merchant, band), (merchant, band - 1), (merchant, band + 1)):
+            if candidate in self.series:
+                key = candidate
+                break
+
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = ChargeSeries(*key)
+        series.add(day, amount, expense_id, label, category)
+        if expense_id:
+            self.series_of[expense_id] = key
+
+    def remove(self, expense_id: str) -> None:
+        key = self.series_of.pop(expense_id, None)
+        if key and key in self.series:
+            self.series[key].remove(expense_id)
+            if not self.series[key].days:
+                del self.series[key]
+
+    def detect(self, today: Optional[date] = None) -> list[dict]:
+        today_ordinal = (today or date.today()).toordinal()
+        found = [r for r in (s.detect(today_ordinal) for s in self.series.values()) if r]
+        return sorted(found, key=lambda r: r["monthly_cost"], reverse=True)
+
+
+# Per user, a token replaced on every expense change the detector sees, so
+# workers and replicas sharing the cache notice changes made by the others
+expense_versions = Cache("expense_version", ttl=INDEX_MAX_AGE_SECONDS)
+
+
+class RecurringDetector:
+    """Keeps a RecurringIndex per household, built once and then updated incrementally.
+
+    Indexes live in each process. A change applied here also replaces the
+    user's version in the shared cache, and an index whose members' versions
+    no longer match (a change made by another worker) or that is older than
+    INDEX_MAX_AGE_SECONDS is reloaded on its next read.
+    """
+
+    def __init__(self):
+        self.indexes: dict[str, RecurringIndex] = {}
+        self.household_of: dict[str, str] = {}
+        # Partner (un)linking in any worker or replica invalidates the household
+        household_cache.on_invalidate(self.forget_user)
+
+    async def get_recurring(self, supabase, user_id: str) -> list[dict]:
+        """Return the household's recurring charges, loading its history on first use."""
+        return (await self._index(supabase, user_id)).detect()
+
+    def observe(self, user_id: str, expense: dict) -> None:
+        """Add a newly inserted or updated expense to its household's index, if loaded."""
+        if not expense:
+            return
+        index = self.indexes.get(self.household_of.get(user_id, ""))
+        if index is not None:
+            index.add(expense)
+        self._changed(user_id, index)
+
+    def forget_expense(self, user_id: str, expense_id: str) -> None:
+        index = self.indexes.get(self.household_of.get(user_id, ""))
+        if index is not None:
+            index.remove(expense_id)
+        self._changed(user_id, index)
+
+    def forget_user(self, user_id: str) -> None:
+        """Drop the household index for a user, e.g. after partner (un)linking."""
+        key = self.household_of.pop(user_id, None)
+        if key:
+            self.indexes.pop(key, None)
+            for member in key.split("|"):
+                self.household_of.pop(member, None)
+
+    def _changed(self, user_id: str, index: Optional[RecurringIndex]) -> None:
+        """Publish a new version for the user; the local index already has the change."""
+        version = expense_versions.set(user_id, uuid.uuid4().hex)
+        if index is not None:
+            index.versions[user_id] = version
+
+    def _is_current(self, index: RecurringIndex, member_ids: list[str]) -> bool:
+        if time.monotonic() - index.loaded_at > INDEX_MAX_AGE_SECONDS:
+            return False
+        return all(index.versions.get(m) == expense_versions.get(m, count=False) for m in member_ids)
+
+    async def _index(self, supabase, user_id: str) -> RecurringIndex:
+        key = self.household_of.get(user_id)
+        if key is not None:
+            index = self.indexes.get(key)
+            if index is not None and self._is_current(index, key.split("|")):
+                CACHE_REQUESTS.inc(("recurring_index", "hit"))
+                return index
+            self.indexes.pop(key, None)
+
+        member_ids = household_members(supabase, user_id)
+        key = household_key(member_ids)
+        index = self.indexes.get(key)
+        if index is None:
+            CACHE_REQUESTS.inc(("recurring_index", "miss"))
+            # Read before the history, so a change made meanwhile forces another reload
+            versions = {m: expense_versions.get(m, count=False) for m in member_ids}
+            since = datetime.now() - timedelta(days=HISTORY_DAYS)
+            # Keyset-paged, so multi-year histories are not cut off at PostgREST's max-rows
+            history = await fetch_expense_frame(supabase, member_ids, since, with_ids=True)
+
+            index = RecurringIndex(versions)
+            index.extend(history)
+            # A concurrent first load may have finished meanwhile; keep the one already shared
+            index = self.indexes.setdefault(key, index)
+
+        for member in member_ids:
+            self.household_of[member] = key
+        return index
+
+
+_detector: Optional[RecurringDetector] = None
+
+
+def get_recurring_detector() -> RecurringDetector:
+    global _detector
+    if _detector is None:
+        _detector = RecurringDetector()
+    return _detector
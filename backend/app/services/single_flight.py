@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from app.services.metrics import SINGLE_FLIGHT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent identical computations into one in-flight task.
+
+    The first caller for a key starts the computation; callers arriving while
+    it runs await the same task and receive the same result (or exception).
+    Nothing is kept once the task finishes, so this only deduplicates work
+    that overlaps in time - a burst of identical dashboard loads, or the herd
+    that follows a cache expiry. Shared results must not be mutated by callers.
+    """
+
+    def __init__(self):
+        self.in_flight: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        task = self.in_flight.get(key)
+        if task is None:
+            SINGLE_FLIGHT_REQUESTS.inc((label, "leader"))
+            task = asyncio.create_task(self._run(key, compute))
+            task.add_done_callback(lambda t: self._log_failure(t, label))
+            self.in_flight[key] = task
+        else:
+            SINGLE_FLIGHT_REQUESTS.inc((label, "shared"))
+        # A caller that disconnects must not cancel the computation for the others
+        return await asyncio.shield(task)
+
+    async def _run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await compute()
+        finally:
+            self.in_flight.pop(key, None)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task, label: str) -> None:
+        # When every caller was cancelled nobody awaits the task; retrieving the
+        # exception here keeps it from surfacing as "Task exception was never retrieved"
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Shared %s computation failed", label or "single-flight", exc_info=task.exception())
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import unquote
+from app.config import get_settings
+
+settings = get_settings()
+
+# Slow calls kept in memory for /debug/slow-queries
+SLOW_LOG_SIZE = 500
+
+
+class Trace:
+    """Upstream call spans recorded while serving one request."""
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope or {}
+        self.start = time.perf_counter()
+        # (name, duration in seconds)
+        self.spans: list[tuple[str, float]] = []
+
+    @property
+    def route(self) -> str:
+        return getattr(self.scope.get("route"), "path", "")
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: per-span-name totals, app time and the total."""
+        totals: dict[str, list] = {}
+        for name, seconds in self.spans:
+            entry = totals.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+        elapsed = time.perf_counter() - self.start
+        upstream = sum(seconds for _, seconds in totals.values())
+        parts = [
+            f'{name};desc="{count} calls";dur={seconds * 1000:.1f}' if count > 1 else f"{name};dur={seconds * 1000:.1f}"
+            for name, (count, seconds) in totals.items()
+        ]
+        # Time not spent waiting on upstream calls: Python work, serialization, etc.
+        parts.append(f"app;dur={max(elapsed - upstream, 0) * 1000:.1f}")
+        parts.append(f"total;dur={elapsed * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def start_trace(scope: Optional[dict] = None) -> Trace:
+    trace = Trace(scope)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+class SlowQueryLog:
+    """Upstream calls over the slow threshold, kept in memory and optionally appended to a file.
+
+    Entries are Chrome trace events ("X" complete events), so the export
+    opens directly in chrome://tracing or Perfetto. The file uses the JSON
+    array format with the closing bracket omitted, which both accept, so
+    events can be appended as they happen.
+    """
+
+    def __init__(self, threshold_ms: float, export_path: str = ""):
+        self.threshold = threshold_ms / 1000
+        self.export_path = export_path
+        self.events: deque[dict] = deque(maxlen=SLOW_LOG_SIZE)
+        self.lock = threading.Lock()
+
+    def record(self, service: str, operation: str, target: str, detail: str, seconds: float) -> None:
+        if seconds < self.threshold:
+            return
+        trace = current_trace()
+        event = {
+            "name": f"{service}.{operation} {target}".strip(),
+            "cat": service,
+            "ph": "X",
+            "ts": int((time.time() - seconds) * 1_000_000),
+            "dur": int(seconds * 1_000_000),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {
+                "target": target,
+                "detail": unquote(detail),
+                "route": trace.route if trace else "",
+                "duration_ms": round(seconds * 1000, 1),
+            },
+        }
+        with self.lock:
+            self.events.append(event)
+            if self.export_path:
+                self._append(event)
+
+    def export(self) -> dict:
+        """The in-memory log as a Chrome trace (JSON object format)."""
+        with self.lock:
+            return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+    def _append(self, event: dict) -> None:
+        new_file = not os.path.exists(self.export_path)
+        with open(self.export_path, "a") as f:
+            if new_file:
+                f.write("[\n")
+            f.write(json.dumps(event) + ",\n")
+
+
+_slow_log: Optional[SlowQueryLog] = None
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    global _slow_log
+    if _slow_log is None:
+        _slow_log = SlowQueryLog(settings.slow_query_threshold_ms, settings.trace_export_path)
+    return _slow_log
+
+
+def record_span(service: str, operation: str, target: str, seconds: float, detail: str = "") -> None:
+    """Attach a finished upstream call to the current request's trace and the slow-query log."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.spans.append((f"{service}.{operation}.{target}" if target else f"{service}.{operation}", seconds))
+    get_slow_query_log().record(service, operation, target, detail, seconds)
@@ -0,0 +1,45 @@
+"""Scaling benchmark for the local anomaly detector.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_anomalies --rows 1000 10000 100000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from app.services.anomaly_service import AnomalyDetector
+from app.services.expense_frame import ExpenseFrame
+from benchmarks.synthetic import generate_expense_rows
+
+
+def build_history(rows: int) -> ExpenseFrame:
+    """Multi-year history with a few planted anomalies in the last month."""
+    history = ExpenseFrame.from_rows(generate_expense_rows(rows, ["u1"], days=3 * 365))
+    recent = (datetime.now() - timedelta(days=3)).isoformat()
+    history.extend([{"amount": 2400.0, "date": recent, "merchant": "Best Buy", "description": "TV", "category": "Shopping"}])
+    history.extend(
+        {"amount": 900.0, "date": recent, "merchant": "Delta", "description": "Flight", "category": "Travel"}
+        for _ in range(4)
+    )
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    window_start = datetime.now() - timedelta(days=30)
+    for rows in args.rows:
+        history = build_history(rows)
+        start = time.perf_counter()
+        anomalies = AnomalyDetector.detect(history, window_start)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{rows:>8} rows: {elapsed_ms:8.1f} ms, {len(anomalies)} anomalies")
+        for anomaly in anomalies[:3]:
+            print(f"           {anomaly['type']}: {anomaly['message']}")
+
+
+if __name__ == "__main__":
+    main()
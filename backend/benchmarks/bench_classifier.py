@@ -0,0 +1,65 @@
+"""Accuracy and latency benchmark for the local category classifier.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_classifier --train 5000 --test 2000 --noise 0.1
+"""
+import argparse
+import statistics
+import time
+
+from app.services.category_classifier import (
+    CONFIDENCE_THRESHOLD,
+    NaiveBayesModel,
+    extract_features,
+)
+from benchmarks.synthetic import generate_labeled_expenses
+
+
+def run(train_size: int, test_size: int, noise: float) -> dict:
+    train = generate_labeled_expenses(train_size, seed=1, noise=noise)
+    test = generate_labeled_expenses(test_size, seed=2)
+
+    model = NaiveBayesModel()
+    start = time.perf_counter()
+    for row in train:
+        model.learn(extract_features(row["description"], row["merchant"]), row["category"])
+    train_seconds = time.perf_counter() - start
+
+    latencies_us = []
+    correct = confident = confident_correct = 0
+    for row in test:
+        start = time.perf_counter_ns()
+        category, confidence = model.predict(extract_features(row["description"], row["merchant"]))
+        latencies_us.append((time.perf_counter_ns() - start) / 1000)
+
+        correct += category == row["category"]
+        if confidence >= CONFIDENCE_THRESHOLD:
+            confident += 1
+            confident_correct += category == row["category"]
+
+    latencies_us.sort()
+    return {
+        "train_examples": train_size,
+        "train_seconds": round(train_seconds, 4),
+        "accuracy": round(correct / test_size, 4),
+        "coverage_at_threshold": round(confident / test_size, 4),
+        "accuracy_at_threshold": round(confident_correct / confident, 4) if confident else None,
+        "p50_predict_us": round(statistics.median(latencies_us), 1),
+        "p99_predict_us": round(latencies_us[int(len(latencies_us) * 0.99) - 1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--train", type=int, default=5000)
+    parser.add_argument("--test", type=int, default=2000)
+    parser.add_argument("--noise", type=float, default=0.1, help="fraction of mislabeled training rows")
+    args = parser.parse_args()
+
+    for key, value in run(args.train, args.test, args.noise).items():
+        print(f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Memory per expense row: decoded PostgREST dicts versus an ExpenseFrame.
+
+Encodes `--rows` synthetic expenses as the JSON pages fetch_expense_frame
+reads (FRAME_SELECT columns, CHUNK_SIZE rows a page) and measures, with
+tracemalloc, what each representation keeps alive once every page is in:
+
+    dicts   json.loads of every page, kept as one list (the previous shape)
+    frame   ExpenseFrame.extend per page; each page's dicts are dropped once folded
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_expense_frame --rows 10000 100000 1000000
+
+Results (Python 3.11, 1 vCPU; bytes per row retained and peak while
+building, under tracemalloc; build time including json decoding, untraced):
+
+          rows    dicts B/row    frame B/row   frame peak B/row   dicts ms   frame ms
+         10000            803             45                139       31.0       41.8
+        100000            804             32                 41      302.8      331.2
+       1000000            805             30                 31     4984.5     2875.1
+
+A decoded row costs ~800 bytes (the row dict, the embedded categories dict
+and a fresh str per value) and a frame row ~30: 8 bytes of amount, four
+4-byte codes, and the interned days, categories, merchants and descriptions
+amortized over the history. Peak stays near the retained size because only
+one page of dicts is alive at a time. Building costs ~10-35% more CPU than
+decoding alone at small sizes, which the consumers win back by working per
+distinct value (see bench_anomalies and bench_forecast); at 1M rows the
+dict list is the slower one, as the cyclic GC keeps rescanning it.
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from app.services.analytics_reads import CHUNK_SIZE
+from app.services.expense_frame import ExpenseFrame
+from benchmarks.synthetic import generate_expense_rows
+
+
+def encode_pages(rows: int) -> list[bytes]:
+    """Response bodies of FRAME_SELECT pages, as PostgREST would send them."""
+    shaped = [
+        {
+            "id": row["id"],
+            "amount": row["amount"],
+            "date": row["date"],
+            "merchant": row["merchant"],
+            "description": row["description"],
+            "categories": {"name": row["categories"]["name"]},
+        }
+        for row in generate_expense_rows(rows, ["u1"], days=3 * 365)
+    ]
+    return [json.dumps(shaped[i:i + CHUNK_SIZE]).encode() for i in range(0, len(shaped), CHUNK_SIZE)]
+
+
+def as_dicts(pages: list[bytes]) -> list[dict]:
+    rows = []
+    for page in pages:
+        rows.extend(json.loads(page))
+    return rows
+
+
+def as_frame(pages: list[bytes]) -> ExpenseFrame:
+    frame = ExpenseFrame()
+    for page in pages:
+        frame.extend(json.loads(page))
+    return frame
+
+
+def measure(build, pages: list[bytes]) -> tuple[object, int, int, float]:
+    """(result, bytes retained, peak bytes, ms) of building from pages; timed untraced."""
+    gc.collect()
+    began = time.perf_counter()
+    build(pages)
+    elapsed_ms = (time.perf_counter() - began) * 1000
+    gc.collect()
+    tracemalloc.start()
+    result = build(pages)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak, elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'dicts B/row':>14} {'frame B/row':>14} {'frame peak B/row':>18} {'dicts ms':>10} {'frame ms':>10}")
+    for rows in args.rows:
+        pages = encode_pages(rows)
+        dicts, dicts_bytes, _, dicts_ms = measure(as_dicts, pages)
+        del dicts
+        frame, frame_bytes, frame_peak, frame_ms = measure(as_frame, pages)
+        assert len(frame) == rows
+        print(
+            f"{rows:>10} {dicts_bytes / rows:>14.0f} {frame_bytes / rows:>14.0f} {frame_peak / rows:>18.0f}"
+            f" {dicts_ms:>10.1f} {frame_ms:>10.1f}   (nbytes {frame.nbytes() / rows:.0f} B/row)"
+        )
+
+
+if __name__ == "__main__":
+    main()
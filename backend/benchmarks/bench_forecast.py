@@ -0,0 +1,39 @@
+"""Scaling benchmark for the spend forecaster.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_forecast --rows 1000 10000 100000
+"""
+import argparse
+import time
+
+from app.services.expense_frame import ExpenseFrame
+from app.services.forecast_service import HISTORY_DAYS, SpendForecaster
+from app.services.recurring_service import RecurringIndex
+from benchmarks.synthetic import generate_expense_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        raw = generate_expense_rows(rows, ["u1", "u2"], days=HISTORY_DAYS)
+        history = ExpenseFrame.from_rows(raw, with_ids=True)
+        index = RecurringIndex()
+        index.extend(history)
+        recurring = index.detect()
+
+        start = time.perf_counter()
+        forecast = SpendForecaster.forecast(history, recurring)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        month, quarter = forecast["month"], forecast["quarter"]
+        print(
+            f"{rows:>8} rows: {elapsed_ms:8.1f} ms, month ${month['spent']:.2f} -> ${month['projected']:.2f}, "
+            f"quarter ${quarter['spent']:.2f} -> ${quarter['projected']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Microbenchmarks for email extraction and analytics hot paths, checked against a baseline.
+
+Covers GmailService.parse_email (headers, body and received_at of a raw
+message) and ExpenseExtractor on generated receipt emails (each MIME
+structure, small to large bodies), and the SpendingSummary and
+/expenses/stats aggregations on expense tables of 100 to 1M rows. Each case reports throughput and the peak
+memory it allocates; the run fails (exit status 1) when a case is slower or
+allocates more than the baseline by more than the tolerance. Throughput
+depends on the machine, so record the baseline where the check runs.
+Run from the backend directory:
+
+    python -m benchmarks.bench_micro
+    python -m benchmarks.bench_micro --rows 100 10000 --only spending_summary
+    python -m benchmarks.bench_micro --update-baseline
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app.services.ai_service import SpendingSummary
+from app.services.expense_stats import summarize_expense_stats
+from app.services.gmail_service import ExpenseExtractor, GmailService
+from benchmarks.synthetic import generate_expense_rows, generate_receipt_messages
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+# Body sizes as filler lines: a short notification, a typical receipt, a long statement
+EMAIL_SIZES = {"small": 2, "medium": 25, "large": 400}
+MIME_STRUCTURES = ["text/plain", "multipart/alternative", "text/html", "multipart/mixed"]
+
+
+def email_cases(emails_per_case: int):
+    """(name, items, fn) for parsing and extraction on each email size and structure."""
+    for size, filler_lines in EMAIL_SIZES.items():
+        # generate_receipt_messages rotates structures, so every fourth message shares one
+        messages = generate_receipt_messages(emails_per_case * len(MIME_STRUCTURES), filler_lines=filler_lines)
+        for offset, structure in enumerate(MIME_STRUCTURES):
+            subset = messages[offset::len(MIME_STRUCTURES)]
+            yield f"parse_message[{structure},{size}]", len(subset), lambda subset=subset: [
+                GmailService.parse_email(m) for m in subset
+            ]
+        parsed = [GmailService.parse_email(m) for m in messages]
+        yield f"extract_expense[{size}]", len(parsed), lambda parsed=parsed: [
+            ExpenseExtractor.extract_expense(e) for e in parsed
+        ]
+
+
+def table_cases(row_counts: list[int]):
+    """(name, items, fn) for the trend and stats aggregations on each table size."""
+    for rows in row_counts:
+        expenses = generate_expense_rows(rows, ["u1", "u2"], days=180)
+        now = datetime.now()
+        yield f"spending_summary[{rows}]", rows, lambda expenses=expenses: _spending_trends(expenses)
+        yield f"expense_stats[{rows}]", rows, lambda expenses=expenses, now=now: summarize_expense_stats(
+            expenses, now, now - timedelta(days=180)
+        )
+        del expenses
+
+
+def _spending_trends(expenses: list[dict]) -> list[dict]:
+    spending = SpendingSummary()
+    spending.add(expenses)
+    return spending.trends()
+
+
+def measure(fn, items: int, repeat: int, min_time: float) -> dict:
+    """Best-of-`repeat` throughput (items/s) and peak traced allocation of one call."""
+    best = float("inf")
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / calls)
+
+    # Tracing slows the code down, so memory gets its own untimed call
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"throughput": round(items / best, 1), "peak_kib": round(peak / 1024, 1)}
+
+
+def compare(name: str, result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of `result` against the baseline entry for the same case."""
+    previous = baseline.get(name)
+    if previous is None:
+        return []
+    problems = []
+    if result["throughput"] < previous["throughput"] * (1 - tolerance):
+        problems.append(f"throughput {result['throughput']:,.0f}/s vs {previous['throughput']:,.0f}/s")
+    # Small absolute slack keeps tiny allocations (a few KiB) from flapping
+    if result["peak_kib"] > previous["peak_kib"] * (1 + tolerance) + 16:
+        problems.append(f"peak {result['peak_kib']:,.1f} KiB vs {previous['peak_kib']:,.1f} KiB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10000, 100000, 1000000])
+    parser.add_argument("--emails", type=int, default=200, help="Emails per structure and size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timing round")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed fractional regression")
+    parser.add_argument("--only", help="Run cases whose name contains this string")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["cases"]
+
+    results = {}
+    regressions = []
+    print(f"{'case':<40}{'items/s':>14}{'peak KiB':>12}   vs baseline")
+    for cases in (email_cases(args.emails), table_cases(args.rows)):
+        for name, items, fn in cases:
+            if args.only and args.only not in name:
+                continue
+            result = results[name] = measure(fn, items, args.repeat, args.min_time)
+            previous = baseline.get(name)
+            change = ""
+            if previous:
+                change = (
+                    f"{(result['throughput'] / previous['throughput'] - 1) * 100:+.0f}% speed, "
+                    f"{(result['peak_kib'] / previous['peak_kib'] - 1) * 100 if previous['peak_kib'] else 0:+.0f}% memory"
+                )
+            problems = compare(name, result, baseline, args.tolerance)
+            if problems:
+                regressions.append((name, problems))
+                change += "  REGRESSION"
+            print(f"{name:<40}{result['throughput']:>14,.0f}{result['peak_kib']:>12,.1f}   {change}")
+
+    if args.update_baseline:
+        existing = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                existing = json.load(f)["cases"]
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cases": {**existing, **results},
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nWrote {os.path.relpath(args.baseline)}")
+        return
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.tolerance:.0%}:")
+        for name, problems in regressions:
+            print(f"  {name}: {'; '.join(problems)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Dashboard reads on the monthly-partitioned expenses table versus unpartitioned layouts.
+
+Loads `--rows` synthetic expenses (10M by default) spread chronologically
+over `--years` into public.expenses of DATABASE_URL, a scratch Postgres
+loaded with supabase-local-shim.sql and supabase-schema.sql, then copies
+them into two unpartitioned tables in the bench_partitions schema:
+
+    flat        the previous layout: single-column indexes on user_id, date, category_id
+    covering    unpartitioned, with the new (user_id, date) INCLUDE (amount, category_id) index
+    partitioned public.expenses: monthly partitions plus the covering index
+
+and times the app's analytical queries against each for random households.
+Loading uses session_replication_role = replica to skip the budget trigger,
+so it needs a superuser. Run from the backend directory:
+
+    python -m benchmarks.bench_partitions --database-url postgresql://postgres@localhost/expenses_bench
+
+Results at 10M rows, 20k users, 3 years of 41 partitions (Postgres 16,
+1 vCPU, shared_buffers 128MB, warm OS cache; median / p95 ms over 200
+households, plans forced custom as in the app's pool; stats 30d timed before
+keyset paging, when it read the window unordered, and a household's 30 days
+hold ~30 rows, well inside one page):
+
+    query           flat            covering        partitioned
+    stats 30d       5.01 / 7.09     0.48 / 0.58     0.79 / 1.62
+    category 30d    4.74 / 5.32     0.26 / 0.38     0.53 / 0.64
+    category 365d   5.04 / 6.17     0.43 / 0.81     1.26 / 1.51
+    recent 50       2.49 / 2.92     2.66 / 3.41     4.42 / 5.96
+
+    sizes           heap 1589 MB    heap 1589 MB    heap 1590 MB
+                    index 652 MB    index 1013 MB   index 1412 MB
+
+The composite covering index is what makes the date-range reads 6-18x
+faster: the flat layout visits every expense of the household in the heap
+and filters on date, the covering index reads only the rows in range from
+the index. Partitioning on top of it costs a few tenths of a millisecond
+per read (planning, and one probe each for the future and default
+partitions) and more for unbounded newest-first lists, which merge every
+partition. What it buys is upkeep that scales with a month rather than the
+whole table: vacuum, reindex and archiving with DETACH PARTITION.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.services.analytics_reads import CATEGORY_TOTALS_SQL, CHUNK_SIZE, EXPENSE_CHUNK_SQL, FIRST_ID
+
+SEED_EMAIL = "bench-partitions-{}@example.com"
+
+LAYOUTS = {
+    "flat": "bench_partitions.expenses_flat",
+    "covering": "bench_partitions.expenses_covering",
+    "partitioned": "public.expenses",
+}
+
+# The default expense list page: one user, newest first, no date filter
+RECENT_SQL = """
+SELECT * FROM public.expenses e
+WHERE e.user_id = ANY($1::uuid[])
+ORDER BY e.date DESC
+LIMIT 50
+"""
+
+
+def since(days: int):
+    return lambda now: [now - timedelta(days=days)]
+
+
+def first_chunk(days: int):
+    """Parameters of the first keyset page of a window, as iter_expense_chunks reads it."""
+    return lambda now: [now - timedelta(days=days), None, now - timedelta(days=days), FIRST_ID, CHUNK_SIZE]
+
+
+# name, SQL against public.expenses, members per call, parameters after the member ids
+QUERIES = [
+    ("stats 30d", EXPENSE_CHUNK_SQL, 2, first_chunk(30)),
+    ("category 30d", CATEGORY_TOTALS_SQL, 2, since(30)),
+    ("category 365d", CATEGORY_TOTALS_SQL, 2, since(365)),
+    ("recent 50", RECENT_SQL, 1, lambda now: []),
+]
+
+INSERT_BATCH_SQL = """
+INSERT INTO public.expenses (user_id, amount, description, category_id, merchant, date, source)
+SELECT
+    u.ids[1 + (g * 7919) % u.n],
+    round((2 + random() * 198)::numeric, 2),
+    'Bench expense ' || g,
+    c.ids[1 + g % c.n],
+    'Merchant ' || (g % 500),
+    $3::timestamptz + ($4::timestamptz - $3::timestamptz) * (g::float8 / $5),
+    'manual'
+FROM generate_series($1::bigint, $2::bigint) AS g,
+     (SELECT array_agg(id) AS ids, COUNT(*) AS n FROM public.profiles WHERE email LIKE 'bench-partitions-%') AS u,
+     (SELECT array_agg(id) AS ids, COUNT(*) AS n FROM public.categories WHERE user_id IS NULL) AS c
+"""
+
+
+async def seed(conn, rows: int, users: int, years: int) -> None:
+    """Replace previously seeded data with `rows` expenses across `users` users."""
+    await conn.execute("SET session_replication_role = replica")
+    await conn.execute("""
+        DROP SCHEMA IF EXISTS bench_partitions CASCADE;
+        DELETE FROM public.expenses WHERE user_id IN (SELECT id FROM public.profiles WHERE email LIKE 'bench-partitions-%');
+        DELETE FROM public.profiles WHERE email LIKE 'bench-partitions-%';
+        DELETE FROM auth.users WHERE email LIKE 'bench-partitions-%';
+    """)
+    await conn.execute("SET session_replication_role = DEFAULT")
+    # The on_auth_user_created trigger creates the profiles
+    await conn.execute(
+        "INSERT INTO auth.users (id, email) SELECT gen_random_uuid(), format($1, g) FROM generate_series(1, $2) AS g",
+        SEED_EMAIL.replace("{}", "%s"), users,
+    )
+
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=365 * years)
+    await conn.execute(
+        "SELECT public.create_expense_partition(m::date) FROM generate_series($1::timestamp, $2::timestamp, INTERVAL '1 month') AS m",
+        start.replace(day=1, tzinfo=None), end.replace(tzinfo=None),
+    )
+    await conn.execute("SELECT public.maintain_expense_partitions()")
+
+    await conn.execute("SET session_replication_role = replica")
+    batch = 1_000_000
+    for first in range(0, rows, batch):
+        last = min(first + batch, rows) - 1
+        began = time.perf_counter()
+        await conn.execute(INSERT_BATCH_SQL, first, last, start, end, rows)
+        print(f"  loaded {last + 1:>11,} rows ({time.perf_counter() - began:.1f}s)", flush=True)
+    await conn.execute("SET session_replication_role = DEFAULT")
+
+    print("  building unpartitioned copies", flush=True)
+    await conn.execute("""
+        CREATE SCHEMA bench_partitions;
+        CREATE TABLE bench_partitions.expenses_flat AS SELECT * FROM public.expenses ORDER BY date;
+        ALTER TABLE bench_partitions.expenses_flat ADD PRIMARY KEY (id);
+        CREATE INDEX ON bench_partitions.expenses_flat (user_id);
+        CREATE INDEX ON bench_partitions.expenses_flat (date);
+        CREATE INDEX ON bench_partitions.expenses_flat (category_id);
+        CREATE TABLE bench_partitions.expenses_covering AS SELECT * FROM bench_partitions.expenses_flat;
+        ALTER TABLE bench_partitions.expenses_covering ADD PRIMARY KEY (id);
+        CREATE INDEX ON bench_partitions.expenses_covering (user_id, date) INCLUDE (amount, category_id);
+        CREATE INDEX ON bench_partitions.expenses_covering (category_id);
+    """)
+
+
+async def sizes(conn) -> dict[str, tuple[int, int]]:
+    """Heap and index bytes per layout."""
+    result = {}
+    for layout, table in LAYOUTS.items():
+        heap, indexes = await conn.fetchrow("""
+            SELECT SUM(pg_table_size(c.oid)), SUM(pg_indexes_size(c.oid))
+            FROM pg_class c
+            WHERE c.relkind = 'r' AND (c.oid = $1::regclass OR c.oid IN (SELECT relid FROM pg_partition_tree($1::regclass)))
+        """, table)
+        result[layout] = (heap, indexes)
+    return result
+
+
+async def run(args) -> None:
+    import asyncpg
+
+    # Planned per call like the app's pool (see init_pg_pool)
+    conn = await asyncpg.connect(args.database_url, server_settings={"plan_cache_mode": args.plan_cache_mode})
+    if not args.no_seed:
+        began = time.perf_counter()
+        print(f"Seeding {args.rows:,} expenses for {args.users:,} users over {args.years} years")
+        await seed(conn, args.rows, args.users, args.years)
+        print(f"Seeded in {time.perf_counter() - began:.0f}s")
+    await conn.execute("VACUUM ANALYZE bench_partitions.expenses_flat")
+    await conn.execute("VACUUM ANALYZE bench_partitions.expenses_covering")
+    await conn.execute("VACUUM ANALYZE public.expenses")
+
+    users = [str(r["id"]) for r in await conn.fetch(
+        "SELECT id FROM public.profiles WHERE email LIKE 'bench-partitions-%' ORDER BY id"
+    )]
+    if len(users) < 2:
+        raise SystemExit("No seeded users; run without --no-seed first")
+    rng = random.Random(0)
+    households = [rng.sample(users, 2) for _ in range(args.samples)]
+    now = datetime.now(timezone.utc)
+
+    for layout, (heap, indexes) in (await sizes(conn)).items():
+        print(f"{layout:<12} heap {heap / 2**20:>8.0f} MB   indexes {indexes / 2**20:>8.0f} MB")
+
+    print(f"\n{'query':<16}" + "".join(f"{layout + ' ms':>22}" for layout in LAYOUTS))
+    for name, sql, members, make_params in QUERIES:
+        cells = []
+        for table in LAYOUTS.values():
+            statement = await conn.prepare(sql.replace("public.expenses e", f"{table} e"))
+            params = make_params(now)
+            for household in households[:10]:
+                await statement.fetch(household[:members], *params)
+            samples = []
+            for household in households:
+                began = time.perf_counter()
+                await statement.fetch(household[:members], *params)
+                samples.append((time.perf_counter() - began) * 1000)
+            p95 = statistics.quantiles(samples, n=20)[-1]
+            cells.append(f"{statistics.median(samples):>10.2f} / {p95:>7.2f}")
+        print(f"{name:<16}" + "".join(f"{cell:>22}" for cell in cells), flush=True)
+    print("(median / p95)")
+    await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL", ""))
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=200, help="Households timed per query and layout")
+    parser.add_argument("--plan-cache-mode", default="force_custom_plan", choices=["auto", "force_custom_plan"])
+    parser.add_argument("--no-seed", action="store_true", help="Reuse data loaded by an earlier run")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
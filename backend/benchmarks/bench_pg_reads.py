@@ -0,0 +1,168 @@
+"""Analytical reads over the asyncpg pool versus JSON-encoded results, on a local Postgres.
+
+Seeds synthetic households into DATABASE_URL (a Postgres loaded with
+supabase-local-shim.sql and supabase-schema.sql), checks that the direct
+reads agree with the PostgREST-path computations, and times each read two
+ways: binary rows from the pool, and the same query encoded as JSON by
+Postgres and decoded in Python, which is the part of a PostgREST round trip
+the pool removes (HTTP overhead comes on top). Run from the backend directory:
+
+    python -m benchmarks.bench_pg_reads --database-url postgresql://postgres@localhost/financial_dashboard
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.synthetic import generate_expense_rows
+
+SEED_EMAIL = "bench-{}@example.com"
+
+
+async def seed(conn, households: int, expenses_per_user: int) -> list[list[str]]:
+    """Replace previously seeded users with `households` linked pairs and their expenses."""
+    await conn.execute("""
+        UPDATE public.profiles SET partner_id = NULL WHERE email LIKE 'bench-%@example.com';
+        DELETE FROM public.expenses WHERE user_id IN (SELECT id FROM public.profiles WHERE email LIKE 'bench-%@example.com');
+        DELETE FROM public.profiles WHERE email LIKE 'bench-%@example.com';
+        DELETE FROM auth.users WHERE email LIKE 'bench-%@example.com';
+    """)
+
+    pairs = [[str(uuid.uuid4()), str(uuid.uuid4())] for _ in range(households)]
+    users = [(uuid.UUID(u), SEED_EMAIL.format(u)) for pair in pairs for u in pair]
+    # The on_auth_user_created trigger creates the profiles
+    await conn.executemany("INSERT INTO auth.users (id, email) VALUES ($1, $2)", users)
+    for a, b in pairs:
+        await conn.execute("UPDATE public.profiles SET partner_id = $2 WHERE id = $1", uuid.UUID(a), uuid.UUID(b))
+        await conn.execute("UPDATE public.profiles SET partner_id = $2 WHERE id = $1", uuid.UUID(b), uuid.UUID(a))
+
+    category_ids = {
+        row["name"]: row["id"]
+        for row in await conn.fetch("SELECT id, name FROM public.categories WHERE user_id IS NULL")
+    }
+    records = []
+    for index, pair in enumerate(pairs):
+        for row in generate_expense_rows(expenses_per_user * 2, pair, days=365, seed=index):
+            records.append((
+                uuid.UUID(row["user_id"]),
+                row["amount"],
+                row["description"],
+                category_ids.get(row["category_id"]),
+                row["merchant"],
+                datetime.fromisoformat(row["date"]).replace(tzinfo=timezone.utc),
+                row["source"],
+            ))
+    await conn.copy_records_to_table(
+        "expenses",
+        schema_name="public",
+        records=records,
+        columns=["user_id", "amount", "description", "category_id", "merchant", "date", "source"],
+    )
+    await conn.execute("ANALYZE public.expenses")
+    return pairs
+
+
+async def time_call(fn, repeat: int) -> float:
+    """Median milliseconds of `repeat` awaited calls."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def run(args) -> None:
+    import asyncpg
+
+    conn = await asyncpg.connect(args.database_url)
+    if args.no_seed:
+        rows = await conn.fetch(
+            "SELECT id, partner_id FROM public.profiles WHERE email LIKE 'bench-%@example.com' AND id < partner_id"
+        )
+        pairs = [[str(r["id"]), str(r["partner_id"])] for r in rows]
+    else:
+        start = time.perf_counter()
+        pairs = await seed(conn, args.households, args.expenses_per_user)
+        print(f"Seeded {len(pairs)} households x {args.expenses_per_user * 2} expenses in {time.perf_counter() - start:.1f}s")
+    await conn.close()
+    if not pairs:
+        raise SystemExit("No seeded households; run without --no-seed first")
+
+    # Settings are read on import, so the app modules load after DATABASE_URL is set
+    from app import database
+    from app.services import analytics_reads
+
+    pool = await database.init_pg_pool()
+    if pool is None:
+        raise SystemExit("Could not open the asyncpg pool")
+
+    since = datetime.now() - timedelta(days=args.days)
+    members = pairs[0]
+
+    # Parity: the SQL aggregation must match the PostgREST path's sums over every page of rows
+    breakdowns = await analytics_reads.fetch_category_breakdowns(None, members, since)
+    expected = {member_id: {} for member_id in members}
+    row_count = 0
+    async for chunk in analytics_reads.iter_expense_chunks(None, members, since):
+        row_count += len(chunk)
+        for e in chunk:
+            category = e["categories"]["name"] if e["categories"] else "Other"
+            expected[e["user_id"]][category] = expected[e["user_id"]].get(category, 0) + e["amount"]
+    for member_id in members:
+        actual = breakdowns[member_id]["by_category"]
+        assert expected[member_id].keys() == actual.keys(), (expected[member_id].keys(), actual.keys())
+        assert all(abs(expected[member_id][k] - actual[k]) < 0.01 for k in actual), "category totals differ"
+    print(f"Parity OK for household {members[0][:8]}: {row_count} rows in the last {args.days} days")
+
+    utc_since = since.replace(tzinfo=timezone.utc)
+    chunk_args = (members, utc_since, None, utc_since, analytics_reads.FIRST_ID, analytics_reads.CHUNK_SIZE)
+
+    async def json_path(sql: str, *params) -> None:
+        async with pool.acquire() as connection:
+            payload = await connection.fetchval(f"SELECT COALESCE(json_agg(t), '[]') FROM ({sql}) t", *params)
+        json.loads(payload)
+
+    async def all_chunks() -> None:
+        async for _ in analytics_reads.iter_expense_chunks(None, members, since):
+            pass
+
+    cases = [
+        ("first chunk", analytics_reads.EXPENSE_CHUNK_SQL, chunk_args,
+         lambda: anext(analytics_reads.iter_expense_chunks(None, members, since))),
+        ("all chunks", None, None, all_chunks),
+        ("category totals", analytics_reads.CATEGORY_TOTALS_SQL, (members, utc_since),
+         lambda: analytics_reads.fetch_category_breakdowns(None, members, since)),
+    ]
+    print(f"\n{'read':<18}{'pool ms':>10}{'json ms':>10}")
+    for name, sql, params, direct in cases:
+        direct_ms = await time_call(direct, args.repeat)
+        json_ms = await time_call(lambda: json_path(sql, *params), args.repeat) if sql else float("nan")
+        print(f"{name:<18}{direct_ms:>10.2f}{json_ms:>10.2f}")
+
+    # "category totals" json timing is for the aggregated rows; PostgREST would
+    # instead ship every expense row and sum them in Python
+    await database.close_pg_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL", ""))
+    parser.add_argument("--households", type=int, default=20)
+    parser.add_argument("--expenses-per-user", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=90, help="Read window")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-seed", action="store_true", help="Reuse households seeded by an earlier run")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+    os.environ["DATABASE_URL"] = args.database_url
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
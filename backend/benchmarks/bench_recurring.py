@@ -0,0 +1,72 @@
+"""Build and incremental-update benchmark for recurring charge detection.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_recurring --rows 10000 100000
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.services.recurring_service import RecurringIndex
+from benchmarks.synthetic import generate_expense_rows
+
+# (merchant, amount, interval days) series planted into the random history
+PLANTED = [("Hulu", 17.99, 30), ("Dropbox", 11.99, 30), ("Gym Membership", 45.0, 30), ("Amazon Prime", 139.0, 365)]
+
+
+def build_history(rows: int, days: int) -> list[dict]:
+    history = generate_expense_rows(rows, ["u1"], days=days)
+    now = datetime.now()
+    for merchant, amount, interval in PLANTED:
+        for i, offset in enumerate(range(0, days, interval)):
+            history.append({
+                "id": f"{merchant}-{i}",
+                "amount": amount,
+                "merchant": merchant,
+                "description": f"{merchant} renewal",
+                "date": (now - timedelta(days=offset)).isoformat(),
+                "categories": {"name": "Subscriptions"},
+            })
+    return sorted(history, key=lambda e: e["date"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--days", type=int, default=3 * 365)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        history = build_history(rows, args.days)
+        index = RecurringIndex()
+
+        start = time.perf_counter()
+        for expense in history[:-50]:
+            index.add(expense)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        found = index.detect()
+        first_detect_ms = (time.perf_counter() - start) * 1000
+
+        # Incremental path: one insert followed by a read, as after create_expense
+        insert_us = []
+        for expense in history[-50:]:
+            start = time.perf_counter()
+            index.add(expense)
+            index.detect()
+            insert_us.append((time.perf_counter() - start) * 1e6)
+
+        planted = {m for m, _, _ in PLANTED}
+        detected = {r["merchant"] for r in index.detect()} & planted
+        print(
+            f"{len(history):>8} rows: build {build_ms:7.1f} ms, first detect {first_detect_ms:6.1f} ms, "
+            f"insert+detect p50 {statistics.median(insert_us):7.1f} us, "
+            f"{len(found)} series, planted found {len(detected)}/{len(planted)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
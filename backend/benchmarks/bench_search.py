@@ -0,0 +1,197 @@
+"""Expense search latency on a large household, through public.search_expenses.
+
+Seeds one household with `--household-rows` synthetic expenses (300k by
+default) and `--other-households` more with `--rows-per-household` each into
+DATABASE_URL, a scratch Postgres loaded with supabase-local-shim.sql and
+supabase-schema.sql (pg_trgm and btree_gin needed), then times the first
+page of each query and the page `--pages` deep, following the keyset
+cursors as /expenses/search does. Run from the backend directory:
+
+    python -m benchmarks.bench_search --database-url postgresql://postgres@localhost/expenses_bench
+
+Results for a 300k-row household among 1.3M rows over 3 years of 37
+partitions (Postgres 16, 1 vCPU, max_parallel_workers_per_gather = 0 since
+parallel plans only add overhead on one core; median / p95 ms):
+
+    query         text          matches     first page          page 5
+    merchant      amazon          5,054     48.25 /  83.34      52.92 /  61.55
+    prefix        starb           4,360     50.33 /  67.31      56.98 /  63.11
+    two words     uber eats       4,326     45.35 / 115.22      50.62 /  66.67
+    common word   order          55,795    216.25 / 244.52     270.85 / 293.27
+    typo          amazn               0      3.93 /   4.34
+    no match      zzzz                0      3.88 /   4.17
+
+For comparison, the ILIKE '%...%' scan this replaces takes ~155 ms for
+"amazon" and ~135 ms for a miss. That Postgres had neither btree_gin nor
+pg_trgm, so the numbers come from a document index without user_id, ANDed
+with idx_expenses_user_date in every partition (~0.9 of the ~1.4 ms each
+partition costs for "amazon"), and with the trigram half stubbed out:
+misses and typos never reach a trigram index. With the schema's indexes,
+selective queries should land in the low tens of ms. A word in a tenth of
+the history ("order") stays in the hundreds, because every match is
+scored and sorted before the first page.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.synthetic import generate_expense_rows
+
+SEED_EMAIL = "bench-search-{}@example.com"
+PAGE_SIZE = 50
+
+# name, query: a merchant, a prefix, two words, a frequent description word, a typo, no match
+QUERIES = [
+    ("merchant", "amazon"),
+    ("prefix", "starb"),
+    ("two words", "uber eats"),
+    ("common word", "order"),
+    ("typo", "amazn"),
+    ("no match", "zzzz"),
+]
+
+SEARCH_SQL = "SELECT * FROM public.search_expenses($1::uuid[], $2, $3, $4, $5, $6)"
+
+
+async def seed(conn, household_rows: int, other_households: int, rows_per_household: int, years: int) -> list[str]:
+    """Replace previously seeded data; returns the large household's member ids."""
+    await conn.execute("SET session_replication_role = replica")
+    await conn.execute("""
+        DELETE FROM public.expenses WHERE user_id IN (SELECT id FROM public.profiles WHERE email LIKE 'bench-search-%');
+        DELETE FROM public.profiles WHERE email LIKE 'bench-search-%';
+        DELETE FROM auth.users WHERE email LIKE 'bench-search-%';
+    """)
+    await conn.execute("SET session_replication_role = DEFAULT")
+
+    households = [[str(uuid.uuid4()), str(uuid.uuid4())] for _ in range(1 + other_households)]
+    # The on_auth_user_created trigger creates the profiles
+    await conn.executemany(
+        "INSERT INTO auth.users (id, email) VALUES ($1, $2)",
+        [(uuid.UUID(u), SEED_EMAIL.format(u)) for pair in households for u in pair],
+    )
+    await conn.executemany(
+        "UPDATE public.profiles SET partner_id = $2 WHERE id = $1",
+        [(uuid.UUID(a), uuid.UUID(b)) for first, second in households for a, b in ((first, second), (second, first))],
+    )
+
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=365 * years)
+    await conn.execute(
+        "SELECT public.create_expense_partition(m::date) FROM generate_series($1::timestamp, $2::timestamp, INTERVAL '1 month') AS m",
+        start.replace(day=1, tzinfo=None), end.replace(tzinfo=None),
+    )
+
+    category_ids = {
+        row["name"]: row["id"]
+        for row in await conn.fetch("SELECT id, name FROM public.categories WHERE user_id IS NULL")
+    }
+    await conn.execute("SET session_replication_role = replica")
+    for index, pair in enumerate(households):
+        rows = household_rows if index == 0 else rows_per_household
+        records = [
+            (
+                uuid.UUID(row["user_id"]),
+                row["amount"],
+                row["description"],
+                category_ids.get(row["category_id"]),
+                row["merchant"],
+                datetime.fromisoformat(row["date"]).replace(tzinfo=timezone.utc),
+                row["source"],
+            )
+            for row in generate_expense_rows(rows, pair, days=365 * years, seed=index)
+        ]
+        await conn.copy_records_to_table(
+            "expenses",
+            schema_name="public",
+            records=records,
+            columns=["user_id", "amount", "description", "category_id", "merchant", "date", "source"],
+        )
+    await conn.execute("SET session_replication_role = DEFAULT")
+    await conn.execute("ANALYZE public.expenses")
+    return households[0]
+
+
+async def search_pages(conn, members: list[str], query: str, pages: int) -> tuple[list[float], int]:
+    """Milliseconds per page over `pages` keyset pages, and the rows returned."""
+    after = (None, None, None)
+    timings, rows = [], 0
+    for _ in range(pages):
+        began = time.perf_counter()
+        page = await conn.fetch(SEARCH_SQL, members, query, PAGE_SIZE, *after)
+        timings.append((time.perf_counter() - began) * 1000)
+        rows += len(page)
+        if len(page) < PAGE_SIZE:
+            break
+        last = page[-1]
+        expense = last["expense"]
+        after = (last["score"], datetime.fromisoformat(expense["date"]), uuid.UUID(expense["id"]))
+    return timings, rows
+
+
+async def run(args) -> None:
+    import asyncpg
+
+    # Planned per call like PostgREST under force_custom_plan (see supabase-schema.sql)
+    conn = await asyncpg.connect(args.database_url, server_settings={"plan_cache_mode": "force_custom_plan"})
+    await conn.set_type_codec("jsonb", encoder=str, decoder=json.loads, schema="pg_catalog")
+    if args.no_seed:
+        row = await conn.fetchrow("""
+            SELECT p.id, p.partner_id FROM public.profiles p JOIN public.expenses e ON e.user_id = p.id
+            WHERE p.email LIKE 'bench-search-%' GROUP BY p.id ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+        if row is None:
+            raise SystemExit("No seeded households; run without --no-seed first")
+        members = [str(row["id"]), str(row["partner_id"])]
+    else:
+        began = time.perf_counter()
+        members = await seed(conn, args.household_rows, args.other_households, args.rows_per_household, args.years)
+        print(f"Seeded in {time.perf_counter() - began:.0f}s")
+    await conn.execute("VACUUM ANALYZE public.expenses")
+    total = await conn.fetchval("SELECT COUNT(*) FROM public.expenses")
+    household = await conn.fetchval("SELECT COUNT(*) FROM public.expenses WHERE user_id = ANY($1::uuid[])", members)
+    print(f"{household:,} household rows of {total:,}")
+
+    print(f"\n{'query':<14}{'text':<12}{'matches':>9}{'first page ms':>22}{f'page {args.pages} ms':>22}")
+    for name, query in QUERIES:
+        await search_pages(conn, members, query, 1)
+        first, deep = [], []
+        for _ in range(args.repeat):
+            timings, matched = await search_pages(conn, members, query, args.pages)
+            first.append(timings[0])
+            deep.append(timings[-1])
+        matches = await conn.fetchval(
+            "SELECT COUNT(*) FROM public.search_expenses($1::uuid[], $2, 1000000)", members, query
+        )
+        cells = [
+            f"{statistics.median(samples):>10.2f} / {statistics.quantiles(samples, n=20)[-1]:>7.2f}"
+            if len(samples) > 1 else f"{samples[0]:>20.2f}"
+            for samples in (first, deep)
+        ]
+        print(f"{name:<14}{query:<12}{matches:>9,}" + "".join(f"{cell:>22}" for cell in cells), flush=True)
+    print("(median / p95)")
+    await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL", ""))
+    parser.add_argument("--household-rows", type=int, default=300_000)
+    parser.add_argument("--other-households", type=int, default=200)
+    parser.add_argument("--rows-per-household", type=int, default=5_000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=5, help="Keyset pages followed per query")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-seed", action="store_true", help="Reuse data loaded by an earlier run")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
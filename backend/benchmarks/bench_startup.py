@@ -0,0 +1,95 @@
+"""Cold-start benchmark: import time of app.main and time to the first healthy response.
+
+Each run uses a fresh interpreter. The Supabase and Google settings must be
+present in the environment (dummy values work, nothing is called). Run from
+the backend directory:
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --runs 5 --warm-up --record benchmarks/results/startup.jsonl
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import app.main; print(time.perf_counter() - start)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_healthy(env: dict, timeout: float = 30.0) -> float:
+    """Seconds from spawning uvicorn until /health answers 200."""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/health did not respond within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def current_commit() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm-up", action="store_true", help="Set WARM_UP_ON_STARTUP for the server runs")
+    parser.add_argument("--record", help="Append the medians as a JSON line to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["WARM_UP_ON_STARTUP"] = "true" if args.warm_up else "false"
+
+    import_times = [measure_import(env) for _ in range(args.runs)]
+    healthy_times = [measure_first_healthy(env) for _ in range(args.runs)]
+
+    result = {
+        "commit": current_commit(),
+        "warm_up": args.warm_up,
+        "runs": args.runs,
+        "import_seconds": round(statistics.median(import_times), 3),
+        "first_healthy_seconds": round(statistics.median(healthy_times), 3),
+    }
+    print(f"import app.main:        median {result['import_seconds']:.3f}s (min {min(import_times):.3f}s)")
+    print(f"first healthy response: median {result['first_healthy_seconds']:.3f}s (min {min(healthy_times):.3f}s)")
+
+    if args.record:
+        os.makedirs(os.path.dirname(args.record) or ".", exist_ok=True)
+        with open(args.record, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""In-memory stand-ins for PostgREST (Supabase), the Gmail API and Google OAuth.
+
+Serves on one port:
+
+    /rest/v1/{table}, /rest/v1/rpc/{fn}   PostgREST subset used by the app
+    /gmail/v1/users/me/...                 labels, messages list/get
+    /token                                 OAuth token refresh
+    /__seed                                seeded households (for the load driver)
+
+Table reads return at most `--max-rows` rows, as PostgREST's max-rows does
+on Supabase, so a read that forgets to page is cut off here too.
+
+Run from the backend directory:
+
+    python -m benchmarks.load.fakes --port 8787 --households 50
+"""
+import argparse
+import asyncio
+import random
+import uuid
+from datetime import datetime
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.synthetic import CATEGORY_VOCAB, generate_expense_rows, generate_receipt_messages
+
+OBJECT_MEDIA_TYPE = "application/vnd.pgrst.object+json"
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "or", "columns", "on_conflict"}
+
+# Many-to-one embeds without a !hint: relation -> foreign key on the embedding table
+EMBED_KEYS = {"categories": "category_id", "profiles": "user_id", "budgets": "budget_id"}
+
+
+def _split_top_level(text: str) -> list[str]:
+    """Split on commas that are not inside parentheses."""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _coerce(value: str):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _compare(left, right) -> tuple:
+    """Compare as numbers when both sides are numeric, otherwise as strings."""
+    if isinstance(left, (int, float)) and not isinstance(left, bool):
+        right = _coerce(right)
+        if isinstance(right, float):
+            return left, right
+    return str(left), str(right)
+
+
+def _matches(row: dict, column: str, expression: str) -> bool:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, value = expression.partition(".")
+    if op != "in":
+        value = value.strip('"')
+    field = row.get(column)
+
+    if op == "is":
+        result = field is None if value == "null" else field is (value == "true")
+    elif op == "in":
+        options = [v.strip('"') for v in _split_top_level(value.strip("()"))]
+        result = field is not None and str(field) in options
+    elif field is None:
+        result = False
+    elif op == "eq":
+        result = str(field) == value
+    elif op == "neq":
+        result = str(field) != value
+    elif op in ("gt", "gte", "lt", "lte"):
+        left, right = _compare(field, value)
+        result = {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}[op]
+    elif op in ("like", "ilike"):
+        needle = value.replace("*", "").replace("%", "")
+        result = needle.lower() in str(field).lower() if op == "ilike" else needle in str(field)
+    else:
+        raise ValueError(f"Unsupported operator {op}")
+    return not result if negate else result
+
+
+def _or_matches(row: dict, expression: str) -> bool:
+    for condition in _split_top_level(expression[1:-1]):
+        if condition.startswith("and("):
+            if all(_matches(row, *c.split(".", 1)) for c in _split_top_level(condition[4:-1])):
+                return True
+            continue
+        column, _, rest = condition.partition(".")
+        if _matches(row, column, rest):
+            return True
+    return False
+
+
+class FakeDatabase:
+    """Tables as lists of dicts, indexed by id and user_id."""
+
+    def __init__(self):
+        self.tables: dict[str, list[dict]] = {}
+        self.by_id: dict[str, dict[str, dict]] = {}
+        self.by_user: dict[str, dict[str, list[dict]]] = {}
+
+    def insert(self, table: str, row: dict) -> dict:
+        now = datetime.now().isoformat()
+        row = {"id": str(uuid.uuid4()), "created_at": now, **row}
+        if table == "expenses":
+            row.setdefault("updated_at", now)
+            row.setdefault("date", now)
+        self.tables.setdefault(table, []).append(row)
+        self.by_id.setdefault(table, {})[str(row["id"])] = row
+        if row.get("user_id") is not None:
+            self.by_user.setdefault(table, {}).setdefault(str(row["user_id"]), []).append(row)
+        return row
+
+    def delete(self, table: str, rows: list[dict]) -> None:
+        doomed = {id(r) for r in rows}
+        self.tables[table] = [r for r in self.tables.get(table, []) if id(r) not in doomed]
+        for row in rows:
+            self.by_id.get(table, {}).pop(str(row["id"]), None)
+            owned = self.by_user.get(table, {}).get(str(row.get("user_id")))
+            if owned is not None:
+                owned[:] = [r for r in owned if id(r) not in doomed]
+
+    def candidates(self, table: str, filters: dict[str, str]) -> list[dict]:
+        """Narrow the scan with the id/user_id indexes where a filter allows it."""
+        id_filter = filters.get("id", "")
+        if id_filter.startswith("eq."):
+            row = self.by_id.get(table, {}).get(id_filter[3:])
+            return [row] if row else []
+        user_filter = filters.get("user_id", "")
+        if user_filter.startswith("eq."):
+            return list(self.by_user.get(table, {}).get(user_filter[3:], []))
+        if user_filter.startswith("in."):
+            users = [u.strip('"') for u in _split_top_level(user_filter[3:].strip("()"))]
+            return [row for user in users for row in self.by_user.get(table, {}).get(user, [])]
+        return list(self.tables.get(table, []))
+
+    def select(self, table: str, params) -> list[dict]:
+        filters = {k: v for k, v in params.multi_items() if k not in RESERVED_PARAMS}
+        rows = self.candidates(table, filters)
+        for column, expression in params.multi_items():
+            if column in RESERVED_PARAMS:
+                continue
+            rows = [r for r in rows if _matches(r, column, expression)]
+        if "or" in params:
+            rows = [r for r in rows if _or_matches(r, params["or"])]
+
+        for clause in reversed(params.get("order", "").split(",") if params.get("order") else []):
+            column, _, direction = clause.partition(".")
+            rows.sort(key=lambda r: (r.get(column) is None, str(r.get(column) or "")), reverse=direction.startswith("desc"))
+
+        offset = int(params.get("offset", 0))
+        if "limit" in params:
+            rows = rows[offset:offset + int(params["limit"])]
+        elif offset:
+            rows = rows[offset:]
+        return rows
+
+    def project(self, table: str, rows: list[dict], select: str) -> list[dict]:
+        """Apply a select list, resolving many-to-one embeds like categories(name) or profiles!partner_id(email)."""
+        items = _split_top_level(select or "*")
+        projected = []
+        for row in rows:
+            out = {}
+            for item in items:
+                if "(" in item:
+                    relation, _, columns = item.partition("(")
+                    relation, _, hint = relation.partition("!")
+                    foreign_key = hint or EMBED_KEYS.get(relation, f"{relation}_id")
+                    target = self.by_id.get(relation, {}).get(str(row.get(foreign_key)))
+                    out[relation] = self.project(relation, [target], columns.rstrip(")"))[0] if target else None
+                elif item == "*":
+                    out.update(row)
+                else:
+                    out[item] = row.get(item)
+            projected.append(out)
+        return projected
+
+
+class FakeServices:
+    def __init__(
+        self,
+        households: int,
+        expenses_per_user: int,
+        messages_per_user: int,
+        gmail_latency: float,
+        seed: int,
+        max_rows: int = 1000,
+    ):
+        self.db = FakeDatabase()
+        self.gmail_latency = gmail_latency
+        self.max_rows = max_rows
+        self.messages: dict[str, dict] = {}
+        self.users: list[dict] = []
+        self._seed(households, expenses_per_user, messages_per_user, seed)
+
+    def _seed(self, households: int, expenses_per_user: int, messages_per_user: int, seed: int) -> None:
+        rng = random.Random(seed)
+        category_ids = {}
+        for name in CATEGORY_VOCAB:
+            category_ids[name] = self.db.insert("categories", {"name": name, "color": "#64748b", "icon": None, "user_id": None})["id"]
+
+        for h in range(households):
+            members = [f"user-{h}-a"] + ([f"user-{h}-b"] if rng.random() < 0.6 else [])
+            for member in members:
+                partner = next((m for m in members if m != member), None)
+                self.db.insert("profiles", {
+                    "id": member,
+                    "email": f"{member}@example.com",
+                    "name": member,
+                    "partner_id": partner,
+                    "gmail_connected": True,
+                    "gmail_refresh_token": f"refresh-{member}",
+                })
+                self.users.append({"id": member, "partner_id": partner})
+
+            rows = generate_expense_rows(expenses_per_user * len(members), members, days=730, seed=seed + h)
+            for row in rows:
+                row.pop("categories")
+                row.pop("id")
+                row["category_id"] = category_ids[row["category_id"]]
+                self.db.insert("expenses", row)
+
+        for message in generate_receipt_messages(messages_per_user, seed=seed):
+            self.messages[message["id"]] = message
+
+    # PostgREST
+
+    async def table(self, request: Request) -> Response:
+        table = request.path_params["table"]
+        params = request.query_params
+        single = OBJECT_MEDIA_TYPE in request.headers.get("accept", "")
+
+        if request.method == "GET":
+            # Applied after order and limit, like PostgREST's max-rows
+            rows = self.db.select(table, params)[:self.max_rows or None]
+        elif request.method == "POST":
+            body = await request.json()
+            rows = [self.db.insert(table, item) for item in (body if isinstance(body, list) else [body])]
+        elif request.method == "PATCH":
+            changes = await request.json()
+            rows = self.db.select(table, params)
+            for row in rows:
+                row.update(changes)
+                if table == "expenses":
+                    row["updated_at"] = datetime.now().isoformat()
+        elif request.method == "DELETE":
+            rows = self.db.select(table, params)
+            self.db.delete(table, rows)
+        else:
+            return Response(status_code=405)
+
+        rows = self.db.project(table, rows, params.get("select", "*"))
+        if single:
+            if len(rows) != 1:
+                return JSONResponse({"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned"}, status_code=406)
+            return JSONResponse(rows[0])
+        return JSONResponse(rows)
+
+    async def rpc(self, request: Request) -> Response:
+        name = request.path_params["name"]
+        args = await request.json() if request.method == "POST" else dict(request.query_params)
+
+        if name == "expense_fingerprint":
+            members = [args["p_user_id"]]
+            profile = self.db.by_id["profiles"].get(args["p_user_id"])
+            if args.get("p_include_partner") and profile and profile.get("partner_id"):
+                members.append(profile["partner_id"])
+            rows = [
+                r for m in members for r in self.db.by_user.get("expenses", {}).get(m, [])
+                if str(r.get("date")) >= args["p_start_date"]
+                and (not args.get("p_end_date") or str(r.get("date")) <= args["p_end_date"])
+            ]
+            return JSONResponse([{
+                "row_count": len(rows),
+                "total": round(sum(float(r["amount"]) for r in rows), 2),
+                "last_updated": max((r["updated_at"] for r in rows), default=None),
+            }])
+        if name == "budget_status":
+            return JSONResponse([])
+        if name == "rebuild_budget_counter":
+            return JSONResponse(None)
+        return JSONResponse({"message": f"Unknown function {name}"}, status_code=404)
+
+    # Gmail and OAuth
+
+    async def token(self, request: Request) -> Response:
+        return JSONResponse({"access_token": uuid.uuid4().hex, "expires_in": 3600, "token_type": "Bearer"})
+
+    async def labels(self, request: Request) -> Response:
+        await asyncio.sleep(self.gmail_latency)
+        return JSONResponse({"labels": [{"id": "Label_expenses", "name": "Expenses", "type": "user"}]})
+
+    async def list_messages(self, request: Request) -> Response:
+        await asyncio.sleep(self.gmail_latency)
+        limit = int(request.query_params.get("maxResults", 100))
+        ids = list(self.messages)[:limit]
+        return JSONResponse({"messages": [{"id": i, "threadId": self.messages[i]["threadId"]} for i in ids]})
+
+    async def get_message(self, request: Request) -> Response:
+        await asyncio.sleep(self.gmail_latency)
+        message = self.messages.get(request.path_params["message_id"])
+        if message is None:
+            return JSONResponse({"error": {"code": 404, "message": "Not Found"}}, status_code=404)
+        return JSONResponse(message)
+
+    async def seed(self, request: Request) -> Response:
+        return JSONResponse({"users": self.users})
+
+    async def health(self, request: Request) -> Response:
+        return JSONResponse({"status": "ok"})
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/rest/v1/rpc/{name}", self.rpc, methods=["GET", "POST"]),
+            Route("/rest/v1/{table}", self.table, methods=["GET", "POST", "PATCH", "DELETE"]),
+            Route("/token", self.token, methods=["POST"]),
+            Route("/gmail/v1/users/me/labels", self.labels, methods=["GET"]),
+            Route("/gmail/v1/users/me/messages", self.list_messages, methods=["GET"]),
+            Route("/gmail/v1/users/me/messages/{message_id}", self.get_message, methods=["GET"]),
+            Route("/__seed", self.seed),
+            Route("/__health", self.health),
+        ])
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--households", type=int, default=50)
+    parser.add_argument("--expenses-per-user", type=int, default=1500)
+    parser.add_argument("--messages-per-user", type=int, default=20)
+    parser.add_argument("--gmail-latency", type=float, default=0.03, help="Seconds added to each Gmail call")
+    parser.add_argument("--seed", type=int, default=21)
+    parser.add_argument("--max-rows", type=int, default=1000, help="Rows per table read, 0 for no cap")
+    args = parser.parse_args()
+
+    services = FakeServices(
+        args.households, args.expenses_per_user, args.messages_per_user, args.gmail_latency, args.seed, args.max_rows
+    )
+    uvicorn.run(services.app(), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
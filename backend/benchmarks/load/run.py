@@ -0,0 +1,237 @@
+"""End-to-end load test: app.main:app against local fakes, with per-endpoint latency percentiles.
+
+Starts benchmarks.load.fakes (PostgREST, Gmail and OAuth stand-ins seeded
+with synthetic households) and benchmarks.load.serve (the app with a fake
+Gemini model), then drives a weighted dashboard traffic mix from concurrent
+clients. Results are written per commit to benchmarks/results/load/ and
+compared with the previous run. Run from the backend directory:
+
+    python -m benchmarks.load.run --duration 30 --concurrency 16
+    python -m benchmarks.load.run --baseline benchmarks/results/load/abc1234.json
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "..", "results", "load")
+
+# Dummy JWT-shaped key: the Supabase client validates the format, the fake ignores it
+FAKE_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.fake"
+
+# (name, weight, method, path, params, json body) with {user} filled per request
+TRAFFIC_MIX = [
+    ("GET /expenses", 25, "GET", "/expenses", {"limit": 50}, None),
+    ("GET /expenses/stats", 20, "GET", "/expenses/stats", {"timeframe": "month", "include_partner": "true"}, None),
+    ("GET /categories", 10, "GET", "/categories", {}, None),
+    ("GET /expenses/forecast", 8, "GET", "/expenses/forecast", {}, None),
+    ("POST /expenses", 8, "POST", "/expenses", {}, "expense"),
+    ("GET /partners/status", 5, "GET", "/partners/status", {}, None),
+    ("GET /budgets", 5, "GET", "/budgets", {}, None),
+    ("GET /analysis/recurring", 5, "GET", "/analysis/recurring", {}, None),
+    ("GET /analysis/anomalies", 4, "GET", "/analysis/anomalies", {"timeframe": "month"}, None),
+    ("POST /analysis", 4, "POST", "/analysis", {}, {"timeframe": "month", "include_partner": False}),
+    ("POST /gmail/sync", 1, "POST", "/gmail/sync", {"days_back": 30}, None),
+]
+
+MERCHANTS = ["Starbucks", "Whole Foods", "Uber", "Amazon", "Netflix", "Shell", "Target"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, process: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args} exited with {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise TimeoutError(f"{url} did not come up within {timeout}s")
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def drive(base_url: str, users: list[str], duration: float, concurrency: int, seed: int) -> dict:
+    """Run the traffic mix for `duration` seconds; returns latencies and errors per endpoint."""
+    rng = random.Random(seed)
+    weights = [entry[1] for entry in TRAFFIC_MIX]
+    latencies: dict[str, list[float]] = {entry[0]: [] for entry in TRAFFIC_MIX}
+    errors: dict[str, int] = {entry[0]: 0 for entry in TRAFFIC_MIX}
+    deadline = time.monotonic() + duration
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while time.monotonic() < deadline:
+            name, _, method, path, params, body = rng.choices(TRAFFIC_MIX, weights)[0]
+            user = rng.choice(users)
+            if body == "expense":
+                body = {
+                    "amount": round(rng.lognormvariate(3.2, 0.9), 2),
+                    "description": "Load test purchase",
+                    "merchant": rng.choice(MERCHANTS),
+                }
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, params={**params, "user_id": user}, json=body)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies[name].append(time.perf_counter() - start)
+            errors[name] += failed
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors}
+
+
+def summarize(run: dict, duration: float) -> dict:
+    endpoints = {}
+    for name, values in run["latencies"].items():
+        values = sorted(values)
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": run["errors"][name],
+            "throughput_rps": round(len(values) / duration, 2),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {"total_requests": total, "throughput_rps": round(total / duration, 2), "endpoints": endpoints}
+
+
+def current_commit() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def previous_result(exclude: str) -> dict | None:
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), key=os.path.getmtime, reverse=True)
+    for path in paths:
+        if os.path.abspath(path) != os.path.abspath(exclude):
+            with open(path) as f:
+                return json.load(f)
+    return None
+
+
+def print_report(result: dict, baseline: dict | None) -> None:
+    print(f"\ncommit {result['commit']}: {result['total_requests']} requests, {result['throughput_rps']} req/s")
+    header = f"{'endpoint':<26}{'reqs':>7}{'err':>5}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    if baseline:
+        header += f"   p95 vs {baseline['commit']}"
+    print(header)
+    for name, stats in result["endpoints"].items():
+        line = (
+            f"{name:<26}{stats['requests']:>7}{stats['errors']:>5}{stats['throughput_rps']:>8}"
+            f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+        )
+        previous = baseline["endpoints"].get(name) if baseline else None
+        if previous and previous["p95_ms"]:
+            change = (stats["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+            line += f"   {change:+.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds (after warm-up)")
+    parser.add_argument("--warm-up", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--households", type=int, default=50)
+    parser.add_argument("--expenses-per-user", type=int, default=1500)
+    parser.add_argument("--gmail-latency", type=float, default=0.03)
+    parser.add_argument("--gemini-latency", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=21)
+    parser.add_argument("--baseline", help="Result file to compare with (default: the most recent other run)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    fake_port, app_port = free_port(), free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    env = {
+        **os.environ,
+        "SUPABASE_URL": fake_url,
+        "SUPABASE_KEY": FAKE_SUPABASE_KEY,
+        "SUPABASE_SERVICE_KEY": FAKE_SUPABASE_KEY,
+        "GOOGLE_CLIENT_ID": "load-test",
+        "GOOGLE_CLIENT_SECRET": "load-test",
+        "GEMINI_API_KEY": "load-test",
+        "GOOGLE_TOKEN_URI": f"{fake_url}/token",
+        "GMAIL_API_ENDPOINT": f"{fake_url}/",
+        "SERVER_TIMING_ENABLED": "false",
+        "PROFILING_TOKEN": "",
+    }
+
+    processes = []
+    try:
+        fakes = subprocess.Popen([
+            sys.executable, "-m", "benchmarks.load.fakes", "--port", str(fake_port),
+            "--households", str(args.households), "--expenses-per-user", str(args.expenses_per_user),
+            "--gmail-latency", str(args.gmail_latency), "--seed", str(args.seed),
+        ], env=env)
+        processes.append(fakes)
+        wait_for(f"{fake_url}/__health", fakes)
+
+        server = subprocess.Popen([
+            sys.executable, "-m", "benchmarks.load.serve", "--port", str(app_port),
+            "--gemini-latency", str(args.gemini_latency),
+        ], env=env)
+        processes.append(server)
+        app_url = f"http://127.0.0.1:{app_port}"
+        wait_for(f"{app_url}/health", server)
+
+        users = [u["id"] for u in httpx.get(f"{fake_url}/__seed").json()["users"]]
+        print(f"Seeded {len(users)} users in {args.households} households; warming up for {args.warm_up}s")
+        asyncio.run(drive(app_url, users, args.warm_up, args.concurrency, args.seed))
+
+        print(f"Measuring for {args.duration}s at concurrency {args.concurrency}")
+        run = asyncio.run(drive(app_url, users, args.duration, args.concurrency, args.seed + 1))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+    result = {
+        "commit": current_commit(),
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "no_save")},
+        **summarize(run, args.duration),
+    }
+
+    path = os.path.join(RESULTS_DIR, f"{result['commit']}.json")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        baseline = previous_result(exclude=path)
+    print_report(result, baseline)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved {os.path.relpath(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Run app.main:app for load tests with Gemini replaced by a fake model.
+
+Supabase, Gmail and OAuth traffic is pointed at benchmarks.load.fakes through
+SUPABASE_URL, GMAIL_API_ENDPOINT and GOOGLE_TOKEN_URI (set by the driver).
+The Gemini SDK talks gRPC, so it is faked at the model object instead, with
+the same async generate/stream interface and a configurable latency.
+"""
+import argparse
+import asyncio
+
+ANALYSIS_TEXT = (
+    "SUMMARY: Spending is steady, with dining and shopping the largest categories.\n\n"
+    "INSIGHTS:\n- Dining out is up compared to last month\n- Subscriptions are stable\n- Groceries are below average\n\n"
+    "RECOMMENDATIONS:\n- Set a dining budget\n- Review unused subscriptions\n"
+)
+
+
+class FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStream:
+    def __init__(self, text: str, latency: float, chunks: int = 8):
+        self.text = text
+        self.latency = latency
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        size = max(len(self.text) // self.chunks, 1)
+        for start in range(0, len(self.text), size):
+            await asyncio.sleep(self.latency / self.chunks)
+            yield FakeChunk(self.text[start:start + size])
+
+
+class FakeGeminiModel:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        if stream:
+            return FakeStream(ANALYSIS_TEXT, self.latency)
+        await asyncio.sleep(self.latency)
+        # Category prompts expect a bare category name
+        return FakeChunk("Other" if "What category does this belong to" in prompt else ANALYSIS_TEXT)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--gemini-latency", type=float, default=1.5, help="Seconds per fake Gemini call")
+    args = parser.parse_args()
+
+    from app.main import app
+    from app.services.gemini_client import get_gemini_client
+
+    get_gemini_client().model = FakeGeminiModel(args.gemini_latency)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import base64
+import random
+from datetime import datetime, timedelta
+
+# Merchants and description templates per default category
+CATEGORY_VOCAB = {
+    "Food & Dining": (
+        ["Chipotle", "Starbucks", "Uber Eats", "DoorDash", "Sweetgreen", "Olive Garden", "Pizza Hut"],
+        ["Dinner order", "Lunch with team", "Coffee", "Takeout order #{n}", "Your order from {m}"],
+    ),
+    "Transportation": (
+        ["Uber", "Lyft", "Shell", "Chevron", "Metro Transit", "ParkMobile"],
+        ["Trip receipt", "Your ride with {m}", "Fuel purchase", "Parking session", "Monthly transit pass"],
+    ),
+    "Shopping": (
+        ["Amazon", "Target", "Best Buy", "IKEA", "Etsy", "Nike"],
+        ["Your {m} order has shipped", "Order confirmation #{n}", "Purchase receipt", "Online order"],
+    ),
+    "Entertainment": (
+        ["AMC Theatres", "Ticketmaster", "Steam", "Bowlero", "Eventbrite"],
+        ["Movie tickets", "Concert tickets", "Game purchase", "Event registration"],
+    ),
+    "Bills & Utilities": (
+        ["PG&E", "Comcast", "Verizon", "AT&T", "City Water"],
+        ["Your bill is ready", "Monthly statement", "Autopay confirmation", "Electric bill"],
+    ),
+    "Healthcare": (
+        ["CVS Pharmacy", "Walgreens", "Kaiser", "One Medical", "Delta Dental"],
+        ["Prescription pickup", "Copay receipt", "Appointment payment", "Pharmacy order"],
+    ),
+    "Travel": (
+        ["Delta", "United Airlines", "Airbnb", "Marriott", "Expedia"],
+        ["Flight confirmation", "Booking confirmed", "Hotel reservation", "Your trip to {c}"],
+    ),
+    "Groceries": (
+        ["Whole Foods", "Trader Joe's", "Safeway", "Costco", "Instacart"],
+        ["Grocery order", "Your {m} receipt", "Weekly groceries", "Delivery from {m}"],
+    ),
+    "Subscriptions": (
+        ["Netflix", "Spotify", "Apple", "Adobe", "GitHub", "NYTimes"],
+        ["Your subscription renewed", "Monthly membership", "Payment received - {m}", "Plan renewal"],
+    ),
+    "Other": (
+        ["Venmo", "PayPal", "USPS", "Local Store"],
+        ["Payment", "Receipt", "Transfer", "Misc purchase"],
+    ),
+}
+
+CITIES = ["Denver", "Austin", "Chicago", "Seattle", "Boston"]
+
+
+def generate_labeled_expenses(count: int, seed: int = 7, noise: float = 0.0) -> list[dict]:
+    """Generate (description, merchant, category) rows resembling real receipts.
+
+    With `noise`, that fraction of rows gets a random label, mimicking
+    inconsistent manual categorization.
+    """
+    rng = random.Random(seed)
+    categories = list(CATEGORY_VOCAB)
+    rows = []
+    for _ in range(count):
+        category = rng.choice(categories)
+        merchants, templates = CATEGORY_VOCAB[category]
+        merchant = rng.choice(merchants)
+        description = rng.choice(templates).format(m=merchant, n=rng.randint(1000, 99999), c=rng.choice(CITIES))
+        if noise and rng.random() < noise:
+            category = rng.choice(categories)
+        rows.append({"description": description, "merchant": merchant, "category": category})
+    return rows
+
+
+def generate_expense_rows(count: int, user_ids: list[str], days: int = 365, seed: int = 11) -> list[dict]:
+    """Generate PostgREST-shaped expense rows (with embedded categories) spread over `days`."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    labeled = generate_labeled_expenses(count, seed)
+    rows = []
+    for i, item in enumerate(labeled):
+        date = now - timedelta(days=rng.random() * days)
+        rows.append({
+            "id": f"exp-{i}",
+            "user_id": rng.choice(user_ids),
+            "amount": round(rng.lognormvariate(3.2, 0.9), 2),
+            "description": item["description"],
+            "merchant": item["merchant"],
+            "category_id": item["category"],
+            "categories": {"name": item["category"], "color": "#64748b"},
+            "date": date.isoformat(),
+            "source": rng.choice(["gmail", "manual"]),
+            "email_id": None,
+            "created_at": date.isoformat(),
+            "updated_at": date.isoformat(),
+        })
+    return rows
+
+
+RECEIPT_SENDERS = ["no-reply", "receipts", "orders", "billing"]
+FILLER_LINE = "Thank you for your purchase. Questions about this charge? Visit our help center or reply to this email."
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+def generate_receipt_messages(count: int, seed: int = 13, days: int = 30, filler_lines: int = 5) -> list[dict]:
+    """Generate Gmail API message resources (format=full) for receipt emails.
+
+    Structures rotate between a single text/plain body, multipart/alternative
+    with text and HTML parts, an HTML-only body, and multipart/mixed with a
+    nested alternative part plus a PDF attachment stub. `filler_lines` sets
+    the body size.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    messages = []
+    for i, item in enumerate(generate_labeled_expenses(count, seed)):
+        merchant = item["merchant"]
+        amount = round(rng.lognormvariate(3.2, 0.9), 2)
+        sent = now - timedelta(days=rng.random() * days)
+        filler = "\n".join(FILLER_LINE for _ in range(filler_lines))
+        text = f"Payment to {merchant} for ${amount:.2f}\nTotal: ${amount:.2f}\n\n{filler}"
+        html = (
+            f"<html><body><h1>{merchant}</h1><p>Total: <b>${amount:.2f}</b></p>"
+            + "".join(f"<p>{FILLER_LINE}</p>" for _ in range(filler_lines))
+            + "</body></html>"
+        )
+
+        structure = i % 4
+        if structure == 0:
+            payload = {"mimeType": "text/plain", "body": {"data": _b64(text)}}
+        elif structure == 1:
+            payload = {"mimeType": "multipart/alternative", "body": {}, "parts": [
+                {"mimeType": "text/plain", "body": {"data": _b64(text)}},
+                {"mimeType": "text/html", "body": {"data": _b64(html)}},
+            ]}
+        elif structure == 2:
+            payload = {"mimeType": "text/html", "body": {"data": _b64(html)}}
+        else:
+            payload = {"mimeType": "multipart/mixed", "body": {}, "parts": [
+                {"mimeType": "multipart/alternative", "body": {}, "parts": [
+                    {"mimeType": "text/plain", "body": {"data": _b64(text)}},
+                    {"mimeType": "text/html", "body": {"data": _b64(html)}},
+                ]},
+                {"mimeType": "application/pdf", "filename": "receipt.pdf", "body": {"attachmentId": f"att-{i}", "size": 48213}},
+            ]}
+
+        payload["headers"] = [
+            {"name": "Subject", "value": item["description"]},
+            {"name": "From", "value": f"{merchant} <{rng.choice(RECEIPT_SENDERS)}@example.com>"},
+            {"name": "Date", "value": sent.strftime("%a, %d %b %Y %H:%M:%S +0000")},
+        ]
+        messages.append({
+            "id": f"msg-{seed}-{i}",
+            "threadId": f"thread-{seed}-{i}",
+            "labelIds": ["Label_expenses"],
+            "snippet": f"Payment to {merchant} for ${amount:.2f}",
+            "payload": payload,
+        })
+    return messages
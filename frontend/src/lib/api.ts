@@ -27,6 +27,11 @@ export const api = {
       `/expenses?user_id=${userId}&include_partner=${includePartner}${startDate ? `&start_date=${startDate}` : ''}${endDate ? `&end_date=${endDate}` : ''}`
     ),
 
+  searchExpenses: (userId: string, query: string, includePartner = false, cursor?: string) =>
+    fetchAPI<ExpenseSearchResults>(
+      `/expenses/search?user_id=${userId}&q=${encodeURIComponent(query)}&include_partner=${includePartner}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`
+    ),
+
   createExpense: (userId: string, expense: ExpenseCreate) =>
     fetchAPI<Expense>(`/expenses?user_id=${userId}`, {
       method: 'POST',
@@ -49,6 +54,12 @@ export const api = {
       `/expenses/stats?user_id=${userId}&include_partner=${includePartner}&timeframe=${timeframe}`
     ),
 
+  // Dashboard
+  getDashboard: (userId: string, includePartner = false, timeframe = 'month') =>
+    fetchAPI<Dashboard>(
+      `/dashboard?user_id=${userId}&include_partner=${includePartner}&timeframe=${timeframe}`
+    ),
+
   // Gmail
   getGmailAuthUrl: (userId: string) =>
     fetchAPI<{ authorization_url: string }>(`/auth/google?user_id=${userId}`),
@@ -73,6 +84,32 @@ export const api = {
       body: JSON.stringify({ timeframe, include_partner: includePartner }),
     }),
 
+  streamAnalysis: (
+    userId: string,
+    timeframe: string,
+    includePartner: boolean,
+    handlers: AnalysisStreamHandlers
+  ) => {
+    const source = new EventSource(
+      `${API_URL}/analysis/stream?user_id=${userId}&timeframe=${timeframe}&include_partner=${includePartner}`
+    );
+    source.addEventListener('local', (e) => handlers.onLocal(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener('summary', (e) => handlers.onSummary(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener('insight', (e) => handlers.onInsight(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener('recommendation', (e) =>
+      handlers.onRecommendation(JSON.parse((e as MessageEvent).data))
+    );
+    source.addEventListener('done', (e) => {
+      source.close();
+      handlers.onDone(JSON.parse((e as MessageEvent).data));
+    });
+    source.onerror = () => {
+      source.close();
+      handlers.onError();
+    };
+    return () => source.close();
+  },
+
   compareWithPartner: (userId: string, timeframe = 'month') =>
     fetchAPI<PartnerComparison>(`/analysis/comparison?user_id=${userId}&timeframe=${timeframe}`),
 
@@ -131,6 +168,11 @@ export interface Expense {
   updated_at: string;
 }
 
+export interface ExpenseSearchResults {
+  results: (Expense & { score: number })[];
+  next_cursor: string | null;
+}
+
 export interface ExpenseCreate {
   amount: number;
   description: string;
@@ -157,6 +199,14 @@ export interface DashboardStats {
   monthly_trend: { month: string; amount: number }[];
 }
 
+export interface Dashboard {
+  partner_status: PartnerStatus;
+  stats: DashboardStats;
+  recent_expenses: Expense[];
+  categories: Category[];
+  comparison: PartnerComparison | null;
+}
+
 export interface GmailSyncResult {
   message: string;
   emails_processed: number;
@@ -172,6 +222,15 @@ export interface AIAnalysis {
   trends: { week: string; amount: number }[];
 }
 
+export interface AnalysisStreamHandlers {
+  onLocal: (data: Pick<AIAnalysis, 'spending_by_category' | 'trends'>) => void;
+  onSummary: (summary: string) => void;
+  onInsight: (insight: string) => void;
+  onRecommendation: (recommendation: string) => void;
+  onDone: (analysis: AIAnalysis) => void;
+  onError: () => void;
+}
+
 export interface PartnerComparison {
   user: { total: number; percentage: number; by_category: Record<string, number> };
   partner: { total: number; percentage: number; by_category: Record<string, number> };
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { Brain, RefreshCw, Lightbulb, TrendingUp, AlertCircle } from 'lucide-react';
 import { useAuth } from '../context/AuthContext';
 import { api, AIAnalysis, PartnerStatus } from '../lib/api';
@@ -10,29 +10,54 @@ export function AIInsights() {
   const [loading, setLoading] = useState(true);
   const [timeframe, setTimeframe] = useState('month');
   const [includePartner, setIncludePartner] = useState(true);
+  const closeStream = useRef<(() => void) | null>(null);
 
   useEffect(() => {
     if (user) {
       loadInsights();
     }
+    return () => closeStream.current?.();
   }, [user, timeframe, includePartner]);
 
-  const loadInsights = async () => {
+  const loadInsights = () => {
     if (!user) return;
 
     setLoading(true);
-    try {
-      const [status, insights] = await Promise.all([
-        api.getPartnerStatus(user.id),
-        api.analyzeExpenses(user.id, timeframe, includePartner),
-      ]);
-      setPartnerStatus(status);
-      setAnalysis(insights);
-    } catch (error) {
-      console.error('Failed to load insights:', error);
-    } finally {
-      setLoading(false);
-    }
+    closeStream.current?.();
+    api.getPartnerStatus(user.id)
+      .then(setPartnerStatus)
+      .catch((error) => console.error('Failed to load partner status:', error));
+
+    // Render the locally computed breakdown first, then fill in AI text as it streams
+    const empty: AIAnalysis = {
+      summary: '',
+      insights: [],
+      recommendations: [],
+      spending_by_category: {},
+      trends: [],
+    };
+    closeStream.current = api.streamAnalysis(user.id, timeframe, includePartner, {
+      onLocal: (data) => {
+        setAnalysis({ ...empty, ...data });
+        setLoading(false);
+      },
+      onSummary: (summary) => setAnalysis((prev) => ({ ...(prev ?? empty), summary })),
+      onInsight: (insight) =>
+        setAnalysis((prev) => ({ ...(prev ?? empty), insights: [...(prev?.insights ?? []), insight] })),
+      onRecommendation: (rec) =>
+        setAnalysis((prev) => ({
+          ...(prev ?? empty),
+          recommendations: [...(prev?.recommendations ?? []), rec],
+        })),
+      onDone: (result) => {
+        setAnalysis(result);
+        setLoading(false);
+      },
+      onError: () => {
+        console.error('Failed to load insights');
+        setLoading(false);
+      },
+    });
   };
 
   if (loading) {
@@ -25,23 +25,11 @@ export function GlobalDashboard() {
 
     setLoading(true);
     try {
-      // Load partner status first
-      const partner = await api.getPartnerStatus(user.id);
-      setPartnerStatus(partner);
-
-      // Load stats (include partner if linked)
-      const dashboardStats = await api.getExpenseStats(
-        user.id,
-        partner.has_partner,
-        timeframe
-      );
-      setStats(dashboardStats);
-
-      // Load comparison if partner is linked
-      if (partner.has_partner) {
-        const comp = await api.compareWithPartner(user.id, timeframe);
-        setComparison(comp);
-      }
+      // Household view: combined with the partner's expenses when linked
+      const dashboard = await api.getDashboard(user.id, true, timeframe);
+      setPartnerStatus(dashboard.partner_status);
+      setStats(dashboard.stats);
+      setComparison(dashboard.comparison);
     } catch (error) {
       console.error('Failed to load dashboard:', error);
     } finally {
@@ -27,12 +27,9 @@ export function PersonalDashboard() {
 
     setLoading(true);
     try {
-      const [dashboardStats, userExpenses] = await Promise.all([
-        api.getExpenseStats(user.id, false, timeframe),
-        api.getExpenses(user.id, false),
-      ]);
-      setStats(dashboardStats);
-      setExpenses(userExpenses);
+      const dashboard = await api.getDashboard(user.id, false, timeframe);
+      setStats(dashboard.stats);
+      setExpenses(dashboard.recent_expenses);
     } catch (error) {
       console.error('Failed to load dashboard:', error);
     } finally {
@@ -0,0 +1,21 @@
+-- Stand-ins for the Supabase pieces supabase-schema.sql depends on, so the
+-- schema loads on a plain local Postgres (for DATABASE_URL testing and
+-- benchmarks). Do not run this on a Supabase project.
+--
+--   createdb financial_dashboard
+--   psql -d financial_dashboard -f supabase-local-shim.sql -f supabase-schema.sql
+
+CREATE SCHEMA IF NOT EXISTS auth;
+
+CREATE TABLE IF NOT EXISTS auth.users (
+    id UUID PRIMARY KEY,
+    email TEXT,
+    raw_user_meta_data JSONB DEFAULT '{}'::jsonb
+);
+
+-- Supabase reads the caller from the request JWT; locally it can be set per
+-- session with SET request.jwt.claim.sub = '<uuid>' to exercise RLS policies
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS UUID
+LANGUAGE sql STABLE AS $$
+    SELECT NULLIF(current_setting('request.jwt.claim.sub', true), '')::uuid
+$$;
@@ -0,0 +1,366 @@
+-- One-off migration of an existing deployment's public.expenses to the
+-- monthly range-partitioned layout of supabase-schema.sql. New projects get
+-- that layout from supabase-schema.sql and do not need this file.
+--
+-- Self-contained: it also (re)creates the budgets tables and the functions
+-- the expenses triggers call, so it works whether or not the project ever
+-- ran the budgets part of supabase-schema.sql.
+--
+-- Run once in the Supabase SQL Editor (or psql) at a quiet time: it copies
+-- every expense and keeps the table locked until it commits. The old table
+-- is kept as public.expenses_unpartitioned; drop it once the new table has
+-- been checked:
+--
+--   SELECT (SELECT COUNT(*) FROM public.expenses), (SELECT COUNT(*) FROM public.expenses_unpartitioned);
+--   DROP TABLE public.expenses_unpartitioned;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+BEGIN;
+
+LOCK TABLE public.expenses IN ACCESS EXCLUSIVE MODE;
+
+ALTER TABLE public.expenses RENAME TO expenses_unpartitioned;
+ALTER INDEX public.expenses_pkey RENAME TO expenses_unpartitioned_pkey;
+ALTER INDEX IF EXISTS public.idx_expenses_user_id RENAME TO idx_expenses_unpartitioned_user_id;
+ALTER INDEX IF EXISTS public.idx_expenses_date RENAME TO idx_expenses_unpartitioned_date;
+ALTER INDEX IF EXISTS public.idx_expenses_category RENAME TO idx_expenses_unpartitioned_category;
+DROP TRIGGER IF EXISTS expenses_touch_updated_at ON public.expenses_unpartitioned;
+DROP TRIGGER IF EXISTS expenses_budgets ON public.expenses_unpartitioned;
+
+-- Same definitions as supabase-schema.sql from here on
+CREATE TABLE public.expenses (
+    id UUID DEFAULT uuid_generate_v4(),
+    user_id UUID REFERENCES public.profiles(id) NOT NULL,
+    amount DECIMAL(12, 2) NOT NULL,
+    description TEXT NOT NULL,
+    category_id UUID REFERENCES public.categories(id),
+    merchant TEXT,
+    date TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    source TEXT DEFAULT 'manual' CHECK (source IN ('gmail', 'manual')),
+    email_id TEXT,  -- Gmail message ID if from email
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (id, date)
+) PARTITION BY RANGE (date);
+
+CREATE TABLE public.expenses_default PARTITION OF public.expenses DEFAULT;
+ALTER TABLE public.expenses_default ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.create_expense_partition(p_month DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_start TIMESTAMP WITH TIME ZONE := date_trunc('month', p_month::timestamp) AT TIME ZONE 'UTC';
+    v_end TIMESTAMP WITH TIME ZONE := (date_trunc('month', p_month::timestamp) + INTERVAL '1 month') AT TIME ZONE 'UTC';
+    v_name TEXT := 'expenses_' || to_char(p_month, '"y"YYYY"m"MM');
+BEGIN
+    IF to_regclass('public.' || v_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM public.expenses_default WHERE date >= v_start AND date < v_end) THEN
+        EXECUTE format('CREATE TABLE public.%I (LIKE public.expenses INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', v_name);
+        EXECUTE format(
+            'INSERT INTO public.%I SELECT * FROM public.expenses_default WHERE date >= $1 AND date < $2', v_name
+        ) USING v_start, v_end;
+        ALTER TABLE public.expenses_default DISABLE TRIGGER expenses_budgets;
+        DELETE FROM public.expenses_default WHERE date >= v_start AND date < v_end;
+        ALTER TABLE public.expenses_default ENABLE TRIGGER expenses_budgets;
+        EXECUTE format(
+            'ALTER TABLE public.expenses ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)', v_name, v_start, v_end
+        );
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.expenses FOR VALUES FROM (%L) TO (%L)', v_name, v_start, v_end
+        );
+    END IF;
+    EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_name);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.maintain_expense_partitions(p_months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+DECLARE
+    v_month DATE;
+    v_months DATE[];
+    v_this_month TIMESTAMP := date_trunc('month', NOW() AT TIME ZONE 'UTC');
+    v_created INTEGER := 0;
+BEGIN
+    SELECT array_agg(m ORDER BY m) INTO v_months FROM (
+        SELECT generate_series(v_this_month, v_this_month + make_interval(months => p_months_ahead), INTERVAL '1 month')::date
+        UNION
+        SELECT DISTINCT date_trunc('month', date AT TIME ZONE 'UTC')::date FROM public.expenses_default
+    ) AS months(m);
+
+    FOREACH v_month IN ARRAY v_months LOOP
+        IF public.create_expense_partition(v_month) THEN
+            v_created := v_created + 1;
+        END IF;
+    END LOOP;
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION public.create_expense_partition(DATE) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.maintain_expense_partitions(INTEGER) FROM PUBLIC;
+
+-- A partition for every month that has expenses, so nothing lands in the default
+SELECT public.create_expense_partition(month::date)
+FROM (
+    SELECT DISTINCT date_trunc('month', COALESCE(date, created_at, NOW()) AT TIME ZONE 'UTC') AS month
+    FROM public.expenses_unpartitioned
+) AS months
+ORDER BY month;
+SELECT public.maintain_expense_partitions();
+
+-- Copied before the triggers exist so updated_at keeps its value; budget
+-- counters are rebuilt from these rows below. date was nullable before.
+INSERT INTO public.expenses (
+    id, user_id, amount, description, category_id, merchant, date, source, email_id, created_at, updated_at
+)
+SELECT id, user_id, amount, description, category_id, merchant, COALESCE(date, created_at, NOW()),
+       source, email_id, created_at, updated_at
+FROM public.expenses_unpartitioned;
+
+CREATE INDEX idx_expenses_user_date ON public.expenses(user_id, date) INCLUDE (amount, category_id);
+CREATE INDEX idx_expenses_category ON public.expenses(category_id);
+
+-- Expense search over merchant and description. The search indexes are on
+-- these expressions, so search_expenses() must use them verbatim. 'simple'
+-- skips stemming and stop words: merchants and receipt subjects are names,
+-- not prose.
+CREATE OR REPLACE FUNCTION public.expense_search_document(p_merchant TEXT, p_description TEXT)
+RETURNS tsvector AS $$
+    SELECT to_tsvector('simple', COALESCE(p_merchant, '') || ' ' || COALESCE(p_description, ''))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION public.expense_search_text(p_merchant TEXT, p_description TEXT)
+RETURNS TEXT AS $$
+    SELECT COALESCE(p_merchant, '') || ' ' || COALESCE(p_description, '')
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE INDEX idx_expenses_search
+    ON public.expenses USING GIN (user_id, public.expense_search_document(merchant, description));
+CREATE INDEX idx_expenses_search_trgm
+    ON public.expenses USING GIN (user_id, public.expense_search_text(merchant, description) gin_trgm_ops);
+
+-- Keep updated_at current on every expense change (used for cache fingerprints)
+CREATE OR REPLACE FUNCTION public.touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Budgets: a spending limit per category (or overall when category_id is NULL)
+-- and period, for the owner alone or for the owner's household
+CREATE TABLE IF NOT EXISTS public.budgets (
+    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    user_id UUID REFERENCES public.profiles(id) NOT NULL,
+    category_id UUID REFERENCES public.categories(id) ON DELETE CASCADE,
+    scope TEXT DEFAULT 'personal' CHECK (scope IN ('personal', 'household')),
+    period TEXT DEFAULT 'month' CHECK (period IN ('week', 'month', 'quarter', 'year')),
+    amount_limit DECIMAL(12, 2) NOT NULL CHECK (amount_limit > 0),
+    thresholds NUMERIC[] DEFAULT '{0.5, 0.8, 1.0}',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Running spent-so-far per budget and period, maintained by a trigger on expenses
+CREATE TABLE IF NOT EXISTS public.budget_counters (
+    budget_id UUID REFERENCES public.budgets(id) ON DELETE CASCADE,
+    period_start DATE NOT NULL,
+    spent DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (budget_id, period_start)
+);
+
+-- Threshold crossings (e.g. 80% of the limit reached)
+CREATE TABLE IF NOT EXISTS public.budget_events (
+    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    budget_id UUID REFERENCES public.budgets(id) ON DELETE CASCADE NOT NULL,
+    period_start DATE NOT NULL,
+    threshold NUMERIC NOT NULL,
+    spent DECIMAL(12, 2) NOT NULL,
+    amount_limit DECIMAL(12, 2) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE public.budgets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.budget_counters ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.budget_events ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can manage own budgets" ON public.budgets;
+CREATE POLICY "Users can manage own budgets" ON public.budgets
+    FOR ALL USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can view partner household budgets" ON public.budgets;
+CREATE POLICY "Users can view partner household budgets" ON public.budgets
+    FOR SELECT USING (
+        scope = 'household' AND
+        auth.uid() IN (SELECT partner_id FROM public.profiles WHERE id = user_id)
+    );
+
+DROP POLICY IF EXISTS "Users can view counters of visible budgets" ON public.budget_counters;
+CREATE POLICY "Users can view counters of visible budgets" ON public.budget_counters
+    FOR SELECT USING (budget_id IN (SELECT id FROM public.budgets));
+
+DROP POLICY IF EXISTS "Users can view events of visible budgets" ON public.budget_events;
+CREATE POLICY "Users can view events of visible budgets" ON public.budget_events
+    FOR SELECT USING (budget_id IN (SELECT id FROM public.budgets));
+
+-- Start of the budget period containing a timestamp (UTC)
+CREATE OR REPLACE FUNCTION public.budget_period_start(p_period TEXT, p_date TIMESTAMP WITH TIME ZONE)
+RETURNS DATE AS $$
+    SELECT date_trunc(p_period, p_date AT TIME ZONE 'UTC')::date;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Add an amount to every budget an expense counts towards, recording any
+-- thresholds crossed on the way up. Touches one counter row per matching
+-- budget, so it costs the same however many expenses exist.
+CREATE OR REPLACE FUNCTION public.apply_budget_delta(
+    p_user_id UUID,
+    p_category_id UUID,
+    p_date TIMESTAMP WITH TIME ZONE,
+    p_delta NUMERIC
+)
+RETURNS VOID AS $$
+DECLARE
+    b RECORD;
+    v_start DATE;
+    v_new NUMERIC;
+    v_old NUMERIC;
+    v_threshold NUMERIC;
+BEGIN
+    IF p_delta = 0 THEN
+        RETURN;
+    END IF;
+
+    FOR b IN
+        SELECT * FROM public.budgets
+        WHERE (category_id IS NULL OR category_id = p_category_id)
+          AND (
+              user_id = p_user_id OR
+              (scope = 'household' AND user_id = (SELECT partner_id FROM public.profiles WHERE id = p_user_id))
+          )
+    LOOP
+        v_start := public.budget_period_start(b.period, p_date);
+
+        INSERT INTO public.budget_counters (budget_id, period_start, spent)
+        VALUES (b.id, v_start, p_delta)
+        ON CONFLICT (budget_id, period_start)
+        DO UPDATE SET spent = public.budget_counters.spent + EXCLUDED.spent, updated_at = NOW()
+        RETURNING spent INTO v_new;
+
+        v_old := v_new - p_delta;
+        FOREACH v_threshold IN ARRAY COALESCE(b.thresholds, '{}') LOOP
+            IF v_old < v_threshold * b.amount_limit AND v_new >= v_threshold * b.amount_limit THEN
+                INSERT INTO public.budget_events (budget_id, period_start, threshold, spent, amount_limit)
+                VALUES (b.id, v_start, v_threshold, v_new, b.amount_limit);
+            END IF;
+        END LOOP;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Keep budget counters in step with every expense insert, update and delete,
+-- including Gmail sync and the category_id reset when a category is deleted
+CREATE OR REPLACE FUNCTION public.expenses_update_budgets()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.amount = OLD.amount
+       AND NEW.user_id = OLD.user_id
+       AND NEW.date = OLD.date
+       AND NEW.category_id IS NOT DISTINCT FROM OLD.category_id THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.apply_budget_delta(OLD.user_id, OLD.category_id, OLD.date, -OLD.amount);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.apply_budget_delta(NEW.user_id, NEW.category_id, NEW.date, NEW.amount);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recompute a budget's counter for the current period from expenses. Only
+-- needed when a budget is created or its household changes (partner linking).
+CREATE OR REPLACE FUNCTION public.rebuild_budget_counter(p_budget_id UUID)
+RETURNS VOID AS $$
+DECLARE
+    b RECORD;
+    v_start DATE;
+BEGIN
+    SELECT * INTO b FROM public.budgets WHERE id = p_budget_id;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+    v_start := public.budget_period_start(b.period, NOW());
+
+    INSERT INTO public.budget_counters (budget_id, period_start, spent)
+    SELECT b.id, v_start, COALESCE(SUM(e.amount), 0)
+    FROM public.expenses e
+    WHERE (b.category_id IS NULL OR e.category_id = b.category_id)
+      AND public.budget_period_start(b.period, e.date) = v_start
+      AND (
+          e.user_id = b.user_id OR
+          (b.scope = 'household' AND e.user_id = (SELECT partner_id FROM public.profiles WHERE id = b.user_id))
+      )
+    ON CONFLICT (budget_id, period_start)
+    DO UPDATE SET spent = EXCLUDED.spent, updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+CREATE TRIGGER expenses_touch_updated_at
+    BEFORE UPDATE ON public.expenses
+    FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+
+CREATE TRIGGER expenses_budgets
+    AFTER INSERT OR UPDATE OR DELETE ON public.expenses
+    FOR EACH ROW EXECUTE FUNCTION public.expenses_update_budgets();
+
+-- Counters of existing budgets, from the copied rows
+SELECT public.rebuild_budget_counter(id) FROM public.budgets;
+
+ALTER TABLE public.expenses ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own expenses" ON public.expenses
+    FOR SELECT USING (
+        auth.uid() = user_id OR
+        auth.uid() IN (SELECT partner_id FROM public.profiles WHERE id = user_id)
+    );
+
+CREATE POLICY "Users can insert own expenses" ON public.expenses
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can update own expenses" ON public.expenses
+    FOR UPDATE USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can delete own expenses" ON public.expenses
+    FOR DELETE USING (auth.uid() = user_id);
+
+ANALYZE public.expenses;
+
+COMMIT;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('maintain-expense-partitions', '17 3 * * *', 'SELECT public.maintain_expense_partitions()');
+    END IF;
+END $$;
+
+-- PostgREST prepares its statements too; plan them per call so expenses
+-- partitions are pruned at plan time (a generic plan locks every partition).
+-- Takes effect as PostgREST reconnects.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticator') THEN
+        ALTER ROLE authenticator SET plan_cache_mode = 'force_custom_plan';
+    END IF;
+END $$;
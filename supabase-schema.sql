@@ -3,6 +3,9 @@
 
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+-- Expense search: trigram matching, and GIN indexes led by user_id
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
 
 -- Users table (extends Supabase auth.users)
 CREATE TABLE IF NOT EXISTS public.profiles (
@@ -40,20 +43,28 @@ INSERT INTO public.categories (name, color, icon) VALUES
     ('Other', '#64748b', 'more-horizontal')
 ON CONFLICT DO NOTHING;
 
--- Expenses table
+-- Expenses table, range-partitioned by month on date (UTC). Every dashboard
+-- query filters on a date range, so only the months in range are scanned.
+-- The primary key must include the partition key; ids stay unique as UUIDs.
+-- Partitions are created by public.maintain_expense_partitions() below.
 CREATE TABLE IF NOT EXISTS public.expenses (
-    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    id UUID DEFAULT uuid_generate_v4(),
     user_id UUID REFERENCES public.profiles(id) NOT NULL,
     amount DECIMAL(12, 2) NOT NULL,
     description TEXT NOT NULL,
     category_id UUID REFERENCES public.categories(id),
     merchant TEXT,
-    date TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    date TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     source TEXT DEFAULT 'manual' CHECK (source IN ('gmail', 'manual')),
     email_id TEXT,  -- Gmail message ID if from email
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (id, date)
+) PARTITION BY RANGE (date);
+
+-- Catches dates outside every monthly partition (old email imports, typos);
+-- maintain_expense_partitions() moves them into their own month
+CREATE TABLE IF NOT EXISTS public.expenses_default PARTITION OF public.expenses DEFAULT;
 
 -- Partner invites table
 CREATE TABLE IF NOT EXISTS public.partner_invites (
@@ -123,7 +134,608 @@ CREATE TRIGGER on_auth_user_created
     AFTER INSERT ON auth.users
     FOR EACH ROW EXECUTE FUNCTION public.handle_new_user();
 
+-- Keep updated_at current on every expense change (used for cache fingerprints)
+CREATE OR REPLACE FUNCTION public.touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS expenses_touch_updated_at ON public.expenses;
+CREATE TRIGGER expenses_touch_updated_at
+    BEFORE UPDATE ON public.expenses
+    FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+
+-- The three-argument version predates p_end_date; left in place it would
+-- make calls without p_end_date ambiguous
+DROP FUNCTION IF EXISTS public.expense_fingerprint(UUID, BOOLEAN, TIMESTAMP WITH TIME ZONE);
+
+-- Cheap change detector for cached analysis results: (row count, sum, max updated_at)
+-- over a user's (and optionally their partner's) expenses since a start date,
+-- through an end date when one is given
+CREATE OR REPLACE FUNCTION public.expense_fingerprint(
+    p_user_id UUID,
+    p_include_partner BOOLEAN,
+    p_start_date TIMESTAMP WITH TIME ZONE,
+    p_end_date TIMESTAMP WITH TIME ZONE DEFAULT NULL
+)
+RETURNS TABLE (row_count BIGINT, total NUMERIC, last_updated TIMESTAMP WITH TIME ZONE) AS $$
+    WITH members AS (
+        SELECT p_user_id AS id
+        UNION
+        SELECT partner_id FROM public.profiles
+        WHERE id = p_user_id AND p_include_partner AND partner_id IS NOT NULL
+    )
+    SELECT COUNT(*), COALESCE(SUM(e.amount), 0), MAX(e.updated_at)
+    FROM public.expenses e
+    WHERE e.user_id IN (SELECT id FROM members) AND e.date >= p_start_date
+      AND (p_end_date IS NULL OR e.date <= p_end_date);
+$$ LANGUAGE sql STABLE;
+
+-- Budgets: a spending limit per category (or overall when category_id is NULL)
+-- and period, for the owner alone or for the owner's household
+CREATE TABLE IF NOT EXISTS public.budgets (
+    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    user_id UUID REFERENCES public.profiles(id) NOT NULL,
+    category_id UUID REFERENCES public.categories(id) ON DELETE CASCADE,
+    scope TEXT DEFAULT 'personal' CHECK (scope IN ('personal', 'household')),
+    period TEXT DEFAULT 'month' CHECK (period IN ('week', 'month', 'quarter', 'year')),
+    amount_limit DECIMAL(12, 2) NOT NULL CHECK (amount_limit > 0),
+    thresholds NUMERIC[] DEFAULT '{0.5, 0.8, 1.0}',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Running spent-so-far per budget and period, maintained by a trigger on expenses
+CREATE TABLE IF NOT EXISTS public.budget_counters (
+    budget_id UUID REFERENCES public.budgets(id) ON DELETE CASCADE,
+    period_start DATE NOT NULL,
+    spent DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (budget_id, period_start)
+);
+
+-- Threshold crossings (e.g. 80% of the limit reached)
+CREATE TABLE IF NOT EXISTS public.budget_events (
+    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    budget_id UUID REFERENCES public.budgets(id) ON DELETE CASCADE NOT NULL,
+    period_start DATE NOT NULL,
+    threshold NUMERIC NOT NULL,
+    spent DECIMAL(12, 2) NOT NULL,
+    amount_limit DECIMAL(12, 2) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE public.budgets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.budget_counters ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.budget_events ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can manage own budgets" ON public.budgets
+    FOR ALL USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can view partner household budgets" ON public.budgets
+    FOR SELECT USING (
+        scope = 'household' AND
+        auth.uid() IN (SELECT partner_id FROM public.profiles WHERE id = user_id)
+    );
+
+CREATE POLICY "Users can view counters of visible budgets" ON public.budget_counters
+    FOR SELECT USING (budget_id IN (SELECT id FROM public.budgets));
+
+CREATE POLICY "Users can view events of visible budgets" ON public.budget_events
+    FOR SELECT USING (budget_id IN (SELECT id FROM public.budgets));
+
+-- Start of the budget period containing a timestamp (UTC)
+CREATE OR REPLACE FUNCTION public.budget_period_start(p_period TEXT, p_date TIMESTAMP WITH TIME ZONE)
+RETURNS DATE AS $$
+    SELECT date_trunc(p_period, p_date AT TIME ZONE 'UTC')::date;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Add an amount to every budget an expense counts towards, recording any
+-- thresholds crossed on the way up. Touches one counter row per matching
+-- budget, so it costs the same however many expenses exist.
+CREATE OR REPLACE FUNCTION public.apply_budget_delta(
+    p_user_id UUID,
+    p_category_id UUID,
+    p_date TIMESTAMP WITH TIME ZONE,
+    p_delta NUMERIC
+)
+RETURNS VOID AS $$
+DECLARE
+    b RECORD;
+    v_start DATE;
+    v_new NUMERIC;
+    v_old NUMERIC;
+    v_threshold NUMERIC;
+BEGIN
+    IF p_delta = 0 THEN
+        RETURN;
+    END IF;
+
+    FOR b IN
+        SELECT * FROM public.budgets
+        WHERE (category_id IS NULL OR category_id = p_category_id)
+          AND (
+              user_id = p_user_id OR
+              (scope = 'household' AND user_id = (SELECT partner_id FROM public.profiles WHERE id = p_user_id))
+          )
+    LOOP
+        v_start := public.budget_period_start(b.period, p_date);
+
+        INSERT INTO public.budget_counters (budget_id, period_start, spent)
+        VALUES (b.id, v_start, p_delta)
+        ON CONFLICT (budget_id, period_start)
+        DO UPDATE SET spent = public.budget_counters.spent + EXCLUDED.spent, updated_at = NOW()
+        RETURNING spent INTO v_new;
+
+        v_old := v_new - p_delta;
+        FOREACH v_threshold IN ARRAY COALESCE(b.thresholds, '{}') LOOP
+            IF v_old < v_threshold * b.amount_limit AND v_new >= v_threshold * b.amount_limit THEN
+                INSERT INTO public.budget_events (budget_id, period_start, threshold, spent, amount_limit)
+                VALUES (b.id, v_start, v_threshold, v_new, b.amount_limit);
+            END IF;
+        END LOOP;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Keep budget counters in step with every expense insert, update and delete,
+-- including Gmail sync and the category_id reset when a category is deleted
+CREATE OR REPLACE FUNCTION public.expenses_update_budgets()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.amount = OLD.amount
+       AND NEW.user_id = OLD.user_id
+       AND NEW.date = OLD.date
+       AND NEW.category_id IS NOT DISTINCT FROM OLD.category_id THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.apply_budget_delta(OLD.user_id, OLD.category_id, OLD.date, -OLD.amount);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.apply_budget_delta(NEW.user_id, NEW.category_id, NEW.date, NEW.amount);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS expenses_budgets ON public.expenses;
+CREATE TRIGGER expenses_budgets
+    AFTER INSERT OR UPDATE OR DELETE ON public.expenses
+    FOR EACH ROW EXECUTE FUNCTION public.expenses_update_budgets();
+
+-- Recompute a budget's counter for the current period from expenses. Only
+-- needed when a budget is created or its household changes (partner linking).
+CREATE OR REPLACE FUNCTION public.rebuild_budget_counter(p_budget_id UUID)
+RETURNS VOID AS $$
+DECLARE
+    b RECORD;
+    v_start DATE;
+BEGIN
+    SELECT * INTO b FROM public.budgets WHERE id = p_budget_id;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+    v_start := public.budget_period_start(b.period, NOW());
+
+    INSERT INTO public.budget_counters (budget_id, period_start, spent)
+    SELECT b.id, v_start, COALESCE(SUM(e.amount), 0)
+    FROM public.expenses e
+    WHERE (b.category_id IS NULL OR e.category_id = b.category_id)
+      AND public.budget_period_start(b.period, e.date) = v_start
+      AND (
+          e.user_id = b.user_id OR
+          (b.scope = 'household' AND e.user_id = (SELECT partner_id FROM public.profiles WHERE id = b.user_id))
+      )
+    ON CONFLICT (budget_id, period_start)
+    DO UPDATE SET spent = EXCLUDED.spent, updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Budgets visible to a user (own, plus the partner's household budgets) with
+-- the current period's counter; reads budgets and counters only
+CREATE OR REPLACE FUNCTION public.budget_status(p_user_id UUID)
+RETURNS TABLE (
+    id UUID,
+    user_id UUID,
+    category_id UUID,
+    category_name TEXT,
+    scope TEXT,
+    period TEXT,
+    amount_limit NUMERIC,
+    thresholds NUMERIC[],
+    period_start DATE,
+    spent NUMERIC
+) AS $$
+    SELECT b.id, b.user_id, b.category_id, c.name, b.scope, b.period, b.amount_limit, b.thresholds,
+           public.budget_period_start(b.period, NOW()), COALESCE(bc.spent, 0)
+    FROM public.budgets b
+    LEFT JOIN public.categories c ON c.id = b.category_id
+    LEFT JOIN public.budget_counters bc
+        ON bc.budget_id = b.id AND bc.period_start = public.budget_period_start(b.period, NOW())
+    WHERE b.user_id = p_user_id
+       OR (b.scope = 'household' AND b.user_id = (SELECT partner_id FROM public.profiles WHERE id = p_user_id))
+    ORDER BY b.created_at;
+$$ LANGUAGE sql STABLE;
+
+-- Mutations that check ownership and write in one call, so each endpoint
+-- makes a single round trip and multi-row changes commit or fail together.
+
+-- Partial update of one of a user's expenses. Keys absent from p_changes keep
+-- their value; "category" is a category name (the user's own, else a default)
+-- and is ignored when no such category exists. Returns the updated row with
+-- its category name before and after, or no row if the user has no such expense.
+CREATE OR REPLACE FUNCTION public.update_expense(p_expense_id UUID, p_user_id UUID, p_changes JSONB)
+RETURNS TABLE (expense JSONB, category TEXT, previous_category TEXT) AS $$
+DECLARE
+    v_category_id UUID;
+    v_previous TEXT;
+    v_new_id UUID;
+    v_category TEXT;
+BEGIN
+    SELECT e.category_id, c.name INTO v_category_id, v_previous
+    FROM public.expenses e
+    LEFT JOIN public.categories c ON c.id = e.category_id
+    WHERE e.id = p_expense_id AND e.user_id = p_user_id
+    FOR UPDATE OF e;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    v_category := v_previous;
+    IF COALESCE(p_changes->>'category', '') <> '' THEN
+        SELECT c.id INTO v_new_id FROM public.categories c
+        WHERE c.name = p_changes->>'category' AND (c.user_id IS NULL OR c.user_id = p_user_id)
+        ORDER BY c.user_id IS NULL
+        LIMIT 1;
+        IF v_new_id IS NOT NULL THEN
+            v_category_id := v_new_id;
+            v_category := p_changes->>'category';
+        END IF;
+    END IF;
+
+    RETURN QUERY
+    UPDATE public.expenses e SET
+        amount = COALESCE((p_changes->>'amount')::numeric, e.amount),
+        description = COALESCE(p_changes->>'description', e.description),
+        merchant = CASE WHEN p_changes ? 'merchant' THEN p_changes->>'merchant' ELSE e.merchant END,
+        date = COALESCE((p_changes->>'date')::timestamptz, e.date),
+        category_id = v_category_id
+    WHERE e.id = p_expense_id AND e.user_id = p_user_id
+    RETURNING to_jsonb(e.*), v_category, v_previous;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Apply re-extracted Gmail receipts to a user's expenses in one statement.
+-- p_expenses is an array of {email_id, amount, description, merchant, date,
+-- category}; a null date keeps the stored one and a null or unknown category
+-- keeps the stored category. Messages without an expense are inserted.
+-- Returns each written row, its category name, and whether it was inserted.
+CREATE OR REPLACE FUNCTION public.reextract_gmail_expenses(p_user_id UUID, p_expenses JSONB)
+RETURNS TABLE (expense JSONB, category TEXT, inserted BOOLEAN) AS $$
+BEGIN
+    RETURN QUERY
+    WITH incoming AS (
+        SELECT x.email_id, x.amount, x.description, x.merchant, x.date,
+               (SELECT c.id FROM public.categories c
+                WHERE c.name = x.category AND (c.user_id IS NULL OR c.user_id = p_user_id)
+                ORDER BY c.user_id IS NULL
+                LIMIT 1) AS category_id
+        FROM jsonb_to_recordset(p_expenses)
+            AS x(email_id TEXT, amount NUMERIC, description TEXT, merchant TEXT, date TIMESTAMPTZ, category TEXT)
+    ),
+    updated AS (
+        UPDATE public.expenses e SET
+            amount = i.amount,
+            description = i.description,
+            merchant = i.merchant,
+            date = COALESCE(i.date, e.date),
+            category_id = COALESCE(i.category_id, e.category_id)
+        FROM incoming i
+        WHERE e.user_id = p_user_id AND e.email_id = i.email_id
+        RETURNING e.*
+    ),
+    added AS (
+        INSERT INTO public.expenses (user_id, amount, description, category_id, merchant, date, source, email_id)
+        SELECT p_user_id, i.amount, i.description, i.category_id, i.merchant, COALESCE(i.date, NOW()), 'gmail', i.email_id
+        FROM incoming i
+        WHERE NOT EXISTS (
+            SELECT 1 FROM public.expenses e WHERE e.user_id = p_user_id AND e.email_id = i.email_id
+        )
+        RETURNING *
+    )
+    SELECT to_jsonb(u.*), c.name, FALSE FROM updated u LEFT JOIN public.categories c ON c.id = u.category_id
+    UNION ALL
+    SELECT to_jsonb(a.*), c.name, TRUE FROM added a LEFT JOIN public.categories c ON c.id = a.category_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Delete a user's custom category, uncategorizing its expenses first.
+-- Returns false if the user has no such category (defaults included).
+CREATE OR REPLACE FUNCTION public.delete_category(p_category_id UUID, p_user_id UUID)
+RETURNS BOOLEAN AS $$
+BEGIN
+    PERFORM 1 FROM public.categories WHERE id = p_category_id AND user_id = p_user_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+
+    UPDATE public.expenses SET category_id = NULL WHERE category_id = p_category_id;
+    DELETE FROM public.categories WHERE id = p_category_id;
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Accept a partner invite: link both profiles, close the invite and rebuild
+-- the household budgets' counters, all or nothing. Both profiles are locked
+-- (in id order) so concurrent accepts and unlinks cannot leave one side
+-- linked. status is 'accepted', 'not_found', 'not_pending', 'forbidden'
+-- (the user is not the invitee) or 'already_linked'.
+CREATE OR REPLACE FUNCTION public.accept_partner_invite(p_invite_id UUID, p_user_id UUID)
+RETURNS TABLE (status TEXT, inviter_id UUID) AS $$
+DECLARE
+    v_invite public.partner_invites;
+    v_members UUID[];
+BEGIN
+    SELECT * INTO v_invite FROM public.partner_invites i WHERE i.id = p_invite_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT 'not_found', NULL::uuid;
+        RETURN;
+    END IF;
+    IF v_invite.status <> 'pending' THEN
+        RETURN QUERY SELECT 'not_pending', v_invite.inviter_id;
+        RETURN;
+    END IF;
+    IF NOT EXISTS (
+        SELECT 1 FROM public.profiles WHERE id = p_user_id AND email = v_invite.invitee_email
+    ) OR v_invite.inviter_id = p_user_id THEN
+        RETURN QUERY SELECT 'forbidden', v_invite.inviter_id;
+        RETURN;
+    END IF;
+
+    v_members := ARRAY[p_user_id, v_invite.inviter_id];
+    PERFORM 1 FROM public.profiles WHERE id = ANY(v_members) ORDER BY id FOR UPDATE;
+    IF EXISTS (SELECT 1 FROM public.profiles WHERE id = ANY(v_members) AND partner_id IS NOT NULL) THEN
+        RETURN QUERY SELECT 'already_linked', v_invite.inviter_id;
+        RETURN;
+    END IF;
+
+    UPDATE public.profiles
+    SET partner_id = CASE WHEN id = p_user_id THEN v_invite.inviter_id ELSE p_user_id END, updated_at = NOW()
+    WHERE id = ANY(v_members);
+    UPDATE public.partner_invites SET status = 'accepted' WHERE id = p_invite_id;
+    PERFORM public.rebuild_budget_counter(b.id)
+    FROM public.budgets b WHERE b.user_id = ANY(v_members) AND b.scope = 'household';
+
+    RETURN QUERY SELECT 'accepted', v_invite.inviter_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Unlink a user from their partner and rebuild the household budgets'
+-- counters in one transaction. The partner keeps a link only if it points
+-- elsewhere. Returns the former partner's id, or NULL if there was none.
+CREATE OR REPLACE FUNCTION public.unlink_partner(p_user_id UUID)
+RETURNS UUID AS $$
+DECLARE
+    v_partner UUID;
+BEGIN
+    SELECT partner_id INTO v_partner FROM public.profiles WHERE id = p_user_id;
+    IF v_partner IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM 1 FROM public.profiles WHERE id IN (p_user_id, v_partner) ORDER BY id FOR UPDATE;
+    UPDATE public.profiles SET partner_id = NULL, updated_at = NOW()
+    WHERE id = p_user_id OR (id = v_partner AND partner_id = p_user_id);
+    PERFORM public.rebuild_budget_counter(b.id)
+    FROM public.budgets b WHERE b.user_id IN (p_user_id, v_partner) AND b.scope = 'household';
+    RETURN v_partner;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the monthly expenses partition containing p_month unless it exists.
+-- Rows of that month already sitting in the default partition are moved into
+-- the new table before it is attached, with the budget trigger disabled as
+-- they are already counted. Returns whether a partition was created.
+CREATE OR REPLACE FUNCTION public.create_expense_partition(p_month DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_start TIMESTAMP WITH TIME ZONE := date_trunc('month', p_month::timestamp) AT TIME ZONE 'UTC';
+    v_end TIMESTAMP WITH TIME ZONE := (date_trunc('month', p_month::timestamp) + INTERVAL '1 month') AT TIME ZONE 'UTC';
+    v_name TEXT := 'expenses_' || to_char(p_month, '"y"YYYY"m"MM');
+BEGIN
+    IF to_regclass('public.' || v_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM public.expenses_default WHERE date >= v_start AND date < v_end) THEN
+        EXECUTE format('CREATE TABLE public.%I (LIKE public.expenses INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', v_name);
+        EXECUTE format(
+            'INSERT INTO public.%I SELECT * FROM public.expenses_default WHERE date >= $1 AND date < $2', v_name
+        ) USING v_start, v_end;
+        ALTER TABLE public.expenses_default DISABLE TRIGGER expenses_budgets;
+        DELETE FROM public.expenses_default WHERE date >= v_start AND date < v_end;
+        ALTER TABLE public.expenses_default ENABLE TRIGGER expenses_budgets;
+        EXECUTE format(
+            'ALTER TABLE public.expenses ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)', v_name, v_start, v_end
+        );
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.expenses FOR VALUES FROM (%L) TO (%L)', v_name, v_start, v_end
+        );
+    END IF;
+    -- Partitions are reachable through the API like any public table; with
+    -- RLS on and no policies only the parent (and its policies) serves rows
+    EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_name);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partition job: create partitions for the current month and p_months_ahead
+-- months after it, plus any month that has rows in the default partition.
+-- Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION public.maintain_expense_partitions(p_months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+DECLARE
+    v_month DATE;
+    v_months DATE[];
+    v_this_month TIMESTAMP := date_trunc('month', NOW() AT TIME ZONE 'UTC');
+    v_created INTEGER := 0;
+BEGIN
+    -- Collected up front: moving rows alters expenses_default, which an open
+    -- loop cursor over it would prevent
+    SELECT array_agg(m ORDER BY m) INTO v_months FROM (
+        SELECT generate_series(v_this_month, v_this_month + make_interval(months => p_months_ahead), INTERVAL '1 month')::date
+        UNION
+        SELECT DISTINCT date_trunc('month', date AT TIME ZONE 'UTC')::date FROM public.expenses_default
+    ) AS months(m);
+
+    FOREACH v_month IN ARRAY v_months LOOP
+        IF public.create_expense_partition(v_month) THEN
+            v_created := v_created + 1;
+        END IF;
+    END LOOP;
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION public.create_expense_partition(DATE) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.maintain_expense_partitions(INTEGER) FROM PUBLIC;
+
+-- Expense search over merchant and description. The indexes below are on
+-- these expressions, so search_expenses() must use them verbatim. 'simple'
+-- skips stemming and stop words: merchants and receipt subjects are names,
+-- not prose.
+CREATE OR REPLACE FUNCTION public.expense_search_document(p_merchant TEXT, p_description TEXT)
+RETURNS tsvector AS $$
+    SELECT to_tsvector('simple', COALESCE(p_merchant, '') || ' ' || COALESCE(p_description, ''))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION public.expense_search_text(p_merchant TEXT, p_description TEXT)
+RETURNS TEXT AS $$
+    SELECT COALESCE(p_merchant, '') || ' ' || COALESCE(p_description, '')
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- Ranked search of a household's expenses. Every word of p_query must
+-- start a merchant or description word ("amaz prim" finds Amazon Prime):
+-- merchant hits score 2 and other hits 1. When those run out, expenses
+-- whose text closely matches p_query by trigrams follow, scored by
+-- word_similarity below 1, which forgives typos ("amazn"). Rows come by
+-- score, then newest first; pass the last row's score, date and id for
+-- the next page.
+CREATE OR REPLACE FUNCTION public.search_expenses(
+    p_user_ids UUID[],
+    p_query TEXT,
+    p_limit INTEGER DEFAULT 50,
+    p_after_score REAL DEFAULT NULL,
+    p_after_date TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL
+)
+RETURNS TABLE (expense JSONB, category JSONB, score REAL) AS $$
+DECLARE
+    v_prefixes tsquery;
+    v_found INTEGER;
+BEGIN
+    SELECT to_tsquery('simple', string_agg(quote_literal(w) || ':*', ' & '))
+    INTO v_prefixes
+    FROM regexp_split_to_table(lower(p_query), '[^[:alnum:]]+') AS w
+    WHERE w <> '';
+    IF v_prefixes IS NULL THEN
+        RETURN;
+    END IF;
+
+    -- Word matches; the score reads only the (short) merchant, and rows are
+    -- turned into JSON only for the page returned
+    IF p_after_score IS NULL OR p_after_score >= 1 THEN
+        RETURN QUERY
+        WITH matches AS (
+            SELECT e.*, CASE WHEN to_tsvector('simple', COALESCE(e.merchant, '')) @@ v_prefixes THEN 2 ELSE 1 END::real AS rank
+            FROM public.expenses e
+            WHERE e.user_id = ANY(p_user_ids)
+              AND public.expense_search_document(e.merchant, e.description) @@ v_prefixes
+        ),
+        page AS (
+            SELECT * FROM matches m
+            WHERE p_after_id IS NULL OR (m.rank, m.date, m.id) < (p_after_score, p_after_date, p_after_id)
+            ORDER BY m.rank DESC, m.date DESC, m.id DESC
+            LIMIT p_limit
+        )
+        SELECT to_jsonb(m.*) - 'rank',
+               CASE WHEN c.id IS NULL THEN NULL
+                    ELSE jsonb_build_object('name', c.name, 'color', c.color, 'icon', c.icon) END,
+               m.rank
+        FROM page m
+        LEFT JOIN public.categories c ON c.id = m.category_id
+        ORDER BY m.rank DESC, m.date DESC, m.id DESC;
+        GET DIAGNOSTICS v_found = ROW_COUNT;
+        IF v_found >= p_limit THEN
+            RETURN;
+        END IF;
+        p_limit := p_limit - v_found;
+    END IF;
+
+    -- Then near misses that are not word matches
+    RETURN QUERY
+    WITH matches AS (
+        SELECT e.*, word_similarity(p_query, public.expense_search_text(e.merchant, e.description))::real AS rank
+        FROM public.expenses e
+        WHERE e.user_id = ANY(p_user_ids)
+          AND p_query <% public.expense_search_text(e.merchant, e.description)
+          AND NOT public.expense_search_document(e.merchant, e.description) @@ v_prefixes
+    ),
+    page AS (
+        SELECT * FROM matches m
+        WHERE p_after_id IS NULL OR (m.rank, m.date, m.id) < (p_after_score, p_after_date, p_after_id)
+        ORDER BY m.rank DESC, m.date DESC, m.id DESC
+        LIMIT p_limit
+    )
+    SELECT to_jsonb(m.*) - 'rank',
+           CASE WHEN c.id IS NULL THEN NULL
+                ELSE jsonb_build_object('name', c.name, 'color', c.color, 'icon', c.icon) END,
+           m.rank
+    FROM page m
+    LEFT JOIN public.categories c ON c.id = m.category_id
+    ORDER BY m.rank DESC, m.date DESC, m.id DESC;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
 -- Index for faster queries
-CREATE INDEX IF NOT EXISTS idx_expenses_user_id ON public.expenses(user_id);
-CREATE INDEX IF NOT EXISTS idx_expenses_date ON public.expenses(date);
+-- Covers the user + date range reads; amount and category_id ride along so
+-- totals and category breakdowns are answered from the index alone
+CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON public.expenses(user_id, date) INCLUDE (amount, category_id);
 CREATE INDEX IF NOT EXISTS idx_expenses_category ON public.expenses(category_id);
+-- Word/prefix and trigram search; user_id leads so a search reads only the household's entries
+CREATE INDEX IF NOT EXISTS idx_expenses_search
+    ON public.expenses USING GIN (user_id, public.expense_search_document(merchant, description));
+CREATE INDEX IF NOT EXISTS idx_expenses_search_trgm
+    ON public.expenses USING GIN (user_id, public.expense_search_text(merchant, description) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_budgets_user_id ON public.budgets(user_id);
+CREATE INDEX IF NOT EXISTS idx_budget_events_budget ON public.budget_events(budget_id, created_at);
+
+-- Expense partitions: create the first ones now, then keep three months
+-- ahead daily with pg_cron where it is enabled (Database > Extensions on
+-- Supabase). Without pg_cron, run SELECT public.maintain_expense_partitions();
+-- at least monthly; rows past the last partition land in expenses_default.
+ALTER TABLE public.expenses_default ENABLE ROW LEVEL SECURITY;
+SELECT public.maintain_expense_partitions();
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('maintain-expense-partitions', '17 3 * * *', 'SELECT public.maintain_expense_partitions()');
+    END IF;
+END $$;
+
+-- PostgREST prepares its statements too; plan them per call so expenses
+-- partitions are pruned at plan time (a generic plan locks every partition).
+-- Takes effect as PostgREST reconnects.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticator') THEN
+        ALTER ROLE authenticator SET plan_cache_mode = 'force_custom_plan';
+    END IF;
+END $$;